@@ -0,0 +1 @@
+"""Scripts de medição de desempenho do Versão 2.0 de Mim (executar com `python -m benchmarks.<script>`)."""
@@ -0,0 +1,77 @@
+"""
+Benchmark do motor de badges (mim_core.badges): com o catálogo padrão mais --rules regras sintéticas
+(synthetic_catalog) sobre --days dias de histórico aleatório, mede a avaliação completa, a chamada
+sem dias novos (só lê a marca de badge_evaluations) e a reavaliação depois de um evento retroativo
+200 dias atrás (a trigger de daily_xp recua a marca). A conferência dos resultados fica em
+tests/test_badges.py.
+
+    python -m benchmarks.bench_badges [--rules 300] [--days 400] [--reps 5]
+"""
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+
+def main():
+    from mim_core import db
+    from mim_core.badges import BADGE_CATALOG, BadgeRule, earned_badges, reset_badges, synthetic_catalog, update_badges
+
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--rules", type=int, default=300)
+    ap.add_argument("--days", type=int, default=400)
+    ap.add_argument("--reps", type=int, default=5)
+    args = ap.parse_args()
+
+    rules = BADGE_CATALOG + synthetic_catalog(args.rules)
+    rnd = random.Random(7)
+    end = date.today()
+    start = end - timedelta(days=args.days)
+    areas = ["Coding", "Inglês", "Saúde Física", "Finanças", "Casa"]
+    events = [((start + timedelta(days=rnd.randrange(args.days))).isoformat(), rnd.choice(areas), rnd.randint(-10, 60))
+              for _ in range(args.days * 3)]
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_badges_"))
+    try:
+        path = workdir / "bench.db"
+        db.migrate(path)
+        with db.transaction(path) as c:
+            c.executemany("INSERT INTO events (date, area, xp, type, user) VALUES (?, ?, ?, 'manual', 'u')", events)
+
+        full, noop, retro = [], [], []
+        probe = rules + (BadgeRule("probe", "Probe", "", "window", threshold=10 ** 6, days=1),)
+        for i in range(args.reps):
+            reset_badges(path, "u")
+            t = time.perf_counter()
+            update_badges(path, "u", end, rules)
+            full.append(time.perf_counter() - t)
+            t = time.perf_counter()
+            update_badges(path, "u", end, rules)
+            noop.append(time.perf_counter() - t)
+
+            update_badges(path, "u", end, probe)
+            back = (end - timedelta(days=200 + i)).isoformat()
+            with db.transaction(path) as c:
+                c.execute("INSERT INTO events (date, area, xp, type, user) VALUES (?, 'Casa', 2000000, 'manual', 'u')", (back,))
+            t = time.perf_counter()
+            update_badges(path, "u", end, probe)
+            retro.append(time.perf_counter() - t)
+            with db.transaction(path) as c:
+                c.execute("DELETE FROM events WHERE xp=2000000")
+
+        print(f"{len(rules)} regras, {args.days} dias, {len(events)} eventos; "
+              f"{len(earned_badges(path, 'u'))} badges (mediana de {args.reps})")
+        print(f"  avaliação completa     {statistics.median(full) * 1000:>8.1f} ms")
+        print(f"  sem dias novos         {statistics.median(noop) * 1000:>8.2f} ms")
+        print(f"  retroativo (200 dias)  {statistics.median(retro) * 1000:>8.1f} ms")
+    finally:
+        db.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Benchmark: gráfico "XP ao longo do tempo" — pipeline antigo (frame inteiro do daily_xp, resample
+no pandas, px.line com todos os pontos) x mim_core.charts (agregação no SQLite, LTTB, Scattergl) —
+tempo para montar a figura e tamanho do JSON enviado ao navegador, por resolução. Mostra também a
+variante empilhada por área.
+
+Roda num banco temporário com --years anos de histórico sintético (vários eventos por dia).
+
+    python -m benchmarks.bench_charts [--years 10] [--reps 5]
+"""
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+import plotly.express as px
+
+from mim_core import charts, db, frames
+
+USER = "bench.user"
+AREAS = ["Coding", "Inglês", "Educação", "Saúde Mental", "Saúde Física", "Finanças",
+         "Social", "Produtividade", "Criatividade", "Casa", "Lazer"]
+
+
+def prepare_db(path: Path, years: int):
+    db.migrate(path)
+    rnd = random.Random(42)
+    start = date.today() - timedelta(days=365 * years)
+    with db.transaction(path) as c:
+        c.executemany(
+            "INSERT INTO events (date, area, xp, type, user) VALUES (?, ?, ?, 'manual', ?)",
+            (((start + timedelta(days=d)).isoformat(), rnd.choice(AREAS), rnd.randint(-20, 120), USER)
+             for d in range(365 * years) for _ in range(rnd.randint(0, 6))),
+        )
+
+
+def _legacy_figure(conn, freq):
+    # como era: frame do daily_xp com datas `date`, resample no pandas, todos os pontos no px.line
+    df = pd.read_sql_query(
+        "SELECT day AS date, area, type, xp_sum AS xp, event_count FROM daily_xp WHERE user=? ORDER BY day ASC",
+        conn, params=(USER,),
+    )
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    tmp = df.copy()
+    tmp["date"] = pd.to_datetime(tmp["date"])
+    res = tmp.set_index("date")["xp"].resample(frames._FREQ_ALIASES.get(freq, freq)).sum().reset_index()
+    res["date"] = res["date"].dt.date
+    return px.line(res, x="date", y="xp", title="XP por período")
+
+
+def _measure(fn, reps):
+    times = []
+    for _ in range(reps):
+        t = time.perf_counter()
+        fig = fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times), len(fig.to_json()), sum(len(tr.x) for tr in fig.data)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--years", type=int, default=10)
+    ap.add_argument("--reps", type=int, default=5)
+    args = ap.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_charts_"))
+    try:
+        path = workdir / "bench.db"
+        prepare_db(path, args.years)
+        conn = db.get_conn(path)
+        print(f"{args.years} anos de histórico\n")
+        print(f"{'resolução':<22}{'tempo':>10}{'pontos':>9}{'JSON':>12}")
+        for freq in charts.RESOLUTIONS:
+            cases = [
+                ("antigo", lambda: _legacy_figure(conn, freq)),
+                ("mim_core.charts", lambda: charts.build_xp_figure(conn, USER, freq)),
+                ("mim_core.charts empilhado", lambda: charts.build_xp_figure(conn, USER, freq, stacked=True)),
+            ]
+            for name, fn in cases:
+                t, size, points = _measure(fn, args.reps)
+                print(f"{freq} {name:<20}{t * 1000:>7.1f} ms{points:>9}{size / 1024:>8.1f} KiB")
+    finally:
+        db.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Micro-benchmark: latência de um "rerun" com conexões ad-hoc vs. conexão do pool (mim_core.db).
+
+Gera um banco temporário com 100k eventos e executa a mesma mistura de consultas que
+um rerun do dashboard faz (load_events, dezenas de get_user_config, quests, perks, metas...),
+primeiro abrindo uma conexão por chamada (comportamento antigo) e depois usando get_conn().
+
+    python -m benchmarks.bench_connection_pool [--events 100000] [--reruns 20]
+"""
+import argparse
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from mim_core import db
+
+AREAS = ["Coding", "Inglês", "Educação", "Saúde Mental", "Saúde Física", "Finanças",
+         "Social", "Produtividade", "Criatividade", "Casa", "Lazer"]
+USER = "bench.user"
+
+
+def build_db(path: Path, n_events: int):
+    conn = sqlite3.connect(path)
+    conn.executescript(
+        """
+        CREATE TABLE events (id INTEGER PRIMARY KEY, date TEXT NOT NULL, area TEXT NOT NULL, xp INTEGER NOT NULL,
+                             note TEXT, type TEXT, user TEXT, meta_id INTEGER);
+        CREATE TABLE user_config (id INTEGER PRIMARY KEY, user TEXT NOT NULL, key TEXT NOT NULL, value TEXT, UNIQUE(user, key));
+        CREATE TABLE quests (id INTEGER PRIMARY KEY, title TEXT NOT NULL, area TEXT NOT NULL, xp_reward INTEGER NOT NULL,
+                             cadence TEXT, last_done TEXT, streak INTEGER DEFAULT 0, active INTEGER DEFAULT 1, user TEXT);
+        CREATE TABLE perks (id INTEGER PRIMARY KEY, name TEXT NOT NULL, area TEXT, unlock_level INTEGER NOT NULL, effect TEXT,
+                            duration_days INTEGER DEFAULT 0, multiplier REAL DEFAULT 1.0, start_date TEXT, active INTEGER DEFAULT 0, user TEXT);
+        CREATE TABLE metas (id INTEGER PRIMARY KEY, area TEXT NOT NULL, weekly_target INTEGER NOT NULL, note TEXT,
+                            daily_suggestion INTEGER DEFAULT 0, active INTEGER DEFAULT 1, user TEXT, created_at TEXT, updated_at TEXT);
+        """
+    )
+    rnd = random.Random(42)
+    start = date.today() - timedelta(days=3 * 365)
+    conn.executemany(
+        "INSERT INTO events (date, area, xp, note, type, user) VALUES (?, ?, ?, ?, 'manual', ?)",
+        (((start + timedelta(days=rnd.randrange(3 * 365))).isoformat(), rnd.choice(AREAS), rnd.randint(5, 80), "bench", USER)
+         for _ in range(n_events)),
+    )
+    conn.executemany(
+        "INSERT INTO user_config (user, key, value) VALUES (?, ?, ?)",
+        [(USER, f"goal_{kind}_{a}", "100") for a in AREAS for kind in ("weekly", "monthly", "note", "daily")],
+    )
+    conn.executemany("INSERT INTO quests (title, area, xp_reward, cadence, user) VALUES (?, ?, 50, 'daily', ?)",
+                     [(f"Quest {i}", AREAS[i % len(AREAS)], USER) for i in range(10)])
+    conn.commit()
+    conn.close()
+
+
+def rerun_queries(get, with_event_loads: bool = True):
+    """Mistura de consultas de um rerun; `get()` devolve (conn, fechar_depois)."""
+    def read_df(sql, params=()):
+        conn, close = get()
+        df = pd.read_sql_query(sql, conn, params=params)
+        if close:
+            conn.close()
+        return df
+
+    def scalar(sql, params=()):
+        conn, close = get()
+        row = conn.execute(sql, params).fetchone()
+        if close:
+            conn.close()
+        return row
+
+    for _ in range(4 if with_event_loads else 0):  # sidebar export, snapshot, visão geral, registro detalhado
+        df = read_df("SELECT * FROM events WHERE user=? ORDER BY date ASC", (USER,))
+        df["date"] = pd.to_datetime(df["date"]).dt.date
+    for a in AREAS:  # configurar metas (4 chaves por área) + progresso nas metas (4 chaves por área)
+        for kind in ("weekly", "monthly", "note", "daily") * 2:
+            scalar("SELECT value FROM user_config WHERE user=? AND key=?", (USER, f"goal_{kind}_{a}"))
+    read_df("SELECT * FROM quests WHERE active=1 AND (user=? OR user IS NULL)", (USER,))
+    read_df("SELECT * FROM perks WHERE user=? OR user IS NULL", (USER,))
+    read_df("SELECT * FROM metas WHERE (user=? OR user IS NULL) ORDER BY id DESC", (USER,))
+    scalar("SELECT area, SUM(xp) FROM events WHERE (user=? OR user IS NULL) GROUP BY area", (USER,))
+
+
+def time_reruns(get, reruns: int, with_event_loads: bool = True):
+    samples = []
+    for _ in range(reruns):
+        t0 = time.perf_counter()
+        rerun_queries(get, with_event_loads)
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--events", type=int, default=100_000)
+    ap.add_argument("--reruns", type=int, default=20)
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # duas cópias: o pool converte o arquivo para WAL, a cópia ad-hoc fica no journal padrão
+        path_adhoc, path_pool = Path(tmp) / "adhoc.db", Path(tmp) / "pool.db"
+        build_db(path_adhoc, args.events)
+        shutil.copy(path_adhoc, path_pool)
+
+        adhoc = lambda: (sqlite3.connect(path_adhoc, timeout=5), True)
+        pooled = lambda: (db.get_conn(path_pool), False)
+        results = {
+            "rerun completo": (time_reruns(adhoc, args.reruns), time_reruns(pooled, args.reruns)),
+            "sem load_events": (time_reruns(adhoc, args.reruns, False), time_reruns(pooled, args.reruns, False)),
+        }
+        db.close_all()
+
+    def fmt(name, xs):
+        return f"  {name:<8} mediana {statistics.median(xs) * 1000:8.1f} ms | p90 {sorted(xs)[int(len(xs) * 0.9) - 1] * 1000:8.1f} ms"
+
+    print(f"{args.events} eventos, {args.reruns} reruns")
+    for label, (before, after) in results.items():
+        print(label)
+        print(fmt("ad-hoc", before))
+        print(fmt("pool", after))
+        print(f"  ganho: {statistics.median(before) / statistics.median(after):.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,148 @@
+"""
+Benchmark: frame de eventos antigo (datas como objetos `date`, colunas de texto como object, notas
+sempre carregadas) x frame canônico do mim_core.frames — memória por 100 mil eventos e tempo das
+análises do app sobre cada um (mediana de --reps execuções).
+
+As versões antigas das análises estão copiadas aqui (_legacy_*) como eram antes do frame tipado.
+Roda num banco temporário com --events eventos sintéticos; o do repositório não é tocado.
+
+    python -m benchmarks.bench_event_frame [--events 100000] [--reps 7]
+"""
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from mim_core import db, frames
+
+USER = "bench.user"
+AREAS = ["Coding", "Inglês", "Educação", "Saúde Mental", "Saúde Física", "Finanças",
+         "Social", "Produtividade", "Criatividade", "Casa", "Lazer"]
+TYPES = ["manual", "manual", "manual", "quest", "meta", "penalty"]
+
+
+def prepare_db(path: Path, n_events: int):
+    db.migrate(path)
+    rnd = random.Random(42)
+    start = date.today() - timedelta(days=3 * 365)
+    with db.transaction(path) as c:
+        c.executemany(
+            "INSERT INTO events (date, area, xp, note, type, user) VALUES (?, ?, ?, ?, ?, ?)",
+            (((start + timedelta(days=rnd.randrange(3 * 365))).isoformat(), rnd.choice(AREAS),
+              rnd.randint(-20, 120), f"nota sintética {i % 997}", rnd.choice(TYPES), USER) for i in range(n_events)),
+        )
+
+
+# ---------- Versões antigas (antes do frame tipado)
+def _legacy_events(conn, user):
+    df = pd.read_sql_query("SELECT * FROM events WHERE user=? ORDER BY date ASC", conn, params=(user,), parse_dates=["date"])
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    return df
+
+
+def _legacy_daily(conn, user):
+    df = pd.read_sql_query(
+        "SELECT day AS date, area, type, xp_sum AS xp, event_count FROM daily_xp WHERE user=? ORDER BY day ASC",
+        conn, params=(user,),
+    )
+    df["date"] = pd.to_datetime(df["date"]).dt.date
+    return df
+
+
+def _legacy_aggregate_xp_by_area(df):
+    return df.groupby("area")["xp"].sum().reindex(AREAS).fillna(0)
+
+
+def _legacy_xp_over_time(df, freq="W"):
+    tmp = df.copy()
+    tmp["date"] = pd.to_datetime(tmp["date"])
+    res = tmp.set_index("date")["xp"].resample(freq).sum().reset_index()
+    res["date"] = res["date"].dt.date
+    return res
+
+
+def _legacy_goal_progress(df):
+    today = date.today()
+    week_df = df[df["date"] >= today - timedelta(days=today.weekday())]
+    month_df = df[df["date"] >= date(today.year, today.month, 1)]
+    return {a: (int(week_df[week_df["area"] == a]["xp"].sum()), int(month_df[month_df["area"] == a]["xp"].sum()))
+            for a in AREAS}
+
+
+def _goal_progress(df):
+    today = date.today()
+    week = frames.xp_by_area(df, AREAS, start=today - timedelta(days=today.weekday()))
+    month = frames.xp_by_area(df, AREAS, start=date(today.year, today.month, 1))
+    return {a: (int(week[a]), int(month[a])) for a in AREAS}
+
+
+def _timed(fn, reps: int) -> float:
+    times = []
+    for _ in range(reps):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times)
+
+
+def _mb_per_100k(df) -> float:
+    return df.memory_usage(deep=True).sum() / 1e6 * 100_000 / max(len(df), 1)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--events", type=int, default=100_000)
+    ap.add_argument("--reps", type=int, default=7)
+    args = ap.parse_args()
+
+    from streamlit import logger as st_logger
+
+    st_logger.set_log_level("error")  # sem runtime, cada st.cache_data avisa que usa cache em memória
+    import Versao2_Mim_streamlit_app as app
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_event_frame_"))
+    try:
+        path = workdir / "bench.db"
+        prepare_db(path, args.events)
+        conn = db.get_conn(path)
+        legacy_ev, typed_ev = _legacy_events(conn, USER), frames.read_events(conn, USER)
+        legacy_daily, typed_daily = _legacy_daily(conn, USER), frames.read_daily_xp(conn, USER)
+
+        print(f"{args.events} eventos ({len(typed_daily)} linhas no daily_xp)\n")
+        print(f"{'memória (MB por 100k linhas)':<34}{'antigo':>10}{'tipado':>10}")
+        print(f"{'events (tipado sem notas)':<34}{_mb_per_100k(legacy_ev):>10.2f}{_mb_per_100k(typed_ev):>10.2f}")
+        notes = frames.read_event_notes(conn, USER)
+        notes_mb = notes.memory_usage(deep=True) / 1e6 * 100_000 / max(len(notes), 1)
+        print(f"{'  + notas carregadas à parte':<34}{'':>10}{notes_mb:>10.2f}")
+        print(f"{'daily_xp':<34}{_mb_per_100k(legacy_daily):>10.2f}{_mb_per_100k(typed_daily):>10.2f}")
+
+        t_old = _timed(lambda: _legacy_events(conn, USER), args.reps)
+        t_new = _timed(lambda: frames.read_events(conn, USER), args.reps)
+        print(f"\n{'carregar events':<24}{t_old * 1000:>9.2f} ms{t_new * 1000:>9.2f} ms{t_old / t_new:>9.1f}x")
+
+        # análise -> (versão antiga, versão atual do app)
+        cases = [
+            ("aggregate_xp_by_area", _legacy_aggregate_xp_by_area, app.aggregate_xp_by_area),
+            ("xp_over_time('D')", lambda df: _legacy_xp_over_time(df, "D"), lambda df: frames.xp_over_time(df, "D")),
+            ("xp_over_time('W')", lambda df: _legacy_xp_over_time(df, "W"), lambda df: frames.xp_over_time(df, "W")),
+            ("progresso nas metas", _legacy_goal_progress, _goal_progress),
+        ]
+        for frame_name, legacy_df, typed_df in (("events", legacy_ev, typed_ev), ("daily_xp", legacy_daily, typed_daily)):
+            print(f"\n{frame_name:<24}{'antigo':>12}{'tipado':>12}{'speedup':>10}")
+            for name, old, new in cases:
+                t_old = _timed(lambda: old(legacy_df), args.reps)
+                t_new = _timed(lambda: new(typed_df), args.reps)
+                print(f"{name:<24}{t_old * 1000:>9.2f} ms{t_new * 1000:>9.2f} ms{t_old / t_new:>9.1f}x")
+    finally:
+        db.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
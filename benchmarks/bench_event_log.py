@@ -0,0 +1,94 @@
+"""
+Benchmark: custo de uma página do registro de eventos conforme o histórico cresce — primeira
+página, página do meio do histórico por keyset (cursor) e por OFFSET, página filtrada por área
+e, para comparação, a leitura do histórico inteiro que o painel fazia antes (frame + notas).
+Mediana de --reps execuções (OFFSET mede só as linhas, sem montar o DataFrame), num banco
+temporário por tamanho; o do repositório não é tocado.
+
+    python -m benchmarks.bench_event_log [--sizes 10000 100000 500000] [--reps 7]
+"""
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from mim_core import db
+from mim_core.event_log import PAGE_COLUMNS, PAGE_SIZE, EventFilter, fetch_page
+from mim_core.frames import read_event_notes, read_events
+
+USER = "bench.user"
+AREAS = ["Coding", "Inglês", "Educação", "Saúde Mental", "Saúde Física", "Finanças",
+         "Social", "Produtividade", "Criatividade", "Casa", "Lazer"]
+TYPES = ["manual", "manual", "manual", "quest", "meta", "penalty"]
+
+
+def prepare_db(path: Path, n_events: int):
+    db.migrate(path)
+    rnd = random.Random(42)
+    start = date.today() - timedelta(days=10 * 365)
+    with db.transaction(path) as c:
+        c.executemany(
+            "INSERT INTO events (date, area, xp, note, type, user) VALUES (?, ?, ?, ?, ?, ?)",
+            (((start + timedelta(days=rnd.randrange(10 * 365))).isoformat(), rnd.choice(AREAS),
+              rnd.randint(-20, 120), f"nota sintética {i % 997}", rnd.choice(TYPES), USER) for i in range(n_events)),
+        )
+        c.execute("ANALYZE")
+
+
+def _timed(fn, reps: int) -> float:
+    times = []
+    for _ in range(reps):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times)
+
+
+def _offset_page(conn, offset: int):
+    return conn.execute(
+        f"SELECT {', '.join(PAGE_COLUMNS)} FROM events WHERE user = ? ORDER BY date DESC, id DESC LIMIT ? OFFSET ?",
+        (USER, PAGE_SIZE, offset),
+    ).fetchall()
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 500_000])
+    ap.add_argument("--reps", type=int, default=7)
+    args = ap.parse_args()
+
+    print(f"{'eventos':>9}{'1ª página':>12}{'meio keyset':>13}{'meio OFFSET':>13}{'uma área':>11}{'histórico':>12}")
+    for n in args.sizes:
+        workdir = Path(tempfile.mkdtemp(prefix="bench_event_log_"))
+        try:
+            path = workdir / "bench.db"
+            prepare_db(path, n)
+            conn = db.get_conn(path)
+            middle = n // 2
+            # cursor do meio do histórico: (date, id) da linha logo antes da página
+            cursor = tuple(conn.execute(
+                "SELECT date, id FROM events WHERE user = ? ORDER BY date DESC, id DESC LIMIT 1 OFFSET ?",
+                (USER, middle - 1),
+            ).fetchone())
+            assert fetch_page(conn, USER, cursor=cursor)[0]["id"].tolist() == [r[0] for r in _offset_page(conn, middle)]
+
+            timings = [
+                _timed(lambda: fetch_page(conn, USER), args.reps),
+                _timed(lambda: fetch_page(conn, USER, cursor=cursor), args.reps),
+                _timed(lambda: _offset_page(conn, middle), args.reps),
+                _timed(lambda: fetch_page(conn, USER, EventFilter(areas=("Coding",)), cursor), args.reps),
+                _timed(lambda: read_events(conn, USER).join(read_event_notes(conn, USER), on="id"), max(1, args.reps // 3)),
+            ]
+            widths = (12, 13, 13, 11, 12)
+            print(f"{n:>9}" + "".join(f"{t * 1000:>{w - 3}.2f} ms" for t, w in zip(timings, widths)))
+        finally:
+            db.close_all()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Teste de carga: dezenas de sessões simuladas (threads, como as sessões do Streamlit num mesmo
+processo) registrando eventos ao mesmo tempo num banco sintético (benchmarks.synthetic) —
+cada sessão com a própria conexão e a própria transação por evento (events.add_event direto,
+como antes) x todas pela fila do escritor único (mim_core.writer, group commit).
+Mostra eventos/s sustentados, erros de lock ("database is locked") e latência por evento até a
+confirmação do COMMIT.
+
+    python -m benchmarks.bench_event_queue [--sessions 8 32 64] [--events 200] [--think-ms 0]
+"""
+import argparse
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+AREAS = ["Coding", "Inglês", "Educação", "Saúde Física", "Produtividade", "Casa"]
+
+
+def _run(path: Path, sessions: int, per_session: int, think_s: float, record) -> dict:
+    """Dispara as sessões juntas; devolve eventos/s, erros e latências (ms) por evento."""
+    from mim_core import db
+
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(sessions + 1)
+    users = [f"bench.user{i % 2:03d}" for i in range(sessions)]  # usuários do synthetic (escala small: 2)
+
+    def session(i: int):
+        mine, failed = [], 0
+        start.wait()
+        for j in range(per_session):
+            t = time.perf_counter()
+            try:
+                record(date.today(), AREAS[(i + j) % len(AREAS)], 10, f"carga s{i} e{j}", users[i])
+            except sqlite3.OperationalError:
+                failed += 1
+            else:
+                mine.append((time.perf_counter() - t) * 1000)
+            if think_s:
+                time.sleep(think_s)
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+        db.get_conn(path)  # conexão desta thread volta a ser podada quando ela terminar
+
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for t in threads:
+        t.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    return {
+        "rate": len(latencies) / elapsed,
+        "errors": sum(errors),
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p99": latencies[int(len(latencies) * 0.99) - 1] if latencies else float("nan"),
+        "max": latencies[-1] if latencies else float("nan"),
+    }
+
+
+def main():
+    from benchmarks import synthetic
+    from mim_core import db, events
+    from mim_core.writer import start_event_writer
+
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--sessions", type=int, nargs="+", default=[8, 32, 64])
+    ap.add_argument("--events", type=int, default=200, help="eventos por sessão")
+    ap.add_argument("--think-ms", type=float, default=0.0, help="pausa de cada sessão entre dois eventos")
+    args = ap.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_event_queue_"))
+    try:
+        path = workdir / "bench.db"
+        synthetic.generate(path, synthetic.SCALES["small"])
+        print(f"{'sessões':>8} {'modo':<7}{'eventos/s':>11}{'erros':>7}{'p50':>10}{'p99':>10}{'máx':>10}  lotes")
+        for sessions in args.sessions:
+            direct = _run(path, sessions, args.events, args.think_ms / 1000,
+                          lambda d, a, xp, note, user: events.add_event(path, d, a, xp, note, user=user))
+            writer = start_event_writer(path)
+            queued = _run(path, sessions, args.events, args.think_ms / 1000,
+                          lambda d, a, xp, note, user: writer.add_event(d, a, xp, note, user=user).result())
+            writer.close()
+            for mode, r, extra in (("direto", direct, ""),
+                                   ("fila", queued, f"{writer.batches} (média {writer.jobs / max(writer.batches, 1):.1f}, "
+                                                    f"maior {writer.largest_batch})")):
+                print(f"{sessions:>8} {mode:<7}{r['rate']:>11.0f}{r['errors']:>7}{r['p50']:>7.2f} ms"
+                      f"{r['p99']:>7.2f} ms{r['max']:>7.1f} ms  {extra}")
+    finally:
+        db.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""
+Benchmark: custo de uma interação (clique / troca de widget) no dashboard — tempo de parede e
+número de comandos SQL — em três modos:
+
+- script:   o script antigo de página única (passe o arquivo em --script), que reexecuta tudo;
+- página:   o app multipage atual, reexecutando main() + a página aberta;
+- fragmento: só o corpo do painel (@st.fragment), que é o que o Streamlit executa quando o
+            widget clicado está dentro de um fragmento.
+
+Cada modo roda num subprocesso próprio (caches do Streamlit e versões de dados zerados), sobre
+uma cópia do banco do repositório com --events eventos sintéticos a mais.
+
+    git show <commit antigo>:Versao2_Mim_streamlit_app.py > /tmp/old_app.py
+    python -m benchmarks.bench_fragments [--script /tmp/old_app.py] [--events 20000] [--reps 5]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+APP = REPO / "Versao2_Mim_streamlit_app.py"
+USER = "marcel.pimenta"
+AREAS = ["Coding", "Inglês", "Educação", "Saúde Mental", "Saúde Física", "Finanças",
+         "Social", "Produtividade", "Criatividade", "Casa", "Lazer"]
+
+# interação -> (página, chamada do fragmento, ação no AppTest)
+INTERACTIONS = {
+    "resolução do gráfico": ("visao-geral", f"app._panel_xp_over_time.__wrapped__({USER!r})",
+                             ("select", f"freq_{USER}")),
+    "editar evento (ID)": ("registro", f"app._panel_event_editor.__wrapped__({USER!r})",
+                           ("select", f"edit_id_{USER}")),
+    "completar quest": ("quests", f"app._panel_quests.__wrapped__({USER!r})",
+                        ("click", f"comp_{USER}_")),
+    "ativar/desativar perk": ("perks", f"app._panel_perks.__wrapped__({USER!r})",
+                              ("click", f"activate_perk_{USER}_|deactivate_perk_{USER}_")),
+    "penalidade automática": ("penalidades", f"app._panel_penalty_settings.__wrapped__({USER!r})",
+                              ("toggle", f"penalize_{USER}")),
+}
+
+
+def prepare_db(workdir: Path, n_events: int) -> Path:
+    from mim_core import db
+
+    path = workdir / "versao2_mim.db"
+    shutil.copy(REPO / "versao2_mim.db", path)
+    db.migrate(path)
+    rnd = random.Random(42)
+    start = date.today() - timedelta(days=2 * 365)
+    with db.transaction(path) as c:
+        c.executemany(
+            "INSERT INTO events (date, area, xp, note, type, user) VALUES (?, ?, ?, ?, 'manual', ?)",
+            (((start + timedelta(days=rnd.randrange(2 * 365))).isoformat(), rnd.choice(AREAS),
+              rnd.randint(5, 80), "bench", USER) for _ in range(n_events)),
+        )
+    db.close_all()
+    return path
+
+
+class SqlCounter:
+    """Conta comandos SQL em todas as conexões do pool do mim_core.db (set_trace_callback)."""
+
+    def __init__(self):
+        self.n = 0
+
+    def _cb(self, _stmt):
+        self.n += 1
+
+    def install(self):
+        from mim_core import db
+
+        for pc in list(db._pool._conns.values()):
+            pc.conn.set_trace_callback(self._cb)
+
+
+def _act(at, action):
+    kind, key = action
+    if kind == "select":
+        w = at.selectbox(key=key)
+        # sempre troca de opção (o índice 0 pode ser o placeholder "Selecione um ID")
+        w.select_index((w.index or 0) % (len(w.options) - 1) + 1)
+    elif kind == "toggle":
+        w = at.checkbox(key=key)
+        w.uncheck() if w.value else w.check()
+    elif kind == "click":
+        prefixes = key.split("|")
+        buttons = [b for b in at.button if any((b.key or "").startswith(p) for p in prefixes)]
+        buttons[0].click()
+
+
+def _measure(at, action, reps: int):
+    counter = SqlCounter()
+    times, sqls = [], []
+    for _ in range(reps):
+        _act(at, action)
+        counter.install()
+        counter.n = 0
+        t = time.perf_counter()
+        at.run()
+        times.append(time.perf_counter() - t)
+        sqls.append(counter.n)
+        if at.exception:
+            raise RuntimeError(at.exception)
+    return statistics.median(times), statistics.median(sqls)
+
+
+def worker(mode: str, script: Path, n_events: int, reps: int) -> dict:
+    from streamlit.testing.v1 import AppTest
+    from streamlit.util import calc_hash
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_fragments_"))
+    os.chdir(workdir)  # DB_PATH do app é relativo ao diretório atual
+    prepare_db(workdir, n_events)
+    results = {}
+    try:
+        for name, (page, fragment_call, action) in INTERACTIONS.items():
+            if mode == "fragmento":
+                at = AppTest.from_string(
+                    f"import sys\nsys.path.insert(0, {str(REPO)!r})\n"
+                    f"import Versao2_Mim_streamlit_app as app\n{fragment_call}\n",
+                    default_timeout=120,
+                )
+            else:
+                at = AppTest.from_file(str(script), default_timeout=120)
+                at.session_state["user"] = USER
+                at.session_state["display_name"] = USER
+                if mode == "página":
+                    # páginas de st.navigation feitas de funções: o hash é o do url_path
+                    at._page_hash = calc_hash(page)
+            at.run()
+            at.run()  # aquece caches
+            results[name] = _measure(at, action, reps)
+    finally:
+        from mim_core import db
+
+        db.close_all()
+        os.chdir(REPO)
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--script", type=Path, help="script antigo de página única (modo 'script')")
+    ap.add_argument("--events", type=int, default=20000)
+    ap.add_argument("--reps", type=int, default=5)
+    ap.add_argument("--worker", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.worker:
+        script = args.script if args.worker == "script" else APP
+        print(json.dumps(worker(args.worker, script, args.events, args.reps)))
+        return
+
+    modes = (["script"] if args.script else []) + ["página", "fragmento"]
+    table = {}
+    for mode in modes:
+        cmd = [sys.executable, "-m", "benchmarks.bench_fragments", "--worker", mode,
+               "--events", str(args.events), "--reps", str(args.reps)]
+        if args.script:
+            cmd += ["--script", str(args.script.resolve())]
+        out = subprocess.run(cmd, cwd=REPO, capture_output=True, text=True, check=True).stdout
+        table[mode] = json.loads(out.strip().splitlines()[-1])
+
+    print(f"{'interação':<24}" + "".join(f"{m:>24}" for m in modes))
+    for name in INTERACTIONS:
+        cells = "".join(f"{table[m][name][0] * 1000:>12.0f} ms {table[m][name][1]:>4.0f} SQL" for m in modes)
+        print(f"{name:<24}{cells}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Benchmark: tempo de import (python -X importtime) de cada módulo do mim_core e do app, cada um num
+interpretador novo. Conta só o que o import acrescenta à inicialização do Python (os módulos que
+um `python -c pass` já carrega ficam de fora); mediana de --reps subprocessos, depois de um
+aquecimento que compila os .pyc. Para cada alvo, os pacotes que mais pesaram (soma do tempo
+próprio dos seus módulos) e quais dependências pesadas (streamlit, pandas, numpy, plotly) entraram.
+
+    python -m benchmarks.bench_importtime [--reps 5] [--top 3] [módulo ...]
+"""
+import argparse
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+APP_MODULE = "Versao2_Mim_streamlit_app"
+HEAVY = ("streamlit", "pandas", "numpy", "plotly")
+
+# domínio (sem pandas/plotly no import), análises (pandas/numpy) e o app
+TARGETS = (
+    "mim_core.db", "mim_core.dates", "mim_core.config", "mim_core.users", "mim_core.levels",
+    "mim_core.perks", "mim_core.events", "mim_core.metas", "mim_core.quests", "mim_core.penalties",
+    "mim_core.scheduler", "mim_core.profiler", "mim_core.event_log", "mim_core.export",
+    "mim_core.frames", "mim_core.streaks", "mim_core.badges", "mim_core.charts",
+    APP_MODULE,
+)
+
+
+def importtime(code: str) -> list:
+    """[(módulo, tempo próprio µs, cumulativo µs, profundidade)] do -X importtime de `code`."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO,
+                          capture_output=True, text=True, check=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def measure(module: str, startup: set) -> tuple:
+    """(ms do import, módulos carregados, {pacote: ms próprios}) descontando os da inicialização."""
+    rows = [r for r in importtime(f"import {module}") if r[0] not in startup]
+    total_us = sum(cumulative for _name, _self, cumulative, depth in rows if depth == 0)
+    by_package = defaultdict(int)
+    for name, self_us, _cumulative, _depth in rows:
+        by_package[name.split(".")[0]] += self_us
+    return total_us / 1000, [r[0] for r in rows], {k: v / 1000 for k, v in by_package.items()}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("modules", nargs="*", default=list(TARGETS))
+    ap.add_argument("--reps", type=int, default=5)
+    ap.add_argument("--top", type=int, default=3, help="pacotes mais pesados listados por alvo")
+    args = ap.parse_args()
+
+    startup = {r[0] for r in importtime("pass")}
+    print(f"{'alvo':<28}{'import':>10}{'módulos':>9}  pesados / pacotes que mais pesaram")
+    for module in args.modules:
+        measure(module, startup)  # aquecimento: .pyc compilados fora da medição
+        runs = [measure(module, startup) for _ in range(args.reps)]
+        ms = statistics.median(r[0] for r in runs)
+        _ms, names, by_package = runs[-1]
+        heavy = [h for h in HEAVY if h in {n.split(".")[0] for n in names}]
+        top = sorted(by_package.items(), key=lambda kv: -kv[1])[:args.top]
+        print(f"{module:<28}{ms:>7.1f} ms{len(names):>9}  {', '.join(heavy) or '-'} / "
+              + ", ".join(f"{pkg} {pkg_ms:.0f} ms" for pkg, pkg_ms in top))
+
+
+if __name__ == "__main__":
+    main()
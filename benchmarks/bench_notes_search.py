@@ -0,0 +1,133 @@
+"""
+Benchmark: busca nas notas com FTS5 (mim_core.event_log.search_notes) x LIKE '%termo%' sobre
+--events notas sintéticas no formato das do app ("Quest: ...", "Penalidade: ...", "[Bônus
+aplicado: ...]", texto livre). Mede também o custo do índice: carga com os triggers do FTS,
+'rebuild' a partir de events e o espaço ocupado. O LIKE ordena por data e para nos 50 primeiros
+achados; a busca ordena por relevância (bm25 nas RANK_WINDOW ocorrências mais recentes; a última
+linha mostra o bm25 sobre todas). Mediana de --reps execuções, num banco temporário.
+
+    python -m benchmarks.bench_notes_search [--events 500000] [--reps 7]
+"""
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from mim_core import db
+from mim_core.event_log import RANK_WINDOW, EventFilter, search_notes
+
+USER = "bench.user"
+AREAS = ["Coding", "Inglês", "Educação", "Saúde Mental", "Saúde Física", "Finanças",
+         "Social", "Produtividade", "Criatividade", "Casa", "Lazer"]
+WORDS = ("estudo leitura revisão treino corrida academia reunião projeto relatório entrevista "
+         "meditação terapia orçamento investimento jantar amigos família limpeza cozinha música "
+         "desenho escrita artigo curso aula vocabulário podcast caminhada alongamento planejamento").split()
+QUESTS = ["Ler 20 páginas", "Treino de força", "Revisar flashcards", "Processar produção", "Meditar 10 min"]
+
+
+def _note(rnd: random.Random, i: int) -> str:
+    kind = rnd.random()
+    if kind < 0.25:
+        note = f"Quest: {rnd.choice(QUESTS)}"
+    elif kind < 0.35:
+        note = f"Penalidade: missed Meta diária: {rnd.choice(AREAS)}"
+    else:
+        note = " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(3, 12)))
+    if rnd.random() < 0.1:
+        note += f" [Bônus aplicado: original {rnd.randint(10, 100)} -> {rnd.randint(11, 130)} XP]"
+    if i % 50_000 == 0:
+        note += " zeppelin"  # termo raro: poucos resultados
+    return note
+
+
+def prepare_db(path: Path, n_events: int) -> float:
+    """Carrega os eventos (com os triggers do FTS ativos); retorna o tempo da carga."""
+    db.migrate(path)
+    rnd = random.Random(42)
+    start = date.today() - timedelta(days=10 * 365)
+    rows = [((start + timedelta(days=rnd.randrange(10 * 365))).isoformat(), rnd.choice(AREAS),
+             rnd.randint(-20, 120), _note(rnd, i), "manual", USER) for i in range(n_events)]
+    t = time.perf_counter()
+    with db.transaction(path) as c:
+        c.executemany("INSERT INTO events (date, area, xp, note, type, user) VALUES (?, ?, ?, ?, ?, ?)", rows)
+    return time.perf_counter() - t
+
+
+def _fts_bytes(conn) -> int:
+    page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+    pages = conn.execute("SELECT COUNT(*) FROM dbstat WHERE name LIKE 'events_fts%'").fetchone()[0]
+    return pages * page_size
+
+
+def _like(conn, term: str, flt: EventFilter = EventFilter()):
+    conds, params = flt.where()
+    where = "".join(f" AND {cond}" for cond in conds)
+    return conn.execute(
+        f"SELECT id, date, area, xp, note FROM events WHERE user = ? AND note LIKE ?{where} ORDER BY date DESC LIMIT 50",
+        (USER, f"%{term}%", *params),
+    ).fetchall()
+
+
+def _timed(fn, reps: int) -> float:
+    times = []
+    for _ in range(reps):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--events", type=int, default=500_000)
+    ap.add_argument("--reps", type=int, default=7)
+    args = ap.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_notes_search_"))
+    try:
+        path = workdir / "bench.db"
+        load = prepare_db(path, args.events)
+        conn = db.get_conn(path)
+        with db.transaction(path) as c:
+            c.execute("DROP TRIGGER trg_events_fts_insert")
+            c.execute("DELETE FROM events")
+        # mesma carga sem o trigger do FTS, para isolar o custo de manter o índice
+        load_plain = prepare_db(path, args.events)
+        t = time.perf_counter()
+        db.rebuild_search_index(path)
+        rebuild = time.perf_counter() - t
+        print(f"{args.events} notas")
+        print(f"carga com triggers do FTS {load:8.2f} s   sem {load_plain:8.2f} s   rebuild {rebuild:6.2f} s")
+        try:
+            print(f"índice events_fts: {_fts_bytes(conn) / 1e6:.1f} MB")
+        except db.sqlite3.OperationalError:
+            pass  # SQLite compilado sem dbstat
+
+        recent = EventFilter(start=date.today() - timedelta(days=365), areas=("Coding",))
+        # (consulta, termos, filtro, janela do ranking)
+        cases = [
+            ("termo raro", "zeppelin", EventFilter(), RANK_WINDOW),
+            ("termo comum", "treino", EventFilter(), RANK_WINDOW),
+            ("dois termos", "bonus aplicado", EventFilter(), RANK_WINDOW),
+            ("prefixo", "medit", EventFilter(), RANK_WINDOW),
+            ("comum + área + 1 ano", "treino", recent, RANK_WINDOW),
+            ("comum, bm25 em tudo", "treino", EventFilter(), args.events),
+        ]
+        print(f"\n{'consulta':<24}{'resultados':>11}{'FTS5':>12}{'LIKE':>12}{'speedup':>10}")
+        for name, text, flt, window in cases:
+            hits = len(search_notes(conn, USER, text, flt, window=window))
+            t_fts = _timed(lambda: search_notes(conn, USER, text, flt, window=window), args.reps)
+            like_term = "Bônus aplicado" if text == "bonus aplicado" else text
+            t_like = _timed(lambda: _like(conn, like_term, flt), args.reps)
+            print(f"{name:<24}{hits:>11}{t_fts * 1000:>9.2f} ms{t_like * 1000:>9.2f} ms{t_like / t_fts:>9.1f}x")
+    finally:
+        db.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark: custo do modo diagnóstico (mim_core.profiler) no render headless (streamlit.testing AppTest)
+de cada página, sobre um banco sintético (benchmarks.synthetic) — modo desligado x ligado (seções
+cronometradas + trace do SQL). Com o modo desligado, o custo das seções é estimado multiplicando as
+chamadas de section()/@profiled de um rerun (contadas com o modo ligado) pelo custo medido de
+cada uma desligada (section() e @profiled contra o mesmo código sem instrumentação). Mediana de
+--reps reruns por página, com os caches já quentes.
+
+    python -m benchmarks.bench_profiler [--scale small] [--reps 7]
+"""
+import argparse
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+
+
+def _timed(fn, reps: int) -> float:
+    times = []
+    for _ in range(reps):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    return statistics.median(times)
+
+
+def _off_cost_us(calls: int = 200_000) -> tuple:
+    """
+    Custo por chamada com o modo desligado (µs): section() contra um bloco vazio e @profiled
+    contra a mesma função sem o decorator.
+    """
+    from mim_core.profiler import profiled, section
+
+    def plain():
+        return None
+
+    wrapped = profiled(plain)
+    t = time.perf_counter()
+    for _ in range(calls):
+        with section("x"):
+            pass
+    off_section = time.perf_counter() - t
+    t = time.perf_counter()
+    for _ in range(calls):
+        wrapped()
+    off_profiled = time.perf_counter() - t
+    t = time.perf_counter()
+    for _ in range(calls):
+        plain()
+    baseline = time.perf_counter() - t
+    return off_section / calls * 1e6, (off_profiled - baseline) / calls * 1e6
+
+
+def main():
+    from benchmarks import synthetic
+
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--scale", choices=sorted(synthetic.SCALES), default="small")
+    ap.add_argument("--reps", type=int, default=7)
+    args = ap.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_profiler_"))
+    try:
+        path = workdir / "bench.db"
+        synthetic.generate(path, synthetic.SCALES[args.scale])
+        os.environ["MIM_DB_PATH"] = str(path)
+        from streamlit import logger as st_logger
+
+        st_logger.set_log_level("error")
+        from streamlit.testing.v1 import AppTest
+        from streamlit.util import calc_hash
+
+        import Versao2_Mim_streamlit_app as app
+
+        user = synthetic.username(0)
+        at = AppTest.from_file(str(REPO / "Versao2_Mim_streamlit_app.py"), default_timeout=300)
+        at.run()
+        at.session_state["user"] = user
+        at.session_state["display_name"] = user
+        at.run()
+        toggle = at.checkbox(key=f"profiler_{user}")
+        off_us, off_profiled_us = _off_cost_us()
+        print(f"modo desligado: section() {off_us:.3f} µs, @profiled {off_profiled_us:.3f} µs por chamada (meta: < 5 µs)")
+        print(f"\n{'página':<14}{'desligado':>12}{'ligado':>12}{'SQL':>6}{'seções':>8}{'custo desligado':>17}")
+        for _fn, title, url in app.PAGES:
+            at._page_hash = calc_hash(url)
+            toggle.uncheck()
+            at.run()
+            off = _timed(at.run, args.reps)
+            toggle = at.checkbox(key=f"profiler_{user}")
+            toggle.check()
+            at.run()
+            on = _timed(at.run, args.reps)
+            run = at.session_state["_profiler"].history[-1]
+            calls = sum(calls for _path, calls, _ms, _sql in run.top_sections(len(run.sections)))
+            print(f"{title:<14}{off * 1000:>9.1f} ms{on * 1000:>9.1f} ms{run.statements:>6}{calls:>8}"
+                  f"{calls * off_us / 1000:>14.3f} ms")
+            toggle = at.checkbox(key=f"profiler_{user}")
+    finally:
+        from mim_core import db
+
+        db.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
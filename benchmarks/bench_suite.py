@@ -0,0 +1,228 @@
+"""
+Suíte de benchmarks do Versão 2.0 de Mim: gera bancos sintéticos determinísticos
+(benchmarks.synthetic) em várias escalas, cronometra as funções centrais do app e o render
+completo, headless (streamlit.testing AppTest), de cada página, e grava tudo em JSON para
+comparar entre commits.
+
+Cada escala roda num subprocesso próprio (caches do Streamlit e versões de dados do mim_core.db
+zerados), com o app apontado para o banco sintético por MIM_DB_PATH. Funções com cache aparecem
+duas vezes: "frio" (st.cache_data limpo antes de cada repetição) e "cache". Tempos em ms
+(mediana e mínimo de --reps repetições).
+
+As penalidades por meta (antes check_and_apply_goal_penalties, no rerun) são medidas pelo
+scheduler.run_due, que as aplica hoje; os badges, por load_badges (avaliação completa e
+incremental); o gráfico ao longo do tempo, por xp_time_figure.
+
+    python -m benchmarks.bench_suite [--scales small medium] [--reps 5] [--out resultados.json]
+    python -m benchmarks.bench_suite --compare antes.json depois.json
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, datetime
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+APP = REPO / "Versao2_Mim_streamlit_app.py"
+RESULTS_DIR = REPO / "benchmarks" / "results"
+
+
+def _timed(fn, reps: int, setup=None) -> dict:
+    times = []
+    for _ in range(reps):
+        if setup is not None:
+            setup()
+        t = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - t) * 1000)
+    return {"median": round(statistics.median(times), 3), "min": round(min(times), 3), "reps": reps}
+
+
+def _cases(app, path: Path, user: str) -> list:
+    """(nome, função, setup) das funções centrais, na ordem em que são medidas."""
+    import streamlit as st
+
+    from mim_core import badges, events, levels, metas, perks
+    from mim_core.event_log import fetch_page, search_notes
+    from mim_core.db import get_conn
+
+    def cold():
+        st.cache_data.clear()
+
+    def reset_badges():
+        badges.reset_badges(path, user)
+        st.cache_data.clear()
+
+    areas = app.AREAS_DEFAULT
+    user_metas = [m for m in metas.get_metas_for_user(path, user).to_dict("records") if m.get("user") == user]
+    totals = range(0, 200_000, 20)
+    cases = []
+    for name, fn in (
+        ("load_daily_xp", lambda: app.load_daily_xp(user)),
+        ("load_quests", lambda: app.load_quests(user)),
+        ("xp_time_figure('D')", lambda: app.xp_time_figure(user, "D")),
+        ("xp_time_figure('W', empilhado)", lambda: app.xp_time_figure(user, "W", stacked=True)),
+        ("area_figures", lambda: app.area_figures(user)),
+    ):
+        cases += [(f"{name} frio", fn, cold), (f"{name} cache", fn, None)]
+    cases += [
+        ("load_badges avaliação completa", lambda: app.load_badges(user), reset_badges),
+        ("load_badges incremental", lambda: badges.update_badges(path, user), None),
+        ("apply_perks_to_xp x1000", lambda: [perks.apply_perks_to_xp(path, areas[i % len(areas)], user, 50) for i in range(1000)], None),
+        (f"compute_week_progress_for_meta x{len(user_metas)}",
+         lambda: [metas.compute_week_progress_for_meta(path, m) for m in user_metas], None),
+        (f"level_from_xp x{len(totals)}", lambda: [levels.level_from_xp(x) for x in totals], None),
+        ("compute_area_xp_totals", lambda: events.compute_area_xp_totals(path, user), None),
+        ("fetch_page (1ª página)", lambda: fetch_page(get_conn(path), user), None),
+        ("search_notes('treino')", lambda: search_notes(get_conn(path), user, "treino"), None),
+    ]
+    return cases
+
+
+def _render_pages(user: str, reps: int) -> dict:
+    """Render headless de cada página: primeira execução com caches vazios e mediana das seguintes."""
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+    from streamlit.util import calc_hash
+
+    import Versao2_Mim_streamlit_app as app
+
+    at = AppTest.from_file(str(APP), default_timeout=300)
+    at.run()
+    at.session_state["user"] = user
+    at.session_state["display_name"] = user
+    results = {}
+    for _fn, title, url in app.PAGES:
+        at._page_hash = calc_hash(url)
+        st.cache_data.clear()
+        t = time.perf_counter()
+        at.run()
+        first = (time.perf_counter() - t) * 1000
+        if at.exception:
+            raise RuntimeError(f"{title}: {at.exception}")
+        results[f"render {title} frio"] = {"median": round(first, 3), "min": round(first, 3), "reps": 1}
+        results[f"render {title} cache"] = _timed(at.run, reps)
+    return results
+
+
+def worker(scale_name: str, reps: int, seed: int) -> dict:
+    from benchmarks import synthetic
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_suite_"))
+    path = workdir / "bench.db"
+    t = time.perf_counter()
+    counts = synthetic.generate(path, synthetic.SCALES[scale_name], seed)
+    generate_s = time.perf_counter() - t
+
+    os.environ["MIM_DB_PATH"] = str(path)
+    from streamlit import logger as st_logger
+
+    st_logger.set_log_level("error")  # sem runtime, cada st.cache_data avisa que usa cache em memória
+    import Versao2_Mim_streamlit_app as app
+    from mim_core import db, scheduler
+
+    user = synthetic.username(0)
+    app.bootstrap_db(str(path))
+    timings = {}
+    for name, fn, setup in _cases(app, path, user):
+        timings[name] = _timed(fn, reps, setup)
+    # penalidades automáticas: a primeira execução avalia os períodos fechados de todos os usuários
+    runs = []
+    timings["run_due primeira execução"] = _timed(lambda: runs.extend(scheduler.run_due(path)), 1)
+    timings["run_due primeira execução"]["periods"] = len(runs)
+    timings["run_due sem pendências"] = _timed(lambda: scheduler.run_due(path), reps)
+    # o agendador do app (thread) já não encontra nada pendente: não disputa com o render
+    timings.update(_render_pages(user, reps))
+    db.close_all()  # checkpoint do WAL: o tamanho do arquivo passa a incluir tudo
+    db_mb = path.stat().st_size / 1e6
+    shutil.rmtree(workdir, ignore_errors=True)
+    return {"counts": counts, "generate_s": round(generate_s, 3), "db_mb": round(db_mb, 2), "timings_ms": timings}
+
+
+def _git(*args) -> str:
+    try:
+        return subprocess.run(["git", *args], cwd=REPO, capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return ""
+
+
+def _environment() -> dict:
+    import pandas
+    import streamlit
+
+    commit = _git("rev-parse", "--short", "HEAD")
+    return {
+        "commit": commit,
+        "dirty": bool(_git("status", "--porcelain", "--untracked-files=no")),
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "today": date.today().isoformat(),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "pandas": pandas.__version__,
+        "streamlit": streamlit.__version__,
+        "machine": platform.machine(),
+    }
+
+
+def compare(before: dict, after: dict):
+    """Tabela lado a lado (medianas) de dois JSON da suíte, por escala e caso."""
+    print(f"antes: {before['environment']['commit']}   depois: {after['environment']['commit']}")
+    for scale, res in after["scales"].items():
+        old = before["scales"].get(scale, {}).get("timings_ms", {})
+        print(f"\n[{scale}]\n{'caso':<46}{'antes':>12}{'depois':>12}{'razão':>9}")
+        for name, t in res["timings_ms"].items():
+            if name in old:
+                ratio = t["median"] / old[name]["median"] if old[name]["median"] else float("nan")
+                print(f"{name:<46}{old[name]['median']:>9.2f} ms{t['median']:>9.2f} ms{ratio:>8.2f}x")
+            else:
+                print(f"{name:<46}{'—':>12}{t['median']:>9.2f} ms")
+
+
+def main():
+    from benchmarks.synthetic import SCALES
+
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--scales", nargs="+", choices=sorted(SCALES), default=["small", "medium"])
+    ap.add_argument("--reps", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--out", type=Path, help=f"JSON de saída (padrão: {RESULTS_DIR.relative_to(REPO)}/<commit>.json)")
+    ap.add_argument("--compare", nargs=2, type=Path, metavar=("ANTES", "DEPOIS"))
+    ap.add_argument("--worker", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.compare:
+        before, after = (json.loads(p.read_text(encoding="utf-8")) for p in args.compare)
+        compare(before, after)
+        return
+    if args.worker:
+        print(json.dumps(worker(args.worker, args.reps, args.seed)))
+        return
+
+    report = {"environment": _environment(), "reps": args.reps, "seed": args.seed, "scales": {}}
+    for scale in args.scales:
+        cmd = [sys.executable, "-m", "benchmarks.bench_suite", "--worker", scale,
+               "--reps", str(args.reps), "--seed", str(args.seed)]
+        out = subprocess.run(cmd, cwd=REPO, capture_output=True, text=True, check=True).stdout
+        res = report["scales"][scale] = json.loads(out.strip().splitlines()[-1])
+        print(f"\n[{scale}] {res['counts']['events']} eventos, {res['counts']['users']} usuários, "
+              f"banco de {res['db_mb']} MB gerado em {res['generate_s']:.1f} s")
+        for name, t in res["timings_ms"].items():
+            print(f"  {name:<46}{t['median']:>10.2f} ms")
+
+    env = report["environment"]
+    out = args.out or RESULTS_DIR / f"{env['commit'] or 'sem-commit'}{'-dirty' if env['dirty'] else ''}.json"
+    out.parent.mkdir(parents=True, exist_ok=True)
+    out.write_text(json.dumps(report, indent=2, ensure_ascii=False), encoding="utf-8")
+    print(f"\nresultados em {out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Teste de carga da camada de escrita (mim_core.db.transaction): sessões simuladas (threads) fazendo
+leitura-seguida-de-escrita num evento (como update_event e as exclusões do app), enquanto um job de
+fundo (como o agendador ou o cron) segura o lock de escrita por --job-hold-ms a cada --job-every-ms.
+
+- antes: BEGIN adiado + busy_timeout=5 s do SQLite, numa conexão por sessão (o comportamento antigo);
+- agora: transaction(), com BEGIN IMMEDIATE, novas tentativas com backoff e jitter e prazo total.
+
+Mostra escritas/s, erros "database is locked", latência por escrita e as métricas de write_stats().
+
+    python -m benchmarks.bench_write_retry [--sessions 8 32] [--writes 100] [--job-hold-ms 20]
+"""
+import argparse
+import random
+import shutil
+import sqlite3
+import statistics
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+
+def _old_write(conn: sqlite3.Connection, event_id: int, note: str):
+    conn.execute("BEGIN")
+    try:
+        conn.execute("SELECT xp FROM events WHERE id=?", (event_id,)).fetchone()
+        conn.execute("UPDATE events SET note=? WHERE id=?", (note, event_id))
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.rollback()
+        raise
+
+
+def _new_write(path: Path, event_id: int, note: str):
+    from mim_core import db
+
+    with db.transaction(path) as c:
+        c.execute("SELECT xp FROM events WHERE id=?", (event_id,)).fetchone()
+        c.execute("UPDATE events SET note=? WHERE id=?", (note, event_id))
+
+
+def _background_job(path: Path, hold_s: float, every_s: float, stop: threading.Event):
+    """Outro processo/agendador: pega o lock de escrita e o segura por `hold_s`."""
+    conn = sqlite3.connect(str(path), timeout=30, isolation_level=None)
+    while not stop.is_set():
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE job_runs SET detail=detail WHERE id=0")
+        time.sleep(hold_s)
+        conn.execute("COMMIT")
+        stop.wait(every_s)
+    conn.close()
+
+
+def _run(path: Path, mode: str, sessions: int, writes: int, ids: list, hold_s: float, every_s: float) -> dict:
+    latencies, errors = [], []
+    lock = threading.Lock()
+    start = threading.Barrier(sessions + 1)
+
+    def session(i: int):
+        rnd = random.Random(i)
+        conn = None
+        if mode == "antes":
+            conn = sqlite3.connect(str(path), timeout=5, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA busy_timeout=5000")
+        mine, failed = [], 0
+        start.wait()
+        for j in range(writes):
+            event_id = rnd.choice(ids)
+            t = time.perf_counter()
+            try:
+                if conn is not None:
+                    _old_write(conn, event_id, f"s{i} w{j}")
+                else:
+                    _new_write(path, event_id, f"s{i} w{j}")
+            except sqlite3.OperationalError:
+                failed += 1
+            else:
+                mine.append((time.perf_counter() - t) * 1000)
+        if conn is not None:
+            conn.close()
+        with lock:
+            latencies.extend(mine)
+            errors.append(failed)
+
+    stop = threading.Event()
+    job = threading.Thread(target=_background_job, args=(path, hold_s, every_s, stop))
+    threads = [threading.Thread(target=session, args=(i,)) for i in range(sessions)]
+    for t in threads:
+        t.start()
+    job.start()
+    start.wait()
+    t0 = time.perf_counter()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - t0
+    stop.set()
+    job.join()
+    latencies.sort()
+    return {
+        "rate": len(latencies) / elapsed,
+        "errors": sum(errors),
+        "p50": statistics.median(latencies) if latencies else float("nan"),
+        "p99": latencies[max(int(len(latencies) * 0.99) - 1, 0)] if latencies else float("nan"),
+        "max": latencies[-1] if latencies else float("nan"),
+    }
+
+
+def main():
+    from benchmarks import synthetic
+    from mim_core import db
+
+    ap = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    ap.add_argument("--sessions", type=int, nargs="+", default=[8, 32])
+    ap.add_argument("--writes", type=int, default=100, help="escritas por sessão")
+    ap.add_argument("--job-hold-ms", type=float, default=20.0)
+    ap.add_argument("--job-every-ms", type=float, default=50.0)
+    args = ap.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix="bench_write_retry_"))
+    try:
+        path = workdir / "bench.db"
+        synthetic.generate(path, synthetic.SCALES["small"])
+        ids = [r[0] for r in db.get_conn(path).execute("SELECT id FROM events ORDER BY id LIMIT 5000")]
+        hold_s, every_s = args.job_hold_ms / 1000, args.job_every_ms / 1000
+        print(f"job de fundo: lock de escrita por {args.job_hold_ms:.0f} ms a cada {args.job_every_ms:.0f} ms")
+        print(f"{'sessões':>8} {'modo':<7}{'escritas/s':>11}{'erros':>7}{'p50':>10}{'p99':>10}{'máx':>11}  novas tentativas")
+        for sessions in args.sessions:
+            for mode in ("antes", "agora"):
+                db.reset_write_stats()
+                r = _run(path, mode, sessions, args.writes, ids, hold_s, every_s)
+                ws = db.write_stats()
+                extra = "" if mode == "antes" else (
+                    f"{ws['retries']} em {ws['retried']} transações, espera média "
+                    f"{ws['wait_ms'] / max(ws['transactions'], 1):.1f} ms, {ws['timeouts']} desistências")
+                print(f"{sessions:>8} {mode:<7}{r['rate']:>11.0f}{r['errors']:>7}{r['p50']:>7.2f} ms"
+                      f"{r['p99']:>7.1f} ms{r['max']:>8.0f} ms  {extra}")
+    finally:
+        db.close_all()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+"""
+Gerador determinístico de bancos sintéticos do Versão 2.0 de Mim.
+
+Cria N usuários com anos de histórico: eventos diários espalhados pelas áreas padrão (manuais,
+de quest, de meta e penalidades), quests com o log de conclusões, metas, perks (algumas ativas),
+penalidades com o histórico de aplicações e a configuração de penalidades automáticas e metas
+semanais. O conteúdo depende só da escala, da semente e do último dia (`until`): a mesma
+combinação gera os mesmos dados (fora as colunas created_at, que o SQLite preenche).
+
+As escritas passam pelo esquema real (db.migrate) e pelos seus triggers — daily_xp, índice
+de busca das notas, marcas de reavaliação dos badges — como no app.
+
+    python -m benchmarks.synthetic <arquivo.db> [--scale small|medium|large] [--seed 0] [--until AAAA-MM-DD]
+"""
+import random
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from mim_core import db, users
+
+AREAS = ["Coding", "Inglês", "Educação", "Saúde Mental", "Saúde Física", "Finanças",
+         "Social", "Produtividade", "Criatividade", "Casa", "Lazer"]
+PASSWORD = "bench"  # senha de todos os usuários sintéticos
+WORDS = ("estudo leitura revisão treino corrida academia reunião projeto relatório entrevista "
+         "meditação terapia orçamento investimento jantar amigos família limpeza cozinha música "
+         "desenho escrita artigo curso aula vocabulário podcast caminhada alongamento planejamento").split()
+
+
+@dataclass(frozen=True)
+class Scale:
+    users: int
+    years: int
+    events_per_day: float  # média por usuário
+    quests: int = 6        # por usuário
+    metas: int = 4
+    perks: int = 3
+    penalties: int = 2
+
+
+SCALES = {
+    "small": Scale(users=2, years=1, events_per_day=3),
+    "medium": Scale(users=10, years=3, events_per_day=4),
+    "large": Scale(users=25, years=5, events_per_day=6),
+}
+
+
+def username(i: int) -> str:
+    return f"bench.user{i:03d}"
+
+
+def _note(rnd: random.Random) -> str:
+    return " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(2, 8)))
+
+
+def _user_rows(rnd: random.Random, user: str, scale: Scale, first: date, until: date) -> dict:
+    """Linhas de todas as tabelas para um usuário (listas de tuplas, na ordem das colunas do INSERT)."""
+    days = (until - first).days + 1
+    areas = rnd.sample(AREAS, k=rnd.randint(4, len(AREAS)))
+    weights = [rnd.random() + 0.2 for _ in areas]
+    rows = {k: [] for k in ("metas", "quests", "completions", "events", "perks", "penalties", "applications", "config")}
+
+    meta_areas = rnd.sample(areas, k=min(scale.metas, len(areas)))
+    for area in meta_areas:
+        rows["metas"].append((area, rnd.choice([100, 150, 200, 300]), f"Meta {area}", rnd.choice([0, 20, 30]), 1, user,
+                              first.isoformat()))
+        rows["config"].append((user, f"goal_weekly_{area}", str(rnd.choice([100, 150, 200]))))
+    rows["config"] += [(user, "penalty_active", "true"), (user, "penalty_weekly_active", "true"),
+                       (user, "penalty_amount", "10")]
+
+    # quests: (título, área, xp, cadência, probabilidade de conclusão por período)
+    quests = []
+    for q in range(scale.quests):
+        cadence = ("daily", "daily", "weekly", "once")[q % 4]
+        quests.append((f"Quest {q + 1} de {user}", rnd.choice(areas), rnd.choice([10, 20, 30, 50]), cadence,
+                       rnd.uniform(0.4, 0.95)))
+    for title, area, xp, cadence, _p in quests:
+        rows["quests"].append((title, area, xp, cadence, 1, user))
+
+    for d in range(days):
+        day = first + timedelta(days=d)
+        iso = day.isoformat()
+        # eventos manuais: contagem aproximadamente Poisson em torno da média da escala
+        n = sum(1 for _ in range(int(scale.events_per_day * 2)) if rnd.random() < 0.5)
+        for area in rnd.choices(areas, weights=weights, k=n):
+            meta_id = meta_areas.index(area) + 1 if area in meta_areas and rnd.random() < 0.3 else None
+            rows["events"].append((iso, area, rnd.randint(5, 80), _note(rnd), "meta" if meta_id else "manual",
+                                   user, meta_id))
+        for qi, (title, area, xp, cadence, p) in enumerate(quests):
+            due = cadence == "daily" or (cadence == "weekly" and day.weekday() == 6) or (cadence == "once" and d == days // 2)
+            if due and rnd.random() < p:
+                rows["completions"].append((qi, iso, len(rows["events"])))
+                rows["events"].append((iso, area, xp, f"Quest: {title}", "quest", user, None))
+        if day.weekday() == 0 and rnd.random() < 0.3:
+            pen = rnd.randrange(scale.penalties)
+            rows["applications"].append((pen, user, rnd.choice(areas), 20, f"{iso}T09:00:00"))
+            rows["events"].append((iso, rows["applications"][-1][2], -20, f"Penalidade: penalidade {pen + 1}",
+                                   "penalty", user, None))
+
+    for p in range(scale.perks):
+        active = p == 0
+        start = datetime.combine(until - timedelta(days=1), datetime.min.time()).isoformat() if active else None
+        rows["perks"].append((f"Perk {p + 1} de {user}", rnd.choice(areas), 0, "bônus de XP",
+                              rnd.choice([0, 3, 7]), rnd.choice([1.1, 1.25, 1.5]), start, int(active), user))
+    for p in range(scale.penalties):
+        rows["penalties"].append((f"Penalidade {p + 1}", rnd.choice(areas), 20, user))
+    return rows
+
+
+def generate(path: Path, scale: Scale, seed: int = 0, until: date = None) -> dict:
+    """
+    Cria (ou completa) o banco em `path` com os dados sintéticos da escala. Retorna contagens
+    por tabela. Usuários: bench.user000, bench.user001, ... (senha PASSWORD).
+    """
+    until = until or date.today()
+    first = until - timedelta(days=365 * scale.years - 1)
+    rnd = random.Random(seed)
+    db.migrate(path)
+    counts = {}
+    with db.transaction(path) as c:
+        for i in range(scale.users):
+            user = username(i)
+            rows = _user_rows(rnd, user, scale, first, until)
+            c.execute(
+                "INSERT INTO users (username, display_name, password_hash, role) VALUES (?, ?, ?, 'user')",
+                (user, f"Bench {i:03d}", users.hash_pw(PASSWORD)),
+            )
+            meta_ids = []
+            for r in rows["metas"]:
+                c.execute("INSERT INTO metas (area, weekly_target, note, daily_suggestion, active, user, created_at) "
+                          "VALUES (?, ?, ?, ?, ?, ?, ?)", r)
+                meta_ids.append(c.lastrowid)
+            quest_ids = []
+            for r in rows["quests"]:
+                c.execute("INSERT INTO quests (title, area, xp_reward, cadence, active, user) VALUES (?, ?, ?, ?, ?, ?)", r)
+                quest_ids.append(c.lastrowid)
+            first_event = c.execute("SELECT COALESCE(MAX(id), 0) + 1 FROM events").fetchone()[0]
+            c.executemany(
+                "INSERT INTO events (id, date, area, xp, note, type, user, meta_id) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                ((first_event + k, d, a, xp, note, t, u, meta_ids[m - 1] if m else None)
+                 for k, (d, a, xp, note, t, u, m) in enumerate(rows["events"])),
+            )
+            c.executemany(
+                "INSERT INTO quest_completions (quest_id, user, day, event_id) VALUES (?, ?, ?, ?)",
+                ((quest_ids[qi], user, day, first_event + k) for qi, day, k in rows["completions"]),
+            )
+            c.executemany(
+                "UPDATE quests SET last_done = (SELECT MAX(day) FROM quest_completions WHERE quest_id = quests.id) WHERE id = ?",
+                ((q,) for q in quest_ids),
+            )
+            c.executemany(
+                "INSERT INTO perks (name, area, unlock_level, effect, duration_days, multiplier, start_date, active, user) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows["perks"],
+            )
+            penalty_ids = []
+            for r in rows["penalties"]:
+                c.execute("INSERT INTO penalties (name, area, amount, user) VALUES (?, ?, ?, ?)", r)
+                penalty_ids.append(c.lastrowid)
+            c.executemany(
+                "INSERT INTO penalty_applications (penalty_id, penalty_name, user, area, amount, applied_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((penalty_ids[p], f"Penalidade {p + 1}", u, a, amt, at) for p, u, a, amt, at in rows["applications"]),
+            )
+            c.executemany("INSERT INTO user_config (user, key, value) VALUES (?, ?, ?)", rows["config"])
+            for table, key in (("users", None), ("metas", "metas"), ("quests", "quests"), ("quest_completions", "completions"),
+                               ("events", "events"), ("perks", "perks"), ("penalties", "penalties"),
+                               ("penalty_applications", "applications")):
+                counts[table] = counts.get(table, 0) + (len(rows[key]) if key else 1)
+        c.execute("ANALYZE")
+    return counts
+
+
+def _main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="python -m benchmarks.synthetic", description=__doc__.split("\n\n")[0])
+    ap.add_argument("db", type=Path)
+    ap.add_argument("--scale", choices=sorted(SCALES), default="small")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--until", type=date.fromisoformat, default=None)
+    args = ap.parse_args(argv)
+    if args.db.exists():
+        ap.error(f"{args.db} já existe")
+    counts = generate(args.db, SCALES[args.scale], args.seed, args.until)
+    db.close_all()
+    print(", ".join(f"{k}: {v}" for k, v in counts.items()))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
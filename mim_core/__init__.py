@@ -0,0 +1,10 @@
+"""
+Núcleo do Versão 2.0 de Mim, sem Streamlit: banco (db), níveis, perks, eventos, metas, quests,
+penalidades, usuários e configuração, mais as análises (frames, charts, badges, streaks) usadas
+pelo app, pelo agendador e pelas CLIs.
+
+As funções de domínio recebem o caminho do banco como primeiro argumento; cache e invalidação por
+rerun ficam no app. O pacote não importa nada aqui: `import mim_core.levels` carrega só o módulo
+pedido, e pandas/numpy/plotly entram apenas nos módulos de análise ou na primeira função que
+precisar deles.
+"""
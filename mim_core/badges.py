@@ -0,0 +1,326 @@
+"""
+Badges do Versão 2.0 de Mim: catálogo declarativo avaliado sobre o rollup daily_xp.
+
+Cada badge é uma regra (BadgeRule) de um de três tipos:
+
+- 'total':       XP acumulado acima de `threshold`;
+- 'window':      XP somado nos últimos `days` dias acima de `threshold`;
+- 'consistency': pelo menos `min_active` das últimas `weeks` semanas ISO com XP > 0.
+
+`area` restringe a regra a uma área; area='*' gera um badge por área que aparecer nos dados
+(id '<regra>:<área>'). O motor monta uma matriz dia x série (total + uma coluna por área), calcula
+cada métrica uma vez por (tipo, parâmetro) e testa todas as regras daquele grupo de uma vez — o
+custo cresce com o número de dias avaliados, quase nada com o número de regras.
+
+Badges ganhos ficam em `badges_earned` com a data em que a regra foi satisfeita pela primeira vez
+(earned_at) e nunca são retirados. `badge_evaluations` guarda até que dia cada usuário já foi
+avaliado: `update_badges` só examina os dias novos (carregando do rollup apenas a janela que as
+regras precisam olhar para trás). Escritas em daily_xp num dia já avaliado recuam essa marca por
+trigger (evento retroativo, import), e mudar o catálogo reavalia o histórico inteiro uma vez.
+
+    python -m mim_core.badges show [db] --user <usuário>
+    python -m mim_core.badges rebuild [db] [--user <usuário>]
+"""
+import hashlib
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+
+from mim_core.db import get_conn, mark_changed, transaction
+
+ALL_AREAS = "__all__"
+_EPOCH = date(1970, 1, 1)
+
+
+@dataclass(frozen=True)
+class BadgeRule:
+    id: str               # estável: é a chave em badges_earned
+    name: str
+    description: str      # pode usar {area} nas regras por área
+    kind: str             # 'total' | 'window' | 'consistency'
+    threshold: int = 0    # total/window: XP acima do qual (>) o badge é ganho
+    days: int = 0         # window: tamanho da janela móvel, em dias
+    weeks: int = 0        # consistency: semanas consideradas (a atual inclusa)
+    min_active: int = 0   # consistency: semanas com XP > 0 exigidas
+    area: str = None      # None = todas as áreas somadas; '*' = uma vez por área
+
+    @property
+    def lookback_days(self) -> int:
+        """Dias anteriores ao avaliado que a regra precisa enxergar."""
+        if self.kind == "window":
+            return self.days
+        if self.kind == "consistency":
+            return 7 * self.weeks + 7
+        return 0  # 'total' usa o acumulado anterior, lido já somado
+
+
+BADGE_CATALOG = (
+    BadgeRule("committed", "Committed", ">1000 XP", "total", threshold=1000),
+    BadgeRule("veteran", "Veteran", "+5000 XP", "total", threshold=5000),
+    BadgeRule("legend", "Legend", "+20000 XP", "total", threshold=20000),
+    BadgeRule("weekly_hero", "Weekly Hero", ">200 XP last 7d", "window", threshold=200, days=7),
+    BadgeRule("monthly_hero", "Monthly Hero", ">800 XP em 30 dias", "window", threshold=800, days=30),
+    BadgeRule("consistent", "Consistent", "Active 6/8 weeks", "consistency", weeks=8, min_active=6),
+    BadgeRule("unstoppable", "Unstoppable", "Ativo 12/12 semanas", "consistency", weeks=12, min_active=12),
+    BadgeRule("area_500", "Dedicação", "+500 XP em {area}", "total", threshold=500, area="*"),
+    BadgeRule("area_2000", "Especialista", "+2000 XP em {area}", "total", threshold=2000, area="*"),
+    BadgeRule("area_week", "Semana focada", ">150 XP em {area} em 7 dias", "window", threshold=150, days=7, area="*"),
+    BadgeRule("area_consistent", "Constância", "{area} ativa 4/4 semanas", "consistency", weeks=4, min_active=4, area="*"),
+)
+
+
+def catalog_digest(rules) -> str:
+    return hashlib.sha1(repr(tuple(rules)).encode("utf-8")).hexdigest()[:16]
+
+
+def _ordinal(d: date) -> int:
+    return (d - _EPOCH).days
+
+
+# ---------- Motor vetorizado
+def _metric(kind: str, param: int, X: np.ndarray, base: np.ndarray, day0: int) -> np.ndarray:
+    """Matriz dia x série com o valor da métrica em cada dia (comparado depois com o limiar)."""
+    S = np.cumsum(X, axis=0)
+    if kind == "total":
+        return base + S
+    S0 = np.vstack([np.zeros((1, X.shape[1]), dtype=X.dtype), S])  # S0[i] = soma dos dias < i
+    n = X.shape[0]
+    idx = np.arange(n)
+    if kind == "window":
+        return S0[idx + 1] - S0[np.maximum(idx + 1 - param, 0)]
+    # consistency: semanas ativas entre as últimas `param`, contando a semana corrente até o dia
+    week = (day0 + idx + 3) // 7            # semana ISO de cada dia (1970-01-01 foi quinta)
+    first = np.r_[0, np.flatnonzero(np.diff(week)) + 1]  # primeiro dia de cada semana
+    week_pos = np.cumsum(np.r_[0, np.diff(week) != 0])   # posição da semana de cada dia
+    partial = S0[idx + 1] - S0[first[week_pos]]
+    ends = np.r_[first[1:], n]
+    full_active = (S0[ends] - S0[first]) > 0               # semana inteira com XP > 0
+    C = np.vstack([np.zeros((1, X.shape[1]), dtype=np.int64), np.cumsum(full_active, axis=0)])
+    previous = C[week_pos] - C[np.maximum(week_pos - (param - 1), 0)]
+    return previous + (partial > 0)
+
+
+def evaluate(rules, days: np.ndarray, areas: np.ndarray, xp: np.ndarray, base: dict,
+             load_from: date, eval_from: date, eval_to: date) -> list:
+    """
+    Primeiro dia em [eval_from, eval_to] em que cada regra é satisfeita.
+    `days` (ordinais desde 1970-01-01), `areas` e `xp` são as linhas do rollup a partir de
+    `load_from` (que deve cobrir o lookback das regras); `base` = XP por área antes de `load_from`.
+    Retorna [(badge_id, regra, área ou None, dia do ganho)].
+    """
+    if eval_from > eval_to or not rules:
+        return []
+    day0 = _ordinal(load_from)
+    n_days = _ordinal(eval_to) - day0 + 1
+    area_names = sorted(set(map(str, areas)) | set(base))
+    series = [ALL_AREAS] + area_names
+    col = {a: i for i, a in enumerate(series)}
+
+    X = np.zeros((n_days, len(series)), dtype=np.int64)
+    if len(days):
+        rows = days.astype(np.int64) - day0
+        keep = (rows >= 0) & (rows < n_days)
+        cols = np.fromiter((col[str(a)] for a in areas), dtype=np.int64, count=len(areas))
+        np.add.at(X, (rows[keep], cols[keep]), xp.astype(np.int64)[keep])
+        X[:, 0] = X[:, 1:].sum(axis=1)
+    base_vec = np.array([sum(base.values())] + [base.get(a, 0) for a in area_names], dtype=np.int64)
+
+    # (regra, coluna, limiar) agrupados pela métrica que precisam
+    groups = {}
+    for rule in rules:
+        if rule.area == "*":
+            targets = area_names
+        elif rule.area is None:
+            targets = [ALL_AREAS]
+        else:
+            targets = [rule.area] if rule.area in col else []
+        if rule.kind == "consistency":
+            key, threshold = ("consistency", rule.weeks), rule.min_active - 1
+        elif rule.kind == "window":
+            key, threshold = ("window", rule.days), rule.threshold
+        else:
+            key, threshold = ("total", 0), rule.threshold
+        for a in targets:
+            groups.setdefault(key, []).append((rule, a, col[a], threshold))
+
+    start = _ordinal(eval_from) - day0
+    earned = []
+    for (kind, param), items in groups.items():
+        values = _metric(kind, param, X, base_vec, day0)[start:]
+        cols = np.array([c for _, _, c, _ in items])
+        thresholds = np.array([t for _, _, _, t in items], dtype=np.int64)
+        hit = values[:, cols] > thresholds           # dias x regras
+        any_hit = hit.any(axis=0)
+        first = hit.argmax(axis=0)
+        for (rule, a, _, _), ok, i in zip(items, any_hit, first):
+            if ok:
+                area = None if a == ALL_AREAS else a
+                badge_id = rule.id if rule.area != "*" else f"{rule.id}:{a}"
+                earned.append((badge_id, rule, area, eval_from + timedelta(days=int(i))))
+    return earned
+
+
+# ---------- Avaliação incremental no banco
+def _load_rollup(c, user: str, load_from: date, eval_to: date):
+    c.execute(
+        "SELECT area, SUM(xp_sum) FROM daily_xp WHERE user=? AND day < ? GROUP BY area",
+        (user, load_from.isoformat()),
+    )
+    base = {a: int(x or 0) for a, x in c.fetchall()}
+    c.execute(
+        "SELECT day, area, SUM(xp_sum) FROM daily_xp WHERE user=? AND day >= ? AND day <= ? GROUP BY day, area",
+        (user, load_from.isoformat(), eval_to.isoformat()),
+    )
+    rows = c.fetchall()
+    days = np.array([_ordinal(date.fromisoformat(r[0][:10])) for r in rows], dtype=np.int64)
+    areas = np.array([r[1] for r in rows], dtype=object)
+    xp = np.array([int(r[2] or 0) for r in rows], dtype=np.int64)
+    return base, days, areas, xp
+
+
+def update_badges(path: Path, user: str, today: date = None, rules=BADGE_CATALOG) -> int:
+    """
+    Avalia as regras ainda não ganhas só nos dias posteriores ao último avaliado (ou no histórico
+    inteiro, na primeira vez e quando o catálogo muda) e grava os novos badges. Retorna quantos.
+    """
+    today = today or date.today()
+    user = user or ""
+    digest = catalog_digest(rules)
+    with transaction(path) as c:
+        c.execute("SELECT catalog, evaluated_through FROM badge_evaluations WHERE user=?", (user,))
+        state = c.fetchone()
+        if state and state[0] == digest and state[1] >= today.isoformat():
+            return 0
+        if state and state[0] == digest:
+            eval_from = date.fromisoformat(state[1]) + timedelta(days=1)
+        else:
+            c.execute("SELECT MIN(day) FROM daily_xp WHERE user=?", (user,))
+            first_day = c.fetchone()[0]
+            eval_from = date.fromisoformat(first_day[:10]) if first_day else today
+        c.execute("SELECT badge_id FROM badges_earned WHERE user=?", (user,))
+        earned_ids = {r[0] for r in c.fetchall()}
+        # regras por área continuam pendentes enquanto houver área sem o badge
+        pending = [r for r in rules if r.area == "*" or r.id not in earned_ids]
+        new = []
+        if pending and eval_from <= today:
+            load_from = eval_from - timedelta(days=max(r.lookback_days for r in pending))
+            base, days, areas, xp = _load_rollup(c, user, load_from, today)
+            new = [e for e in evaluate(pending, days, areas, xp, base, load_from, eval_from, today)
+                   if e[0] not in earned_ids]
+            c.executemany(
+                "INSERT INTO badges_earned (user, badge_id, name, description, area, earned_at) "
+                "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT DO NOTHING",
+                [(user, badge_id, rule.name, rule.description.format(area=area or ""), area, day.isoformat())
+                 for badge_id, rule, area, day in new],
+            )
+        c.execute(
+            "INSERT INTO badge_evaluations (user, catalog, evaluated_through) VALUES (?, ?, ?) "
+            "ON CONFLICT(user) DO UPDATE SET catalog=excluded.catalog, evaluated_through=excluded.evaluated_through",
+            (user, digest, today.isoformat()),
+        )
+        if new:
+            mark_changed(path, "badges", user or None)
+    return len(new)
+
+
+def earned_badges(path: Path, user: str) -> list:
+    """Badges do usuário, mais recentes primeiro: [(badge_id, nome, descrição, área, earned_at)]."""
+    return get_conn(path).execute(
+        "SELECT badge_id, name, description, area, earned_at FROM badges_earned WHERE user=? "
+        "ORDER BY earned_at DESC, badge_id",
+        (user or "",),
+    ).fetchall()
+
+
+def reset_badges(path: Path, user: str = None):
+    """Apaga os badges e a marca de avaliação (de um usuário ou de todos) para reavaliar do zero."""
+    with transaction(path) as c:
+        if user is None:
+            c.execute("DELETE FROM badges_earned")
+            c.execute("DELETE FROM badge_evaluations")
+        else:
+            c.execute("DELETE FROM badges_earned WHERE user=?", (user,))
+            c.execute("DELETE FROM badge_evaluations WHERE user=?", (user,))
+        mark_changed(path, "badges", user)
+
+
+# ---------- Referência para os testes: laço em Python puro e catálogo grande
+def _loop_earned(rules, events: list, first: date, end: date) -> set:
+    """(badge_id, earned_at) recalculando cada métrica dia a dia, regra a regra, em Python puro."""
+    per_day = {}
+    for day, area, xp in events:
+        per_day.setdefault((date.fromisoformat(day), area), 0)
+        per_day[(date.fromisoformat(day), area)] += xp
+    areas = sorted({a for _, a in per_day})
+
+    def xp_between(a, lo, hi):  # dias em [lo, hi]
+        return sum(x for (d, area), x in per_day.items() if lo <= d <= hi and (a is None or area == a))
+
+    earned = set()
+    for rule in rules:
+        targets = areas if rule.area == "*" else [rule.area]
+        for a in targets:
+            d = first
+            while d <= end:
+                if rule.kind == "total":
+                    ok = xp_between(a, date.min, d) > rule.threshold
+                elif rule.kind == "window":
+                    ok = xp_between(a, d - timedelta(days=rule.days - 1), d) > rule.threshold
+                else:
+                    monday = d - timedelta(days=d.weekday())
+                    active = sum(xp_between(a, monday - timedelta(weeks=j), min(d, monday - timedelta(weeks=j) + timedelta(days=6))) > 0
+                                 for j in range(rule.weeks))
+                    ok = active >= rule.min_active
+                if ok:
+                    earned.add((rule.id if rule.area != "*" else f"{rule.id}:{a}", d.isoformat()))
+                    break
+                d += timedelta(days=1)
+    return earned
+
+
+def synthetic_catalog(n_rules: int = 300) -> tuple:
+    """Catálogo grande para testes de escala: limiares, janelas e consistência variados."""
+    rules = []
+    for i in range(n_rules):
+        kind = ("total", "window", "consistency")[i % 3]
+        area = (None, "*", "Coding")[(i // 3) % 3]
+        if kind == "total":
+            rules.append(BadgeRule(f"t{i}", f"T{i}", "", kind, threshold=100 * (i + 1), area=area))
+        elif kind == "window":
+            rules.append(BadgeRule(f"w{i}", f"W{i}", "", kind, threshold=50 + 7 * i, days=1 + i % 45, area=area))
+        else:
+            weeks = 1 + i % 12
+            rules.append(BadgeRule(f"c{i}", f"C{i}", "", kind, weeks=weeks, min_active=1 + i % weeks, area=area))
+    return tuple(rules)
+
+
+def _main(argv=None):
+    import argparse
+
+    from mim_core.db import migrate
+
+    ap = argparse.ArgumentParser(prog="python -m mim_core.badges", description="Badges do Versão 2.0 de Mim")
+    ap.add_argument("command", choices=["show", "rebuild"])
+    ap.add_argument("db", nargs="?", default="versao2_mim.db")
+    ap.add_argument("--user")
+    args = ap.parse_args(argv)
+
+    path = Path(args.db)
+    migrate(path)
+    if args.command == "rebuild":
+        reset_badges(path, args.user)
+        users = [args.user] if args.user else [r[0] for r in get_conn(path).execute("SELECT DISTINCT user FROM daily_xp")]
+        for user in users:
+            print(f"{user or '(sem usuário)'}: {update_badges(path, user)} badges")
+        return 0
+    if args.command == "show":
+        update_badges(path, args.user)
+        for badge_id, name, desc, _area, earned_at in earned_badges(path, args.user):
+            print(f"{earned_at}  {name:<16} {desc:<36} ({badge_id})")
+        return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -0,0 +1,186 @@
+"""
+Séries temporais dos gráficos do Versão 2.0 de Mim, com payload limitado.
+
+O gráfico "XP ao longo do tempo" não recebe mais a série inteira: o SQLite agrega o daily_xp na
+resolução pedida (dia, semana ISO, mês), os períodos sem XP são preenchidos com zero e, se ainda
+sobrarem mais pontos que o orçamento de pixels, a série passa por LTTB (Largest-Triangle-Three-
+Buckets), que mantém picos e vales visíveis com uma fração dos pontos. Séries longas usam
+Scattergl (WebGL) em vez de SVG.
+
+A variante empilhada por área agrega em baldes de tempo comuns a todas as áreas (média por período
+de cada balde, para o empilhamento continuar somando certo): o payload fica limitado a
+áreas x STACKED_POINT_BUDGET pontos, qualquer que seja o tamanho do histórico.
+
+O plotly só é importado quando uma figura é montada: quem usa só as séries (CLI, benchmarks) não
+paga o import.
+
+    python -m mim_core.charts check [db] --user <usuário>   # pontos e bytes de JSON por resolução
+"""
+from pathlib import Path
+
+from typing import TYPE_CHECKING
+
+import numpy as np
+import pandas as pd
+
+from mim_core.db import get_conn
+
+if TYPE_CHECKING:
+    import plotly.graph_objects as go
+
+POINT_BUDGET = 1500           # ~ largura útil do gráfico em pixels
+STACKED_POINT_BUDGET = 400    # por área, na variante empilhada
+WEBGL_MIN_POINTS = 1000       # a partir daqui, Scattergl
+
+# resolução -> (expressão SQL do início do período, frequência do pandas para preencher lacunas)
+RESOLUTIONS = {
+    "D": ("day", "D"),
+    "W": ("date(day, 'weekday 0', '-6 days')", "W-MON"),
+    "M": ("substr(day, 1, 7) || '-01'", "MS"),
+}
+
+
+def xp_series(conn, user: str, freq: str = "W", by_area: bool = False) -> pd.DataFrame:
+    """
+    XP por período (início do período), agregado no SQLite a partir do daily_xp, com os períodos
+    vazios zerados. Com `by_area`, uma coluna por área; senão, uma coluna 'xp'. Índice: datas.
+    """
+    period_sql, pandas_freq = RESOLUTIONS[freq]
+    if by_area:
+        sql = f"SELECT {period_sql} AS period, area, SUM(xp_sum) FROM daily_xp WHERE user=? GROUP BY 1, 2 ORDER BY 1"
+    else:
+        sql = f"SELECT {period_sql} AS period, SUM(xp_sum) FROM daily_xp WHERE user=? GROUP BY 1 ORDER BY 1"
+    rows = conn.execute(sql, (user or "",)).fetchall()
+    if not rows:
+        return pd.DataFrame(columns=["xp"], dtype="int64")
+    periods = pd.to_datetime([r[0] for r in rows], format="%Y-%m-%d")
+    full = pd.date_range(periods.min(), periods.max(), freq=pandas_freq)
+    if by_area:
+        df = pd.DataFrame({"period": periods, "area": [r[1] for r in rows], "xp": [int(r[2] or 0) for r in rows]})
+        wide = df.pivot_table(index="period", columns="area", values="xp", aggfunc="sum", fill_value=0)
+        return wide.reindex(full, fill_value=0).astype("int64")
+    s = pd.Series([int(r[1] or 0) for r in rows], index=periods, dtype="int64")
+    return s.reindex(full, fill_value=0).to_frame("xp")
+
+
+def lttb(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """
+    Índices dos `n_out` pontos escolhidos pelo Largest-Triangle-Three-Buckets (primeiro e último
+    sempre inclusos). `x` numérico e crescente. Com n_out >= len(x), devolve todos.
+    """
+    n = len(x)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # n_out - 2 baldes para os pontos do meio (1 .. n-2)
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.int64)
+    out = np.empty(n_out, dtype=np.int64)
+    out[0], out[-1] = 0, n - 1
+    a = 0
+    for i in range(n_out - 2):
+        lo, hi = edges[i], max(edges[i + 1], edges[i] + 1)
+        if i + 2 < len(edges):
+            nlo, nhi = edges[i + 1], max(edges[i + 2], edges[i + 1] + 1)
+            cx, cy = x[nlo:nhi].mean(), y[nlo:nhi].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        # área (x2) do triângulo (ponto escolhido antes, candidato, média do próximo balde)
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(area.argmax())
+        out[i + 1] = a
+    return out
+
+
+def bucket_means(series: pd.DataFrame, n_buckets: int) -> pd.DataFrame:
+    """Agrupa linhas consecutivas em até `n_buckets` baldes (média de cada coluna; índice = início do balde)."""
+    n = len(series)
+    if n <= n_buckets:
+        return series
+    bucket = (np.arange(n) * n_buckets) // n
+    out = series.groupby(bucket).mean()
+    out.index = series.index[np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])]
+    return out
+
+
+def xp_figure(series: pd.DataFrame, point_budget: int = POINT_BUDGET) -> "go.Figure":
+    """Linha do XP total por período, reduzida por LTTB ao orçamento de pontos."""
+    import plotly.graph_objects as go
+
+    x = series.index
+    y = series["xp"].to_numpy()
+    keep = lttb(x.asi8, y, point_budget)
+    trace = go.Scattergl if len(keep) >= WEBGL_MIN_POINTS else go.Scatter
+    fig = go.Figure(trace(x=x[keep].strftime("%Y-%m-%d"), y=y[keep], mode="lines", name="XP"))
+    title = "XP por período" if len(keep) == len(x) else f"XP por período ({len(keep)} de {len(x)} pontos, LTTB)"
+    fig.update_layout(title_text=title, xaxis_title="date", yaxis_title="xp")
+    return fig
+
+
+def stacked_xp_figure(series: pd.DataFrame, point_budget: int = STACKED_POINT_BUDGET) -> "go.Figure":
+    """Áreas empilhadas por período; históricos longos viram baldes comuns (média por período)."""
+    import plotly.graph_objects as go
+
+    buckets = bucket_means(series, point_budget)
+    x = buckets.index.strftime("%Y-%m-%d")
+    fig = go.Figure()
+    for area in buckets.columns:
+        fig.add_trace(go.Scatter(x=x, y=buckets[area].round(1).to_numpy(), mode="lines", name=str(area),
+                                 stackgroup="xp", line=dict(width=0.5)))
+    title = "XP por período e área"
+    if len(buckets) < len(series):
+        title += f" (média de {len(series) / len(buckets):.1f} períodos por ponto)"
+    fig.update_layout(title_text=title, xaxis_title="date", yaxis_title="xp")
+    return fig
+
+
+def build_xp_figure(conn, user: str, freq: str = "W", stacked: bool = False):
+    """Figura pronta do XP ao longo do tempo (None sem dados)."""
+    series = xp_series(conn, user, freq, by_area=stacked)
+    if series.empty:
+        return None
+    return stacked_xp_figure(series) if stacked else xp_figure(series)
+
+
+def area_figures(totals: pd.Series):
+    """Barras e radar do XP total por área ((None, None) sem XP)."""
+    import plotly.graph_objects as go
+
+    if totals.empty or totals.sum() == 0:
+        return None, None
+    fig_bar = go.Figure(go.Bar(x=list(totals.index), y=totals.to_numpy(), name="XP"))
+    fig_bar.update_layout(title_text="XP por área", xaxis_title="Área", yaxis_title="XP")
+    fig_radar = go.Figure()
+    fig_radar.add_trace(go.Scatterpolar(r=list(totals.values) + [totals.values[0]], theta=list(totals.index) + [totals.index[0]],
+                                        fill='toself', name='XP'))
+    fig_radar.update_layout(polar=dict(radialaxis=dict(visible=True)), showlegend=False, title_text='Radar de áreas')
+    return fig_bar, fig_radar
+
+
+def _main(argv=None):
+    import argparse
+
+    from mim_core.db import migrate
+
+    ap = argparse.ArgumentParser(prog="python -m mim_core.charts", description="Gráficos do Versão 2.0 de Mim")
+    ap.add_argument("command", choices=["check"])
+    ap.add_argument("db", nargs="?", default="versao2_mim.db")
+    ap.add_argument("--user")
+    args = ap.parse_args(argv)
+
+    path = Path(args.db)
+    migrate(path)
+    conn = get_conn(path)
+    for freq in RESOLUTIONS:
+        for stacked in (False, True):
+            series = xp_series(conn, args.user, freq, by_area=stacked)
+            fig = build_xp_figure(conn, args.user, freq, stacked)
+            size = len(fig.to_json()) if fig is not None else 0
+            points = sum(len(t.x) for t in fig.data) if fig is not None else 0
+            label = "empilhado" if stacked else "total"
+            print(f"{freq} {label:<10} {series.size:>8} valores -> {points:>6} pontos, {size / 1024:>8.1f} KiB de JSON")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
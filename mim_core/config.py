@@ -0,0 +1,65 @@
+"""
+Configuração persistente por usuário (tabela user_config) do Versão 2.0 de Mim.
+"""
+from datetime import date
+from pathlib import Path
+
+from mim_core.db import get_conn, mark_changed, transaction
+
+
+class UserSettings:
+    """
+    Todas as chaves de user_config de um usuário, lidas numa única consulta.
+    Os valores ficam gravados como texto; os acessores tipados convertem na leitura e caem no
+    default quando a chave não existe ou o texto não converte.
+    """
+
+    def __init__(self, user: str, values: dict):
+        self.user = user
+        self._values = values
+
+    def get(self, key: str, default=None):
+        return self._values.get(key, default)
+
+    def get_int(self, key: str, default: int = 0) -> int:
+        raw = self._values.get(key)
+        try:
+            return int(raw)
+        except (TypeError, ValueError):
+            try:
+                return int(float(raw))
+            except (TypeError, ValueError):
+                return default
+
+    def get_bool(self, key: str, default: bool = False) -> bool:
+        raw = self._values.get(key)
+        if raw is None:
+            return default
+        return raw.strip().lower() in ('true', '1')
+
+    def get_date(self, key: str, default: date = None) -> date:
+        try:
+            return date.fromisoformat(self._values[key])
+        except (KeyError, TypeError, ValueError):
+            return default
+
+
+def read_user_config(path: Path, user: str) -> dict:
+    """{chave: valor em texto} de todas as configurações do usuário."""
+    rows = get_conn(path).execute("SELECT key, value FROM user_config WHERE user=?", (user,)).fetchall()
+    return dict(rows)
+
+
+def load_user_settings(path: Path, user: str) -> UserSettings:
+    return UserSettings(user, read_user_config(path, user))
+
+
+def set_user_configs(path: Path, user: str, values: dict):
+    """Grava várias chaves de uma vez (executemany numa transação); invalida só as configurações de `user`."""
+    with transaction(path) as c:
+        c.executemany(
+            "INSERT INTO user_config (user, key, value) VALUES (?, ?, ?) "
+            "ON CONFLICT(user, key) DO UPDATE SET value=excluded.value",
+            [(user, key, str(value)) for key, value in values.items()],
+        )
+        mark_changed(path, "config", user)
@@ -0,0 +1,33 @@
+"""
+Datas do Versão 2.0 de Mim: leitura dos textos de data gravados no banco e semanas das metas.
+"""
+from datetime import date, datetime, timedelta
+
+
+def parse_datetime(value) -> datetime:
+    """
+    Texto de data/hora do banco -> datetime. O caso comum (isoformat, 'YYYY-MM-DD[ HH:MM:SS]') sai
+    do datetime.fromisoformat; formatos antigos caem no pd.to_datetime, importado só nesse caso.
+    Levanta ValueError/TypeError se o texto não for uma data.
+    """
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value))
+    except ValueError:
+        import pandas as pd
+
+        parsed = pd.to_datetime(value)
+        if parsed is pd.NaT:
+            raise ValueError(f"data inválida: {value!r}")
+        return parsed.to_pydatetime()
+
+
+def week_start_end_for_date(d: date):
+    """
+    Retorna (start_date, end_date) da semana corrente em que d está, com start = Monday.
+    end_date é inclusive (domingo).
+    """
+    start = d - timedelta(days=d.weekday())  # Monday
+    end = start + timedelta(days=6)
+    return start, end
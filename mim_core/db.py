@@ -0,0 +1,1064 @@
+"""
+Camada de acesso ao SQLite do Versão 2.0 de Mim.
+
+Em vez de cada helper abrir e fechar sua própria conexão (pagando abertura de arquivo
+e PRAGMAs a cada chamada), o app pede a conexão a este módulo:
+
+- `get_conn(path)` devolve uma conexão longa, uma por sessão do Streamlit (ou por thread,
+  quando chamado fora de uma sessão — CLI, scripts, threads de fundo);
+- `transaction(path)` é um context manager que abre BEGIN IMMEDIATE/COMMIT (ou ROLLBACK em caso de
+  erro) e pode ser aninhado: transações internas juntam-se à externa. É a camada de escrita: toda
+  escrita passa por ele, e o lock de escrita é pego no BEGIN — com novas tentativas (backoff
+  exponencial com jitter) até WRITE_DEADLINE_S quando o banco está ocupado, e métricas de
+  tentativas e espera por lock em `write_stats()`.
+
+Os PRAGMAs de desempenho (WAL, synchronous=NORMAL, cache_size, busy_timeout) são aplicados
+uma única vez, na abertura da conexão.
+
+O esquema é versionado em PRAGMA user_version: `migrate(path)` aplica, em ordem e uma única vez,
+as migrações numeradas de MIGRATIONS que ainda não rodaram naquele arquivo.
+"""
+import os
+import random
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+BUSY_TIMEOUT_MS = 50  # espera do próprio SQLite por um lock, a cada tentativa
+
+# PRAGMAs aplicados uma vez por conexão
+CONNECTION_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",       # leitores não bloqueiam o escritor (e vice-versa)
+    "PRAGMA synchronous=NORMAL",     # seguro em WAL, evita fsync a cada commit
+    "PRAGMA cache_size=-8000",       # ~8 MB de page cache (há uma conexão por sessão)
+    f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}",  # curta: o resto da espera é o backoff de transaction()
+)
+
+# Novas tentativas do BEGIN IMMEDIATE quando outro escritor tem o lock
+WRITE_DEADLINE_S = 5.0      # tempo total até desistir ('database is locked' para quem chamou)
+BACKOFF_BASE_S = 0.002      # espera máxima da 1ª nova tentativa; dobra a cada uma
+BACKOFF_MAX_S = 0.1         # teto da espera entre tentativas
+
+
+class PooledConnection:
+    """Conexão SQLite compartilhada + lock reentrante + profundidade de transação."""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        # isolation_level=None: autocommit; as transações são abertas explicitamente por transaction()
+        self.conn = sqlite3.connect(str(self.path), timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                                    isolation_level=None)
+        self.lock = threading.RLock()
+        self.depth = 0
+        self.pending_changes = set()  # (escopo, usuário) marcados dentro da transação aberta
+        for pragma in CONNECTION_PRAGMAS:
+            self.conn.execute(pragma)
+
+    def close(self):
+        try:
+            self.conn.close()
+        except Exception:
+            pass
+
+
+class ConnectionPool:
+    """
+    Guarda uma conexão por (arquivo, dono). O dono é a sessão do Streamlit quando há uma
+    ScriptRunContext ativa; caso contrário, a thread atual.
+    """
+
+    def __init__(self):
+        self._conns = {}
+        self._lock = threading.Lock()
+
+    def get(self, path: Path, owner) -> PooledConnection:
+        key = (_resolved(path), owner)
+        pc = self._conns.get(key)
+        if pc is not None:
+            return pc
+        with self._lock:
+            pc = self._conns.get(key)
+            if pc is None:
+                self._prune()
+                pc = PooledConnection(path)
+                self._conns[key] = pc
+        return pc
+
+    def _prune(self):
+        """Fecha conexões de sessões encerradas / threads mortas (chamado só ao abrir uma nova)."""
+        alive_threads = {t.ident for t in threading.enumerate()}
+        dead = []
+        for key in self._conns:
+            kind, ident = key[1]
+            if kind == "thread" and ident not in alive_threads:
+                dead.append(key)
+            elif kind == "session" and not _session_is_active(ident):
+                dead.append(key)
+        for key in dead:
+            self._conns.pop(key).close()
+
+    def close_all(self):
+        with self._lock:
+            for pc in self._conns.values():
+                pc.close()
+            self._conns.clear()
+
+
+_resolved_paths = {}
+
+
+def _resolved(path) -> str:
+    """Caminho absoluto do arquivo (memorizado: resolve() faz syscalls e roda a cada get_conn)."""
+    key = str(path)
+    resolved = _resolved_paths.get(key)
+    if resolved is None:
+        resolved = _resolved_paths[key] = str(Path(path).resolve())
+    return resolved
+
+
+def _session_is_active(session_id) -> bool:
+    try:
+        from streamlit import runtime
+        if not runtime.exists():
+            return False
+        return runtime.get_instance().is_active_session(session_id)
+    except Exception:
+        # na dúvida, mantém a conexão
+        return True
+
+
+_get_script_run_ctx = None
+
+
+def _ctx_getter():
+    """
+    get_script_run_ctx do Streamlit, importado só quando o processo já carregou o Streamlit: sem
+    ele não há sessão, e o import (~0,5 s) ficaria de fora de CLIs, agendador e scripts.
+    """
+    global _get_script_run_ctx
+    if _get_script_run_ctx is None and "streamlit" in sys.modules:
+        try:
+            from streamlit.runtime.scriptrunner import get_script_run_ctx
+        except Exception:
+            return None
+        _get_script_run_ctx = get_script_run_ctx
+    return _get_script_run_ctx
+
+
+def _current_owner():
+    getter = _ctx_getter()
+    ctx = getter(suppress_warning=True) if getter is not None else None
+    if ctx is not None:
+        return ("session", ctx.session_id)
+    return ("thread", threading.get_ident())
+
+
+_pool = ConnectionPool()
+
+
+def get_pooled(path: Path) -> PooledConnection:
+    return _pool.get(path, _current_owner())
+
+
+def get_conn(path: Path) -> sqlite3.Connection:
+    """Conexão longa do dono atual (sessão/thread). Não feche — ela é reaproveitada."""
+    return get_pooled(path).conn
+
+
+class WriteTimeout(sqlite3.OperationalError):
+    """O lock de escrita não veio dentro de WRITE_DEADLINE_S (subclasse do 'database is locked' de sempre)."""
+
+
+def _is_busy(e: sqlite3.OperationalError) -> bool:
+    code = getattr(e, "sqlite_errorcode", None)
+    if code is not None:
+        return code & 0xFF in (sqlite3.SQLITE_BUSY, sqlite3.SQLITE_LOCKED)
+    return "locked" in str(e) or "busy" in str(e)
+
+
+def _begin_immediate(conn: sqlite3.Connection):
+    """
+    BEGIN IMMEDIATE com novas tentativas: a cada SQLITE_BUSY, espera um tempo aleatório entre zero
+    e BACKOFF_BASE_S * 2^tentativa (até BACKOFF_MAX_S) — o jitter evita que as sessões que esperam
+    pelo mesmo lock acordem juntas — e desiste com WriteTimeout ao passar de WRITE_DEADLINE_S.
+    """
+    started = time.perf_counter()
+    deadline = started + WRITE_DEADLINE_S
+    retries = 0
+    while True:
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            break
+        except sqlite3.OperationalError as e:
+            now = time.perf_counter()
+            if not _is_busy(e):
+                raise
+            if now >= deadline:
+                _record_write(retries, now - started, timed_out=True)
+                raise WriteTimeout(f"banco bloqueado: sem lock de escrita após {retries + 1} tentativas "
+                                   f"em {now - started:.1f} s") from e
+            time.sleep(min(random.uniform(0, min(BACKOFF_MAX_S, BACKOFF_BASE_S * 2 ** retries)), deadline - now))
+            retries += 1
+    _record_write(retries, time.perf_counter() - started)
+
+
+@contextmanager
+def transaction(path: Path, immediate: bool = True):
+    """
+    Abre uma transação na conexão do dono atual e entrega um cursor.
+    Faz COMMIT ao sair normalmente e ROLLBACK se houver exceção.
+    Chamadas aninhadas reaproveitam a transação externa.
+    Por padrão pega o lock de escrita já no BEGIN (IMMEDIATE, com novas tentativas): uma transação
+    adiada que lê e depois escreve recebe SQLITE_BUSY sem espera nenhuma se outro escritor fizer
+    COMMIT no meio. `immediate=False` só para leituras que querem um snapshot consistente.
+    """
+    pc = get_pooled(path)
+    with pc.lock:
+        cur = pc.conn.cursor()
+        if pc.depth > 0:
+            pc.depth += 1
+            try:
+                yield cur
+            finally:
+                pc.depth -= 1
+            return
+        if immediate:
+            _begin_immediate(pc.conn)
+        else:
+            cur.execute("BEGIN")
+        pc.depth = 1
+        try:
+            yield cur
+            if pc.pending_changes:
+                _log_changes(pc.conn, pc.pending_changes)
+        except BaseException:
+            pc.depth = 0
+            pc.pending_changes.clear()
+            pc.conn.rollback()
+            raise
+        else:
+            pc.depth = 0
+            pc.conn.commit()
+            changes, pc.pending_changes = pc.pending_changes, set()
+            for scope, user in changes:
+                bump_data_version(scope, user)
+
+
+def close_all():
+    """Fecha todas as conexões do pool (útil em scripts e benchmarks)."""
+    _pool.close_all()
+    with _sync_lock:
+        for conn, _version, _seq in _sync_state.values():
+            conn.close()
+        _sync_state.clear()
+
+
+# ---------- Versões de dados (invalidação de caches)
+# Contador por (escopo, usuário), incrementado a cada escrita. Caches do app usam a versão como
+# parte da chave: escrever invalida exatamente os dados daquele usuário. A chave (escopo, None)
+# também é incrementada e serve para leituras de todos os usuários. _epoch soma-se a todas as
+# versões: incrementá-lo invalida tudo (quando não dá para saber o que outro processo mudou).
+_data_versions = {}
+_versions_lock = threading.Lock()
+_epoch = 0
+
+
+def data_version(scope: str, user=None) -> int:
+    return _epoch + _data_versions.get((scope, user), 0)
+
+
+def bump_data_version(scope: str, user=None):
+    with _versions_lock:
+        for key in {(scope, user), (scope, None)}:
+            _data_versions[key] = _data_versions.get(key, 0) + 1
+
+
+def invalidate_all():
+    global _epoch
+    with _versions_lock:
+        _epoch += 1
+
+
+def mark_changed(path: Path, scope: str, user=None):
+    """
+    Registra que os dados `scope` de `user` mudaram. Dentro de uma transação, o incremento só
+    acontece após o COMMIT — assim nenhum leitor guarda em cache, sob a versão nova, dados
+    anteriores à escrita (e um ROLLBACK não invalida nada). A mudança também vai para change_log,
+    na mesma transação, para os outros processos que usam o arquivo.
+    """
+    pc = get_pooled(path)
+    with pc.lock:
+        if pc.depth > 0:
+            pc.pending_changes.add((scope, user))
+            return
+    with transaction(path):
+        pc.pending_changes.add((scope, user))
+
+
+# ---------- Mudanças de outros processos (change_log)
+# Com vários processos do Streamlit no mesmo arquivo, as versões acima só enxergam as escritas do
+# próprio processo. Cada mark_changed grava (escopo, usuário, origem) em change_log junto com a
+# escrita; no início de cada rerun, sync_external_changes olha PRAGMA data_version numa conexão
+# própria do processo — muda quando qualquer outra conexão fez COMMIT — e, só nesse caso, lê as
+# linhas novas de outras origens e incrementa as versões daqueles usuários.
+CHANGE_LOG_KEEP = 10_000       # linhas mantidas; um processo que ficou mais atrás invalida tudo
+CHANGE_LOG_PRUNE_EVERY = 1_000  # a poda roda quando seq cruza um múltiplo disto
+
+_ORIGIN = f"{os.getpid()}:{os.urandom(4).hex()}"
+_sync_state = {}  # arquivo -> [conexão, último data_version, último seq lido]
+_sync_lock = threading.Lock()
+
+
+def _log_changes(conn: sqlite3.Connection, changes: set):
+    seq = 0
+    for scope, user in changes:
+        seq = conn.execute("INSERT INTO change_log (scope, user, origin) VALUES (?, ?, ?)",
+                           (scope, user, _ORIGIN)).lastrowid
+    if seq % CHANGE_LOG_PRUNE_EVERY < len(changes):
+        conn.execute("DELETE FROM change_log WHERE seq <= ?", (seq - CHANGE_LOG_KEEP,))
+
+
+def sync_external_changes(path: Path) -> int:
+    """
+    Aplica às versões de dados deste processo as mudanças que outros processos gravaram em `path`
+    desde a última chamada. Retorna quantas mudanças foram aplicadas (-1 se change_log já tinha
+    sido podado além do ponto lido e tudo foi invalidado). Sem COMMIT alheio, custa um PRAGMA.
+    """
+    key = _resolved(path)
+    with _sync_lock:
+        state = _sync_state.get(key)
+        if state is None:
+            conn = sqlite3.connect(key, timeout=BUSY_TIMEOUT_MS / 1000, check_same_thread=False,
+                                   isolation_level=None)
+            last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM change_log").fetchone()[0]
+            _sync_state[key] = [conn, conn.execute("PRAGMA data_version").fetchone()[0], last_seq]
+            return 0
+        conn, version, last_seq = state
+        now = conn.execute("PRAGMA data_version").fetchone()[0]
+        if now == version:
+            return 0
+        state[1] = now
+        rows = conn.execute("SELECT seq, scope, user, origin FROM change_log WHERE seq > ? ORDER BY seq",
+                            (last_seq,)).fetchall()
+        if not rows:
+            return 0
+        state[2] = rows[-1][0]
+        if rows[0][0] > last_seq + 1:
+            invalidate_all()
+            return -1
+        changes = {(scope, user) for _seq, scope, user, origin in rows if origin != _ORIGIN}
+    for scope, user in changes:
+        bump_data_version(scope, user)
+    return len(changes)
+
+
+# ---------- Métricas da camada de escrita
+# Por processo: transações de escrita, as que precisaram de novas tentativas, o total de novas
+# tentativas, desistências (WriteTimeout) e o tempo esperando pelo lock (inclui a espera do
+# próprio SQLite em cada tentativa).
+_write_stats = {"transactions": 0, "retried": 0, "retries": 0, "timeouts": 0, "wait_ms": 0.0, "max_wait_ms": 0.0}
+_write_stats_lock = threading.Lock()
+
+
+def _record_write(retries: int, waited_s: float, timed_out: bool = False):
+    waited_ms = waited_s * 1000
+    with _write_stats_lock:
+        _write_stats["transactions"] += 1
+        _write_stats["retried"] += retries > 0
+        _write_stats["retries"] += retries
+        _write_stats["timeouts"] += timed_out
+        _write_stats["wait_ms"] += waited_ms
+        _write_stats["max_wait_ms"] = max(_write_stats["max_wait_ms"], waited_ms)
+
+
+def write_stats() -> dict:
+    with _write_stats_lock:
+        return dict(_write_stats)
+
+
+def reset_write_stats():
+    with _write_stats_lock:
+        for key in _write_stats:
+            _write_stats[key] = 0
+
+
+# ---------- Migrações versionadas (PRAGMA user_version)
+def _columns(c, table: str) -> set:
+    c.execute(f"PRAGMA table_info({table})")
+    return {r[1] for r in c.fetchall()}
+
+
+def _ensure_columns(c, table: str, columns: dict):
+    """Adiciona (ALTER TABLE) as colunas que faltarem — DBs criados por versões antigas do app."""
+    existing = _columns(c, table)
+    for name, ddl in columns.items():
+        if name not in existing:
+            c.execute(f"ALTER TABLE {table} ADD COLUMN {name} {ddl}")
+
+
+def _m001_base_schema(c):
+    """Tabelas originais do app + colunas que antes eram garantidas a cada rerun."""
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY,
+            date TEXT NOT NULL,
+            area TEXT NOT NULL,
+            xp INTEGER NOT NULL,
+            note TEXT,
+            type TEXT,
+            user TEXT,
+            meta_id INTEGER
+        )
+        """
+    )
+    _ensure_columns(c, "events", {"type": "TEXT", "user": "TEXT", "meta_id": "INTEGER"})
+
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS quests (
+            id INTEGER PRIMARY KEY,
+            title TEXT NOT NULL,
+            area TEXT NOT NULL,
+            xp_reward INTEGER NOT NULL,
+            cadence TEXT,
+            last_done TEXT,
+            streak INTEGER DEFAULT 0,
+            active INTEGER DEFAULT 1,
+            user TEXT
+        )
+        """
+    )
+    _ensure_columns(c, "quests", {"user": "TEXT"})
+
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS perks (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            area TEXT,
+            unlock_level INTEGER NOT NULL,
+            effect TEXT,
+            duration_days INTEGER DEFAULT 0,
+            multiplier REAL DEFAULT 1.0,
+            start_date TEXT,
+            active INTEGER DEFAULT 0,
+            user TEXT
+        )
+        """
+    )
+    _ensure_columns(c, "perks", {
+        "user": "TEXT",
+        "duration_days": "INTEGER DEFAULT 0",
+        "multiplier": "REAL DEFAULT 1.0",
+        "start_date": "TEXT",
+        "active": "INTEGER DEFAULT 0",
+    })
+
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS metas (
+            id INTEGER PRIMARY KEY,
+            area TEXT NOT NULL,
+            weekly_target INTEGER NOT NULL,
+            note TEXT,
+            daily_suggestion INTEGER DEFAULT 0,
+            active INTEGER DEFAULT 1,
+            user TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            updated_at TEXT
+        )
+        """
+    )
+
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT UNIQUE NOT NULL,
+            display_name TEXT,
+            password_hash TEXT NOT NULL,
+            role TEXT,
+            profession TEXT,
+            bio TEXT,
+            gender TEXT,
+            birth_year INTEGER,
+            height_cm REAL,
+            weight_kg REAL,
+            body_fat_pct REAL
+        )
+        """
+    )
+
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS user_config (
+            id INTEGER PRIMARY KEY,
+            user TEXT NOT NULL,
+            key TEXT NOT NULL,
+            value TEXT,
+            UNIQUE(user, key)
+        )
+        """
+    )
+
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS penalties (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            area TEXT NOT NULL,
+            amount INTEGER NOT NULL,
+            user TEXT,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS penalty_applications (
+            id INTEGER PRIMARY KEY,
+            penalty_id INTEGER,
+            penalty_name TEXT,
+            user TEXT,
+            area TEXT,
+            amount INTEGER,
+            note TEXT,
+            applied_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(penalty_id) REFERENCES penalties(id)
+        )
+        """
+    )
+
+
+def _m002_indexes(c):
+    """
+    Índices desenhados a partir das consultas quentes (ver HOT_QUERIES):
+    - events(user, date): exportação (WHERE user=? ORDER BY date) e filtros por período;
+    - events(meta_id, date, user, xp): progresso semanal da meta — date antes de user porque o
+      filtro `(user=? OR user IS NULL)` não serve de prefixo; coberto (não lê a tabela);
+    - events(user, area, xp): totais por área, coberto;
+    - quests/perks(user, active), metas(user), penalties(user): listas por usuário (+ globais);
+    - penalty_applications(applied_at, penalty_id, user): histórico por intervalo de datas.
+    """
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_user_date ON events(user, date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_meta_date ON events(meta_id, date, user, xp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_user_area ON events(user, area, xp)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quests_user_active ON quests(user, active)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_perks_user_active ON perks(user, active)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_metas_user ON metas(user)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_penalties_user ON penalties(user)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_penalty_apps_applied ON penalty_applications(applied_at, penalty_id, user)")
+
+
+# Chave do rollup: NULLs viram '' para caberem na PRIMARY KEY (eventos sem usuário são "globais").
+_DAILY_XP_KEY = "COALESCE({r}.user, ''), COALESCE({r}.area, ''), substr({r}.date, 1, 10), COALESCE({r}.type, '')"
+_DAILY_XP_WHERE = (
+    "user = COALESCE({r}.user, '') AND area = COALESCE({r}.area, '') "
+    "AND day = substr({r}.date, 1, 10) AND type = COALESCE({r}.type, '')"
+)
+
+
+def _daily_xp_add_sql(r: str) -> str:
+    return (
+        f"INSERT INTO daily_xp (user, area, day, type, xp_sum, event_count) "
+        f"VALUES ({_DAILY_XP_KEY.format(r=r)}, COALESCE({r}.xp, 0), 1) "
+        f"ON CONFLICT(user, area, day, type) DO UPDATE SET "
+        f"xp_sum = xp_sum + excluded.xp_sum, event_count = event_count + 1;"
+    )
+
+
+def _daily_xp_remove_sql(r: str) -> str:
+    where = _DAILY_XP_WHERE.format(r=r)
+    return (
+        f"UPDATE daily_xp SET xp_sum = xp_sum - COALESCE({r}.xp, 0), event_count = event_count - 1 WHERE {where};"
+        f" DELETE FROM daily_xp WHERE {where} AND event_count <= 0;"
+    )
+
+
+def _m003_daily_xp(c):
+    """
+    Rollup diário de XP (user, area, day, type) mantido por triggers em events: qualquer escrita —
+    add_event, update_event, exclusões, penalidades, import — atualiza o agregado na mesma
+    transação. O dashboard lê daqui em vez de reagrupar o histórico inteiro a cada rerun.
+    """
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS daily_xp (
+            user TEXT NOT NULL,
+            area TEXT NOT NULL,
+            day TEXT NOT NULL,
+            type TEXT NOT NULL,
+            xp_sum INTEGER NOT NULL DEFAULT 0,
+            event_count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (user, area, day, type)
+        ) WITHOUT ROWID
+        """
+    )
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_daily_xp_insert AFTER INSERT ON events BEGIN {_daily_xp_add_sql('NEW')} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_daily_xp_delete AFTER DELETE ON events BEGIN {_daily_xp_remove_sql('OLD')} END")
+    c.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_daily_xp_update AFTER UPDATE OF date, area, xp, type, user ON events "
+        f"BEGIN {_daily_xp_remove_sql('OLD')} {_daily_xp_add_sql('NEW')} END"
+    )
+    _rebuild_daily_xp(c)
+
+
+def _m004_job_runs(c):
+    """
+    Ledger do agendador (mim_core.scheduler): uma linha por execução de (job, usuário, período).
+    O índice único parcial garante no máximo uma execução concluída ('ok') por período; falhas
+    ficam como histórico e o período é tentado de novo.
+    """
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS job_runs (
+            id INTEGER PRIMARY KEY,
+            job TEXT NOT NULL,
+            user TEXT NOT NULL DEFAULT '',
+            period TEXT NOT NULL,
+            status TEXT NOT NULL,
+            started_at TEXT NOT NULL,
+            finished_at TEXT,
+            detail TEXT
+        )
+        """
+    )
+    c.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_job_runs_done ON job_runs(job, user, period) WHERE status='ok'")
+
+
+def _m005_events_idempotency_key(c):
+    """
+    events.idempotency_key: eventos gerados por regras automáticas levam uma chave determinística
+    (ex.: 'missed_daily:<user>:<quest>:<dia>'); o índice único parcial faz um INSERT repetido
+    virar no-op (ON CONFLICT DO NOTHING). Eventos manuais ficam com NULL e não entram no índice.
+    """
+    _ensure_columns(c, "events", {"idempotency_key": "TEXT"})
+    c.execute(
+        "CREATE UNIQUE INDEX IF NOT EXISTS idx_events_idempotency ON events(idempotency_key) "
+        "WHERE idempotency_key IS NOT NULL"
+    )
+
+
+def _m006_quest_completions(c):
+    """
+    quest_completions: uma linha por conclusão de quest (quem concluiu, em que dia, qual evento de
+    XP gerou). As streaks passam a ser calculadas deste log (mim_core.streaks) em vez de quests.streak.
+    O histórico é reconstruído dos eventos 'quest' já gravados ('Quest: <título>', com ou sem a
+    marca de bônus) e do last_done de cada quest; streaks antigas maiores que esse histórico não
+    têm como ser recuperadas.
+    """
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS quest_completions (
+            id INTEGER PRIMARY KEY,
+            quest_id INTEGER NOT NULL,
+            user TEXT NOT NULL DEFAULT '',
+            day TEXT NOT NULL,
+            event_id INTEGER,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+    )
+    c.execute("CREATE INDEX IF NOT EXISTS idx_quest_completions_user ON quest_completions(user, quest_id, day)")
+    # quests homônimas: fica com a que tem last_done (a que de fato foi concluída), depois a mais antiga
+    c.execute(
+        """
+        INSERT INTO quest_completions (quest_id, user, day, event_id)
+        SELECT quest_id, user, day, event_id FROM (
+            SELECT (
+                SELECT q.id FROM quests q
+                WHERE (q.user = e.user OR q.user IS NULL)
+                  AND (e.note = 'Quest: ' || q.title
+                       OR substr(e.note, 1, length(q.title) + 9) = 'Quest: ' || q.title || ' [')
+                ORDER BY q.last_done IS NULL, q.id LIMIT 1
+            ) AS quest_id, COALESCE(e.user, '') AS user, substr(e.date, 1, 10) AS day, e.id AS event_id
+            FROM events e WHERE e.type = 'quest'
+        ) WHERE quest_id IS NOT NULL
+        """
+    )
+    c.execute(
+        """
+        INSERT INTO quest_completions (quest_id, user, day)
+        SELECT q.id, COALESCE(q.user, ''), substr(q.last_done, 1, 10) FROM quests q
+        WHERE q.last_done IS NOT NULL AND NOT EXISTS (
+            SELECT 1 FROM quest_completions qc WHERE qc.quest_id = q.id AND qc.day = substr(q.last_done, 1, 10)
+        )
+        """
+    )
+
+
+def _m007_badges(c):
+    """
+    badges_earned: badges ganhos (mim_core.badges), com o dia em que a regra foi satisfeita.
+    badge_evaluations: até que dia cada usuário já foi avaliado. Uma escrita em daily_xp num dia
+    já avaliado (evento retroativo, import, edição de data) recua essa marca para o dia anterior,
+    por trigger, e a próxima avaliação reexamina a partir dali.
+    """
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS badges_earned (
+            user TEXT NOT NULL,
+            badge_id TEXT NOT NULL,
+            name TEXT NOT NULL,
+            description TEXT,
+            area TEXT,
+            earned_at TEXT NOT NULL,
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (user, badge_id)
+        ) WITHOUT ROWID
+        """
+    )
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS badge_evaluations (
+            user TEXT PRIMARY KEY,
+            catalog TEXT NOT NULL,
+            evaluated_through TEXT NOT NULL
+        ) WITHOUT ROWID
+        """
+    )
+    rewind = (
+        "UPDATE badge_evaluations SET evaluated_through = date(NEW.day, '-1 day') "
+        "WHERE user = NEW.user AND evaluated_through >= NEW.day;"
+    )
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_badges_rewind_insert AFTER INSERT ON daily_xp BEGIN {rewind} END")
+    c.execute(f"CREATE TRIGGER IF NOT EXISTS trg_badges_rewind_update AFTER UPDATE ON daily_xp BEGIN {rewind} END")
+
+
+def _m008_event_log_indexes(c):
+    """
+    Índices do registro de eventos paginado (mim_core.event_log): com filtro de uma área ou de um tipo,
+    a página anda por (user, area|type, date) — o rowid no fim da entrada completa a ordem
+    (date, id) do cursor, sem ordenação temporária.
+    """
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_user_area_date ON events(user, area, date)")
+    c.execute("CREATE INDEX IF NOT EXISTS idx_events_user_type_date ON events(user, type, date)")
+
+
+# Índice de texto das notas: tabela FTS5 de conteúdo externo (o texto fica só em events; o índice
+# guarda os tokens). unicode61 sem diacríticos: "bonus" encontra "Bônus".
+_EVENTS_FTS_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5("
+    "note, content='events', content_rowid='id', tokenize='unicode61 remove_diacritics 2')"
+)
+
+
+def _m009_events_fts(c):
+    """
+    events_fts: busca textual nas notas dos eventos (mim_core.event_log.search_notes), mantida por
+    triggers em events na mesma transação de cada escrita — o comando 'delete' do FTS5 precisa do
+    texto antigo, que os triggers AFTER DELETE/UPDATE têm em OLD. Os eventos já existentes entram
+    pelo 'rebuild', que relê events inteira (ver rebuild_search_index).
+    """
+    c.execute(_EVENTS_FTS_SQL)
+    c.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_events_fts_insert AFTER INSERT ON events BEGIN "
+        "INSERT INTO events_fts (rowid, note) VALUES (NEW.id, NEW.note); END"
+    )
+    c.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_events_fts_delete AFTER DELETE ON events BEGIN "
+        "INSERT INTO events_fts (events_fts, rowid, note) VALUES ('delete', OLD.id, OLD.note); END"
+    )
+    c.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_events_fts_update AFTER UPDATE OF id, note ON events BEGIN "
+        "INSERT INTO events_fts (events_fts, rowid, note) VALUES ('delete', OLD.id, OLD.note); "
+        "INSERT INTO events_fts (rowid, note) VALUES (NEW.id, NEW.note); END"
+    )
+    c.execute("INSERT INTO events_fts (events_fts) VALUES ('rebuild')")
+
+
+def _m010_change_log(c):
+    """
+    change_log: uma linha (escopo, usuário, processo de origem) por mark_changed, gravada na mesma
+    transação da escrita. Outros processos do app leem as linhas novas no início de cada rerun
+    (sync_external_changes) e invalidam só os caches daquele usuário. Sem AUTOINCREMENT: a poda
+    nunca apaga a linha mais nova, então o rowid segue crescente.
+    """
+    c.execute(
+        """
+        CREATE TABLE IF NOT EXISTS change_log (
+            seq INTEGER PRIMARY KEY,
+            scope TEXT NOT NULL,
+            user TEXT,
+            origin TEXT NOT NULL
+        )
+        """
+    )
+
+
+# (versão, descrição, função(cursor)). Nunca reordene nem altere uma migração já publicada:
+# mudanças de esquema entram como uma nova versão no fim da lista.
+MIGRATIONS = [
+    (1, "esquema base", _m001_base_schema),
+    (2, "índices das consultas quentes", _m002_indexes),
+    (3, "rollup diário de XP (daily_xp)", _m003_daily_xp),
+    (4, "ledger do agendador (job_runs)", _m004_job_runs),
+    (5, "chave de idempotência em events", _m005_events_idempotency_key),
+    (6, "log de conclusões de quests (quest_completions)", _m006_quest_completions),
+    (7, "badges ganhos e avaliação incremental", _m007_badges),
+    (8, "índices do registro de eventos paginado", _m008_event_log_indexes),
+    (9, "busca textual nas notas (events_fts)", _m009_events_fts),
+    (10, "log de mudanças entre processos (change_log)", _m010_change_log),
+]
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+_migrated = set()
+_migrate_lock = threading.Lock()
+
+
+def schema_version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(path: Path) -> list:
+    """
+    Leva o arquivo até SCHEMA_VERSION. Cada migração roda em sua própria transação
+    (BEGIN IMMEDIATE, relendo user_version dentro dela para não disputar com outro processo).
+    Depois da primeira chamada bem-sucedida no processo, vira no-op para aquele arquivo.
+    Retorna as versões aplicadas.
+    """
+    key = _resolved(path)
+    if key in _migrated:
+        return []
+    with _migrate_lock:
+        if key in _migrated:
+            return []
+        applied = []
+        conn = get_conn(path)
+        if schema_version(conn) < SCHEMA_VERSION:
+            for version, _desc, fn in MIGRATIONS:
+                with transaction(path) as c:
+                    if schema_version(conn) >= version:
+                        continue
+                    fn(c)
+                    c.execute(f"PRAGMA user_version = {int(version)}")
+                applied.append(version)
+        _migrated.add(key)
+        return applied
+
+
+# ---------- Rollup diário de XP: rebuild e verificação
+_DAILY_XP_FROM_EVENTS = (
+    "SELECT COALESCE(user, ''), COALESCE(area, ''), substr(date, 1, 10), COALESCE(type, ''), "
+    "SUM(COALESCE(xp, 0)), COUNT(*) FROM events GROUP BY 1, 2, 3, 4"
+)
+
+
+def _rebuild_daily_xp(c):
+    c.execute("DELETE FROM daily_xp")
+    c.execute(f"INSERT INTO daily_xp (user, area, day, type, xp_sum, event_count) {_DAILY_XP_FROM_EVENTS}")
+
+
+def rebuild_daily_xp(path: Path) -> int:
+    """Recalcula daily_xp inteiro a partir de events. Retorna o número de linhas do rollup."""
+    with transaction(path) as c:
+        _rebuild_daily_xp(c)
+        c.execute("SELECT COUNT(*) FROM daily_xp")
+        n = c.fetchone()[0]
+    bump_data_version("events")
+    return n
+
+
+def check_daily_xp(path: Path) -> list:
+    """
+    Compara daily_xp com o agregado dos eventos brutos (numa única leitura consistente).
+    Retorna as divergências como (origem, user, area, day, type, xp_sum, event_count), onde
+    origem é 'events' (linha esperada que falta ou difere no rollup) ou 'daily_xp' (linha sobrando).
+    """
+    rollup = "SELECT user, area, day, type, xp_sum, event_count FROM daily_xp"
+    with transaction(path, immediate=False) as c:
+        c.execute(f"SELECT 'events', * FROM ({_DAILY_XP_FROM_EVENTS} EXCEPT {rollup})")
+        diffs = c.fetchall()
+        c.execute(f"SELECT 'daily_xp', * FROM ({rollup} EXCEPT {_DAILY_XP_FROM_EVENTS})")
+        diffs += c.fetchall()
+    return diffs
+
+
+# ---------- Índice de busca das notas: rebuild e verificação
+def rebuild_search_index(path: Path) -> int:
+    """
+    Reconstrói events_fts a partir de events (bancos que receberam eventos por fora dos triggers,
+    índice corrompido). Retorna o número de eventos indexados.
+    """
+    with transaction(path) as c:
+        c.execute("INSERT INTO events_fts (events_fts) VALUES ('rebuild')")
+        c.execute("SELECT COUNT(*) FROM events")
+        n = c.fetchone()[0]
+    bump_data_version("events")
+    return n
+
+
+def check_search_index(path: Path) -> list:
+    """
+    Confere events_fts contra o texto atual de events ('integrity-check' com rank=1 compara os
+    tokens do índice com o conteúdo externo). Retorna a lista de problemas (vazia = ok).
+    O comando do FTS5 é um INSERT e pega o lock de escrita mesmo sem gravar nada; para não disputar
+    com o app, ele roda numa cópia em memória, feita por uma conexão só de leitura (um snapshot).
+    """
+    src = sqlite3.connect(f"file:{_resolved(path)}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_MS / 1000)
+    snapshot = sqlite3.connect(":memory:", isolation_level=None)
+    try:
+        src.backup(snapshot)
+        snapshot.execute("INSERT INTO events_fts (events_fts, rank) VALUES ('integrity-check', 1)")
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    finally:
+        snapshot.close()
+        src.close()
+    return []
+
+
+# ---------- Regressão de planos de consulta
+# Consultas quentes do app, com parâmetros de exemplo. Mantenha em sincronia com os helpers
+# do Versao2_Mim_streamlit_app.py ao alterar o SQL deles.
+HOT_QUERIES = {
+    "export_events": ("SELECT * FROM events WHERE user=? ORDER BY date ASC, id ASC", ("u",)),
+    "compute_week_progress_for_meta": (
+        "SELECT SUM(xp) FROM events WHERE meta_id=? AND (user=? OR user IS NULL) AND date BETWEEN ? AND ?",
+        (1, "u", "2025-01-06", "2025-01-12"),
+    ),
+    "compute_area_xp_totals": ("SELECT area, SUM(xp_sum) FROM daily_xp WHERE user IN (?, '') GROUP BY area", ("u",)),
+    "load_daily_xp": ("SELECT day, area, type, xp_sum, event_count FROM daily_xp WHERE user=?", ("u",)),
+    "load_quests": (
+        "SELECT id, title, area, xp_reward, cadence, active, user FROM quests WHERE active=1 AND (user=? OR user IS NULL)",
+        ("u",),
+    ),
+    "get_perk_resolver": (
+        "SELECT area, multiplier, duration_days, start_date FROM perks WHERE active=1 AND (user=? OR user IS NULL)",
+        ("u",),
+    ),
+    "load_perks": ("SELECT * FROM perks WHERE user=? OR user IS NULL", ("u",)),
+    "get_metas_for_user": ("SELECT * FROM metas WHERE (user=? OR user IS NULL) ORDER BY id DESC", ("u",)),
+    "load_penalties": ("SELECT * FROM penalties WHERE (user=? OR user IS NULL) ORDER BY id DESC", ("u",)),
+    "get_user_config": ("SELECT value FROM user_config WHERE user=? AND key=?", ("u", "k")),
+    "penalty_history": (
+        "SELECT * FROM penalty_applications WHERE applied_at >= ? AND applied_at < ? AND penalty_id = ? "
+        "ORDER BY applied_at DESC",
+        ("2025-01-01", "2025-02-01", 1),
+    ),
+    "quest_completions": ("SELECT quest_id, day FROM quest_completions WHERE user=?", ("u",)),
+    "xp_series": (
+        "SELECT date(day, 'weekday 0', '-6 days') AS period, area, SUM(xp_sum) FROM daily_xp WHERE user=? "
+        "GROUP BY 1, 2 ORDER BY 1",
+        ("u",),
+    ),
+    "badges_base_xp": (
+        "SELECT area, SUM(xp_sum) FROM daily_xp WHERE user=? AND day < ? GROUP BY area", ("u", "2025-01-01"),
+    ),
+    "event_log_page": (
+        "SELECT id, date, area, xp, type, note, meta_id FROM events WHERE user = ? AND area = ? "
+        "AND (date, id) < (?, ?) ORDER BY date DESC, id DESC LIMIT ?",
+        ("u", "Coding", "2025-01-01", 100, 51),
+    ),
+    "badges_earned": ("SELECT badge_id, earned_at FROM badges_earned WHERE user=? ORDER BY earned_at DESC", ("u",)),
+    "job_runs_last_period": (
+        "SELECT MAX(period) FROM job_runs WHERE job=? AND user=? AND status='ok'", ("missed_daily", "u"),
+    ),
+}
+
+
+def query_plan(conn: sqlite3.Connection, sql: str, params=()) -> list:
+    """Linhas de EXPLAIN QUERY PLAN (coluna 'detail')."""
+    return [r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()]
+
+
+def is_full_scan(detail: str) -> bool:
+    """'SCAN <tabela>' sem índice = varredura completa da tabela."""
+    return detail.startswith("SCAN ") and " USING " not in detail
+
+
+def check_query_plans(path: Path) -> dict:
+    """Retorna {consulta: plano} apenas das consultas quentes que fazem varredura completa."""
+    conn = get_conn(path)
+    offenders = {}
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = query_plan(conn, sql, params)
+        if any(is_full_scan(d) for d in plan):
+            offenders[name] = plan
+    return offenders
+
+
+@contextmanager
+def scratch_copy(path: Path):
+    """
+    Cópia temporária e migrada de `path` (pela API de backup do SQLite, consistente mesmo com o WAL em
+    uso) para as verificações da CLI: o arquivo original não é migrado nem escrito. Se `path` não
+    existe, entrega um banco vazio com o esquema atual.
+    """
+    import tempfile
+
+    with tempfile.TemporaryDirectory(prefix="mim_check_") as tmp:
+        copy = Path(tmp) / "check.db"
+        if Path(path).exists():
+            src = sqlite3.connect(f"file:{Path(path).resolve()}?mode=ro", uri=True)
+            dst = sqlite3.connect(str(copy))
+            try:
+                src.backup(dst)
+            finally:
+                dst.close()
+                src.close()
+        migrate(copy)
+        try:
+            yield copy
+        finally:
+            close_all()
+
+
+def _check_copy(command: str, path: Path) -> int:
+    if command == "check-plans":
+        offenders = check_query_plans(path)
+        for name, plan in offenders.items():
+            print(f"VARREDURA COMPLETA em {name}: {plan}")
+        if not offenders:
+            print(f"ok: {len(HOT_QUERIES)} consultas quentes usam índice")
+        return 1 if offenders else 0
+    if command == "check-rollups":
+        diffs = check_daily_xp(path)
+        for d in diffs:
+            print("DIVERGÊNCIA", d)
+        if not diffs:
+            print("ok: daily_xp confere com events")
+        return 1 if diffs else 0
+    problems = check_search_index(path)
+    for p in problems:
+        print("PROBLEMA", p)
+    if not problems:
+        print("ok: events_fts confere com as notas de events")
+    return 1 if problems else 0
+
+
+def _main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="python -m mim_core.db", description="Manutenção do banco do Versão 2.0 de Mim")
+    ap.add_argument("command", choices=["migrate", "check-plans", "rebuild-rollups", "check-rollups",
+                                           "rebuild-search", "check-search"])
+    ap.add_argument("db", nargs="?", help="arquivo do banco (obrigatório para migrate/rebuild-*; as verificações "
+                                          "rodam numa cópia temporária dele, por padrão versao2_mim.db)")
+    args = ap.parse_args(argv)
+
+    if args.command in ("migrate", "rebuild-rollups", "rebuild-search"):
+        # escrevem no arquivo: só com o caminho explícito
+        if args.db is None:
+            ap.error(f"{args.command} altera o banco: informe o arquivo (ex.: versao2_mim.db)")
+        path = Path(args.db)
+        applied = migrate(path)
+        if args.command == "migrate":
+            print(f"versão do esquema: {schema_version(get_conn(path))} (aplicadas agora: {applied or 'nenhuma'})")
+        elif args.command == "rebuild-rollups":
+            print(f"daily_xp reconstruído: {rebuild_daily_xp(path)} linhas")
+        else:
+            print(f"events_fts reconstruído: {rebuild_search_index(path)} eventos")
+        return 0
+    if args.command in ("check-plans", "check-rollups", "check-search"):
+        with scratch_copy(args.db or "versao2_mim.db") as path:
+            return _check_copy(args.command, path)
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -0,0 +1,226 @@
+"""
+Registro detalhado de eventos do Versão 2.0 de Mim, paginado no servidor.
+
+Em vez de carregar o histórico inteiro num st.dataframe, o painel busca uma página por vez com
+paginação por chave (keyset): a ordem é (date DESC, id DESC) e o cursor da próxima página é o
+(date, id) da última linha exibida — `WHERE (date, id) < (?, ?) ... LIMIT ?`. O SQLite desce
+direto ao ponto do cursor pelo índice events(user, date) (o id é o rowid, que já vem no fim de
+toda entrada do índice), então o custo de uma página não depende do tamanho do histórico nem de
+quão fundo se está nele, ao contrário de OFFSET, que percorre todas as linhas puladas.
+
+Filtros (período, áreas, tipos, meta, faixa de XP) viram condições no mesmo SELECT. Com uma única
+área, o índice events(user, area, date) serve o filtro e a ordem; com um único tipo, o
+events(user, type, date). Os demais filtros são avaliados sobre a caminhada em ordem do índice,
+sem ordenação temporária.
+
+A busca nas notas (`search_notes`) usa o índice FTS5 events_fts (migração 9): os termos digitados
+viram uma consulta MATCH (todos os termos, o último como prefixo), os resultados vêm ordenados por
+relevância (bm25) com um trecho destacado de cada nota, e os mesmos filtros do EventFilter entram
+no WHERE. Ordenar pelo `rank` do FTS5 calcularia o bm25 de todas as ocorrências — num termo comum,
+dezenas de milhares —, então a relevância é apurada entre as RANK_WINDOW ocorrências mais recentes
+que passam nos filtros (achadas andando o índice pelo rowid, de trás para frente); termos com menos
+ocorrências que isso são ordenados no histórico inteiro.
+
+    python -m mim_core.event_log check [db]                   # planos das consultas de página (sem varredura nem sort)
+    python -m mim_core.event_log search [db] --user <usuário> --query "<termos>"
+"""
+import re
+from dataclasses import dataclass
+from datetime import date, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+PAGE_SIZE = 50
+
+PAGE_COLUMNS = ["id", "date", "area", "xp", "type", "note", "meta_id"]
+
+SEARCH_LIMIT = 50
+RANK_WINDOW = 2000
+# marcadores do trecho destacado: caracteres de controle, que não aparecem em notas digitadas,
+# para quem exibe poder escapar o texto antes de trocá-los pela marcação que quiser
+SNIPPET_OPEN, SNIPPET_CLOSE = "\x02", "\x03"
+SNIPPET_TOKENS = 12
+
+
+@dataclass(frozen=True)
+class EventFilter:
+    """Filtros do registro de eventos; None / vazio = sem filtro. `end` é inclusive."""
+    start: date = None
+    end: date = None
+    areas: tuple = ()
+    types: tuple = ()
+    meta_id: int = None
+    xp_min: int = None
+    xp_max: int = None
+
+    def where(self, alias: str = "") -> tuple:
+        """
+        (lista de condições SQL, parâmetros) — sem o filtro de usuário nem o do cursor. `alias`
+        qualifica as colunas quando events entra num JOIN ('e' -> e.date, e.area, ...).
+        """
+        p = f"{alias}." if alias else ""
+        conds, params = [], []
+        if self.start is not None:
+            conds.append(f"{p}date >= ?")
+            params.append(self.start.isoformat())
+        if self.end is not None:
+            # date pode trazer hora ('YYYY-MM-DD HH:MM:SS'): compara com o início do dia seguinte
+            conds.append(f"{p}date < ?")
+            params.append((self.end + timedelta(days=1)).isoformat())
+        for column, values in (("area", self.areas), ("type", self.types)):
+            if len(values) == 1:
+                conds.append(f"{p}{column} = ?")
+            elif values:
+                conds.append(f"{p}{column} IN ({', '.join('?' * len(values))})")
+            params.extend(values)
+        if self.meta_id is not None:
+            conds.append(f"{p}meta_id = ?")
+            params.append(int(self.meta_id))
+        if self.xp_min is not None:
+            conds.append(f"{p}xp >= ?")
+            params.append(int(self.xp_min))
+        if self.xp_max is not None:
+            conds.append(f"{p}xp <= ?")
+            params.append(int(self.xp_max))
+        return conds, params
+
+
+def page_query(user: str, flt: EventFilter = EventFilter(), cursor: tuple = None, limit: int = PAGE_SIZE) -> tuple:
+    """(sql, params) de uma página: `limit` + 1 linhas, a extra só indica se existe página seguinte."""
+    conds, params = flt.where()
+    conds.insert(0, "user = ?")
+    params.insert(0, user)
+    if cursor is not None:
+        conds.append("(date, id) < (?, ?)")
+        params.extend(cursor)
+    sql = (
+        f"SELECT {', '.join(PAGE_COLUMNS)} FROM events WHERE {' AND '.join(conds)} "
+        "ORDER BY date DESC, id DESC LIMIT ?"
+    )
+    return sql, (*params, int(limit) + 1)
+
+
+def fetch_page(conn, user: str, flt: EventFilter = EventFilter(), cursor: tuple = None,
+               limit: int = PAGE_SIZE) -> tuple:
+    """
+    Uma página do registro do usuário, dos eventos mais recentes para os mais antigos, a partir de
+    `cursor` ((date, id) da última linha da página anterior; None = primeira página).
+    Retorna (DataFrame com PAGE_COLUMNS, cursor da próxima página ou None se esta é a última).
+    """
+    sql, params = page_query(user, flt, cursor, limit)
+    rows = conn.execute(sql, params).fetchall()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = (rows[-1][1], rows[-1][0])
+    return _page_frame(rows, PAGE_COLUMNS), next_cursor
+
+
+def _page_frame(rows: list, columns: list) -> "pd.DataFrame":
+    import pandas as pd
+
+    df = pd.DataFrame(rows, columns=columns).astype({"meta_id": "Int64"})
+    df["note"] = df["note"].fillna("")
+    return df
+
+
+# ---------- Busca nas notas (FTS5)
+def match_expression(text: str) -> str:
+    """
+    Texto digitado -> expressão MATCH do FTS5: cada palavra vira uma frase entre aspas (nada do
+    que o usuário digita é interpretado como sintaxe do FTS5) e a última casa por prefixo.
+    Retorna '' se não sobrar nenhum termo.
+    """
+    terms = re.findall(r"\w+", text or "")
+    if not terms:
+        return ""
+    return " ".join(f'"{t}"' for t in terms) + "*"
+
+
+def search_notes(conn, user: str, text: str, flt: EventFilter = EventFilter(), limit: int = SEARCH_LIMIT,
+                 window: int = RANK_WINDOW) -> "pd.DataFrame":
+    """
+    Eventos do usuário cujas notas contêm todos os termos de `text`, com os filtros de `flt`, do
+    mais para o menos relevante (bm25) entre as `window` ocorrências mais recentes. Colunas
+    PAGE_COLUMNS + 'snippet' (trecho da nota com os termos entre SNIPPET_OPEN e SNIPPET_CLOSE).
+    """
+    expr = match_expression(text)
+    if not expr:
+        return _page_frame([], PAGE_COLUMNS + ["snippet"])
+    conds, params = flt.where("e")
+    where = "".join(f" AND {cond}" for cond in conds)
+    # a subconsulta anda pelas ocorrências do mais novo para o mais antigo (ordem de rowid, sem
+    # ordenar) e para na janela: bm25 e snippet só são calculados para essas linhas
+    sql = (
+        f"SELECT {', '.join(PAGE_COLUMNS)}, snippet FROM ("
+        f"SELECT {', '.join('e.' + c for c in PAGE_COLUMNS)}, bm25(events_fts) AS score, "
+        f"snippet(events_fts, 0, ?, ?, '…', {SNIPPET_TOKENS}) AS snippet "
+        "FROM events_fts JOIN events e ON e.id = events_fts.rowid "
+        f"WHERE events_fts MATCH ? AND e.user = ?{where} "
+        "ORDER BY events_fts.rowid DESC LIMIT ?"
+        ") ORDER BY score, id DESC LIMIT ?"
+    )
+    rows = conn.execute(sql, (SNIPPET_OPEN, SNIPPET_CLOSE, expr, user, *params, int(window), int(limit))).fetchall()
+    return _page_frame(rows, PAGE_COLUMNS + ["snippet"])
+
+
+# ---------- Verificação dos planos
+# filtros representativos do painel: cada um precisa andar por um índice, na ordem da página
+CHECK_FILTERS = {
+    "sem filtro": EventFilter(),
+    "período": EventFilter(start=date(2025, 1, 1), end=date(2025, 3, 31)),
+    "uma área": EventFilter(areas=("Coding",)),
+    "várias áreas": EventFilter(areas=("Coding", "Inglês")),
+    "um tipo": EventFilter(types=("quest",)),
+    "meta + XP": EventFilter(meta_id=1, xp_min=10, xp_max=100),
+    "tudo": EventFilter(start=date(2025, 1, 1), end=date(2025, 3, 31), areas=("Coding",), types=("manual",),
+                        xp_min=0),
+}
+
+
+def check_plans(conn) -> dict:
+    """{filtro: plano} das consultas de página que varrem a tabela ou ordenam em B-tree temporária."""
+    from mim_core.db import is_full_scan, query_plan
+
+    offenders = {}
+    for name, flt in CHECK_FILTERS.items():
+        for cursor in (None, ("2025-02-01", 100)):
+            plan = query_plan(conn, *page_query("u", flt, cursor))
+            if any(is_full_scan(d) or "TEMP B-TREE" in d for d in plan):
+                offenders[f"{name}{' (com cursor)' if cursor else ''}"] = plan
+    return offenders
+
+
+def _main(argv=None):
+    import argparse
+
+    from mim_core.db import get_conn, migrate, scratch_copy
+
+    ap = argparse.ArgumentParser(prog="python -m mim_core.event_log", description="Registro de eventos do Versão 2.0 de Mim")
+    ap.add_argument("command", choices=["check", "search"])
+    ap.add_argument("db", nargs="?", default="versao2_mim.db")
+    ap.add_argument("--user")
+    ap.add_argument("--query", default="")
+    args = ap.parse_args(argv)
+
+    path = Path(args.db)
+    if args.command == "search":
+        migrate(path)
+        df = search_notes(get_conn(path), args.user, args.query)
+        df["snippet"] = df["snippet"].str.replace(SNIPPET_OPEN, "[").str.replace(SNIPPET_CLOSE, "]")
+        print(df[["id", "date", "area", "xp", "snippet"]].to_string(index=False) if not df.empty else "nenhum resultado")
+        return 0
+    with scratch_copy(path) as copy:  # a verificação não migra nem escreve no arquivo informado
+        offenders = check_plans(get_conn(copy))
+    for name, plan in offenders.items():
+        print("PROBLEMA", name, plan)
+    if not offenders:
+        print(f"ok: {len(CHECK_FILTERS) * 2} consultas de página usam índice, sem ordenação temporária")
+    return 1 if offenders else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -0,0 +1,135 @@
+"""
+Eventos de XP do Versão 2.0 de Mim: registro (com o bônus das perks), edição, import em lote de
+CSV e totais por área.
+"""
+from datetime import date
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from mim_core.db import get_conn, mark_changed, transaction
+from mim_core.perks import apply_perks_to_xp, get_perk_resolver
+from mim_core.profiler import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+IMPORT_CHUNK_ROWS = 50_000
+
+
+def add_event(path: Path, event_date: date, area: str, xp: int, note: str = "", type_: str = "manual",
+              user: str = None, meta_id: int = None) -> int:
+    """Grava o evento com o XP já multiplicado pelas perks do usuário; retorna o id."""
+    eff_xp = apply_perks_to_xp(path, area, user, xp)
+    note_final = note or ""
+    if eff_xp != xp:
+        note_final = f"{note_final} [Bônus aplicado: original {xp} -> {eff_xp} XP]" if note_final else f"[Bônus aplicado: original {xp} -> {eff_xp} XP]"
+    with transaction(path) as c:
+        c.execute(
+            "INSERT INTO events (date, area, xp, note, type, user, meta_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (event_date.isoformat(), area, int(eff_xp), note_final, type_, user, int(meta_id) if meta_id is not None else None),
+        )
+        mark_changed(path, "events", user)
+        return c.lastrowid
+
+
+def update_event(path: Path, event_id: int, event_date: date, area: str, xp: int, note: str, user: str):
+    with transaction(path) as c:
+        c.execute(
+            "UPDATE events SET date=?, area=?, xp=?, note=? WHERE id=? AND user=?",
+            (event_date.isoformat(), area, xp, note, event_id, user),
+        )
+        mark_changed(path, "events", user)
+
+
+def _validate_import_chunk(chunk: "pd.DataFrame"):
+    """
+    Valida/normaliza um bloco do CSV de uma vez (sem iterrows).
+    Retorna (linhas válidas com date/area/xp/note/type, rejeitadas com a coluna 'erro').
+    """
+    import numpy as np
+    import pandas as pd
+
+    dates = pd.to_datetime(chunk['date'].str.strip(), format='ISO8601', errors='coerce')
+    areas = chunk['area'].str.strip()
+    xp = pd.to_numeric(chunk['xp'], errors='coerce')
+
+    erro = pd.Series('', index=chunk.index)
+    erro = erro.mask(dates.isna(), 'data inválida')
+    erro = erro.mask((erro == '') & (areas.isna() | (areas == '')), 'área vazia')
+    erro = erro.mask((erro == '') & ~np.isfinite(xp), 'xp inválido')
+    bad = erro != ''
+
+    rejected = chunk[bad].copy()
+    rejected.insert(0, 'linha', rejected.index + 2)  # +1 do cabeçalho, +1 porque linhas começam em 1
+    rejected['erro'] = erro[bad]
+
+    ok = ~bad
+    note = chunk['note'] if 'note' in chunk else pd.Series('', index=chunk.index)
+    type_ = chunk['type'] if 'type' in chunk else pd.Series('import', index=chunk.index)
+    valid = pd.DataFrame({
+        'date': dates[ok].dt.strftime('%Y-%m-%d'),
+        'area': areas[ok],
+        'xp': xp[ok].astype('int64'),  # trunca como o int() do import antigo
+        'note': note[ok].fillna(''),
+        'type': type_[ok].fillna('import'),
+    })
+    return valid, rejected
+
+
+def import_events_csv(path: Path, source, user: str, chunksize: int = IMPORT_CHUNK_ROWS):
+    """
+    Import em lote de um CSV de eventos (colunas date, area, xp e opcionalmente note, type).
+    Lê em blocos de `chunksize` linhas (arquivos grandes não precisam caber na memória), aplica os
+    multiplicadores de perks por área de forma vetorizada e grava tudo com executemany numa única
+    transação — ou o arquivo entra inteiro, ou nada entra.
+    Retorna (quantidade importada, DataFrame de linhas rejeitadas com a coluna 'erro').
+    Levanta ValueError se faltarem colunas obrigatórias.
+    """
+    import numpy as np
+    import pandas as pd
+
+    resolver = get_perk_resolver(path, user)
+    imported = 0
+    rejects = []
+    with transaction(path) as c:
+        for chunk in pd.read_csv(source, dtype=str, chunksize=chunksize):
+            missing = {'date', 'area', 'xp'} - set(chunk.columns)
+            if missing:
+                raise ValueError(f"colunas obrigatórias ausentes: {', '.join(sorted(missing))}")
+            valid, rejected = _validate_import_chunk(chunk)
+            if not rejected.empty:
+                rejects.append(rejected)
+            if valid.empty:
+                continue
+            # inserir em ordem de data mantém os índices (user, date) e o rollup com escrita mais local
+            valid = valid.sort_values('date', kind='stable')
+
+            mult = resolver.multipliers(valid['area'])
+            eff_xp = np.round(valid['xp'] * mult).astype('int64')
+            bonus = eff_xp != valid['xp']
+            tag = '[Bônus aplicado: original ' + valid['xp'].astype(str) + ' -> ' + eff_xp.astype(str) + ' XP]'
+            note = valid['note'].where(~bonus, np.where(valid['note'] != '', valid['note'] + ' ' + tag, tag))
+
+            c.executemany(
+                "INSERT INTO events (date, area, xp, note, type, user, meta_id) VALUES (?, ?, ?, ?, ?, ?, NULL)",
+                zip(valid['date'], valid['area'], eff_xp.tolist(), note, valid['type'], [user] * len(valid)),
+            )
+            imported += len(valid)
+        mark_changed(path, "events", user)
+    return imported, (pd.concat(rejects) if rejects else pd.DataFrame(columns=['linha', 'erro']))
+
+
+@profiled
+def compute_area_xp_totals(path: Path, user: str = None) -> dict:
+    """
+    Retorna dict {area: total_xp} somando todos eventos dessa área.
+    Por padrão inclui todos os eventos (incluindo os vinculados a metas).
+    """
+    c = get_conn(path).cursor()
+    # lê do rollup daily_xp; eventos sem usuário ficam com user='' lá
+    if user:
+        c.execute("SELECT area, SUM(xp_sum) FROM daily_xp WHERE user IN (?, '') GROUP BY area", (user,))
+    else:
+        c.execute("SELECT area, SUM(xp_sum) FROM daily_xp GROUP BY area")
+    rows = c.fetchall()
+    return {r[0]: int(r[1] or 0) for r in rows}
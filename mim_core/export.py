@@ -0,0 +1,126 @@
+"""
+Exportação do Versão 2.0 de Mim: lê direto do SQLite em blocos (fetchmany) e escreve CSV,
+CSV gzip ou Parquet num arquivo temporário — sem montar um DataFrame com o histórico inteiro.
+
+Os arquivos gerados ficam em cache no disco, pela chave (consulta, parâmetros, formato, versão de
+dados): o mesmo download não é refeito até a próxima escrita. O cache é por processo (as versões
+de dados do mim_core.db recomeçam do zero a cada processo) e é apagado na saída.
+"""
+import atexit
+import csv
+import gzip
+import hashlib
+import importlib.util
+import io
+import os
+import shutil
+import tempfile
+import threading
+from pathlib import Path
+
+from mim_core.db import get_conn
+
+EXPORT_CHUNK_ROWS = 10_000
+
+# formato -> (mime, extensão)
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "csv.gz": ("application/gzip", ".csv.gz"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+
+_ARROW_TYPES = {"INTEGER": "int64", "REAL": "float64"}
+
+
+def available_formats() -> list:
+    """Formatos que dá para gerar aqui: Parquet só com o pyarrow (opcional, fora do requirements.txt) instalado."""
+    return [fmt for fmt in EXPORT_FORMATS if fmt != "parquet" or importlib.util.find_spec("pyarrow") is not None]
+
+
+def _write_csv(out, cursor, columns, chunk_rows: int, compress: bool):
+    raw = gzip.GzipFile(fileobj=out, mode="wb") if compress else out
+    text = io.TextIOWrapper(raw, encoding="utf-8", newline="")
+    writer = csv.writer(text)
+    writer.writerow(columns)
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            break
+        writer.writerows(rows)
+    text.flush()
+    text.detach()
+    if compress:
+        raw.close()  # fecha só o gzip (escreve o trailer); `out` continua aberto
+
+
+def _write_parquet(out, cursor, columns, chunk_rows: int, conn, table: str):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    # tipos pelas colunas declaradas da tabela: blocos só com NULL não mudam o esquema no meio do arquivo
+    declared = {}
+    if table:
+        declared = {r[1]: (r[2] or "").upper() for r in conn.execute(f"PRAGMA table_info({table})").fetchall()}
+    schema = pa.schema([(c, getattr(pa, _ARROW_TYPES.get(declared.get(c), "string"))()) for c in columns])
+    with pq.ParquetWriter(out, schema) as writer:
+        while True:
+            rows = cursor.fetchmany(chunk_rows)
+            if not rows:
+                break
+            arrays = [pa.array(col, type=field.type) for col, field in zip(zip(*rows), schema)]
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+
+def export_query(path: Path, sql: str, params=(), fmt: str = "csv", out=None, table: str = None,
+                 chunk_rows: int = EXPORT_CHUNK_ROWS):
+    """
+    Executa `sql` e grava o resultado em `out` (binário) no formato `fmt`, bloco a bloco.
+    `table` informa os tipos declarados para o esquema Parquet. Retorna `out`.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"formato de exportação desconhecido: {fmt}")
+    conn = get_conn(path)
+    cursor = conn.execute(sql, params)
+    columns = [d[0] for d in cursor.description]
+    if fmt == "parquet":
+        _write_parquet(out, cursor, columns, chunk_rows, conn, table)
+    else:
+        _write_csv(out, cursor, columns, chunk_rows, compress=(fmt == "csv.gz"))
+    return out
+
+
+# ---------- Cache em disco (por processo)
+_cache_dir = None
+_cache_lock = threading.Lock()
+
+
+def _export_dir() -> Path:
+    global _cache_dir
+    with _cache_lock:
+        if _cache_dir is None:
+            _cache_dir = Path(tempfile.mkdtemp(prefix="mim_exports_"))
+            atexit.register(shutil.rmtree, _cache_dir, True)
+        return _cache_dir
+
+
+def cached_export(path: Path, sql: str, params=(), fmt: str = "csv", table: str = None, version=None):
+    """
+    Conteúdo do arquivo exportado, gerado só na primeira chamada para a mesma
+    (consulta, parâmetros, formato) e `version` — passe a versão de dados dos dados consultados.
+    Versões antigas da mesma consulta são apagadas ao gerar uma nova.
+    """
+    query_key = hashlib.sha1(repr((str(path), sql, tuple(params), fmt)).encode("utf-8")).hexdigest()[:16]
+    version_key = hashlib.sha1(repr(version).encode("utf-8")).hexdigest()[:8]
+    directory = _export_dir()
+    target = directory / f"{query_key}-{version_key}{EXPORT_FORMATS[fmt][1]}"
+    if not target.exists():
+        with tempfile.NamedTemporaryFile(dir=directory, suffix=".part", delete=False) as tmp:
+            export_query(path, sql, params, fmt, out=tmp, table=table)
+        os.replace(tmp.name, target)  # atômico: leitores concorrentes nunca veem arquivo pela metade
+        for stale in directory.glob(f"{query_key}-*"):
+            if stale != target:
+                try:
+                    stale.unlink()
+                except OSError:
+                    pass  # já removido por outra thread (ou em uso, no Windows)
+    return target.read_bytes()
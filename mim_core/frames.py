@@ -0,0 +1,123 @@
+"""
+Frames canônicos de eventos do Versão 2.0 de Mim.
+
+Os eventos (e o rollup daily_xp) viram um DataFrame tipado e compacto, montado uma vez por versão
+de dados e usado por todas as análises sem nenhuma reconversão:
+
+- date: datetime64[s] (meia-noite do dia) — o pandas não tem datetime64[D]; segundos é a menor
+  resolução suportada e ocupa os mesmos 8 bytes. Nada de objetos `date` do Python;
+- area / type / user: category;
+- xp: int32 (somas saem em int64); id: int64; meta_id: Int64 (nullable);
+- note: fora do frame. `read_event_notes` busca as notas só onde elas são mostradas.
+
+Relatório de memória por 100 mil eventos e tempo das análises (frame antigo x tipado):
+    python -m benchmarks.bench_event_frame --events 100000
+"""
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+DATE_DTYPE = "datetime64[s]"
+
+EVENT_COLUMNS = ["id", "date", "area", "xp", "type", "user", "meta_id"]
+EVENT_DTYPES = {"id": "int64", "area": "category", "xp": "int32", "type": "category", "user": "category",
+                "meta_id": "Int64"}
+
+DAILY_COLUMNS = ["date", "area", "type", "xp", "event_count"]
+DAILY_DTYPES = {"area": "category", "type": "category", "xp": "int32", "event_count": "int32"}
+
+# aliases antigos do resample que o pandas 2.2 deprecou
+_FREQ_ALIASES = {"M": "ME", "Y": "YE", "Q": "QE"}
+
+
+def parse_days(values: pd.Series) -> pd.Series:
+    """'YYYY-MM-DD[...]' -> datetime64[s] da meia-noite do dia (NaT para datas inválidas)."""
+    try:
+        days = pd.to_datetime(values, format="%Y-%m-%d")  # caso comum: só a data, formato fixo
+    except (TypeError, ValueError):
+        days = pd.to_datetime(values.astype("string").str.slice(0, 10), format="%Y-%m-%d", errors="coerce")
+    return days.astype(DATE_DTYPE)
+
+
+def _typed(df: pd.DataFrame, columns: list, dtypes: dict) -> pd.DataFrame:
+    if df.empty:
+        return pd.DataFrame({c: pd.Series(dtype=dtypes.get(c, DATE_DTYPE if c == "date" else "object")) for c in columns})
+    df = df.astype({c: t for c, t in dtypes.items() if c in df.columns})
+    if "date" in df.columns:
+        df["date"] = parse_days(df["date"])
+    return df
+
+
+def typed_events(df: pd.DataFrame) -> pd.DataFrame:
+    """Aplica o esquema canônico a um frame de eventos (colunas de EVENT_COLUMNS; 'note' é descartada)."""
+    return _typed(df[[c for c in EVENT_COLUMNS if c in df.columns]], EVENT_COLUMNS, EVENT_DTYPES)
+
+
+def read_events(conn, user: str = None) -> pd.DataFrame:
+    """Eventos do usuário (todos, com user=None) no esquema canônico, em ordem de data, sem as notas."""
+    sql = "SELECT id, date, area, xp, type, user, meta_id FROM events"
+    params = ()
+    if user:
+        sql += " WHERE user=?"
+        params = (user,)
+    df = pd.read_sql_query(sql + " ORDER BY date ASC", conn, params=params)
+    return _typed(df, EVENT_COLUMNS, EVENT_DTYPES)
+
+
+def read_event_notes(conn, user: str = None) -> pd.Series:
+    """Notas dos eventos, indexadas pelo id — carregadas à parte do frame, só por quem as exibe."""
+    if user:
+        rows = conn.execute("SELECT id, note FROM events WHERE user=?", (user,)).fetchall()
+    else:
+        rows = conn.execute("SELECT id, note FROM events").fetchall()
+    ids = np.fromiter((r[0] for r in rows), dtype=np.int64, count=len(rows))
+    return pd.Series([r[1] or "" for r in rows], index=pd.Index(ids, name="id"), dtype="object", name="note")
+
+
+def read_daily_xp(conn, user: str = None) -> pd.DataFrame:
+    """Rollup daily_xp do usuário no esquema canônico (colunas date/area/type/xp/event_count)."""
+    df = pd.read_sql_query(
+        "SELECT day AS date, area, type, xp_sum AS xp, event_count FROM daily_xp WHERE user=? ORDER BY day ASC",
+        conn, params=(user or "",),
+    )
+    return _typed(df, DAILY_COLUMNS, DAILY_DTYPES)
+
+
+# ---------- Análises sobre o frame tipado (sem pd.to_datetime)
+def day_start(d: date) -> np.datetime64:
+    """`date` -> datetime64[s] comparável com a coluna date do frame."""
+    return np.datetime64(d, "s")
+
+
+def xp_total(df: pd.DataFrame) -> int:
+    return int(df["xp"].sum()) if not df.empty else 0
+
+
+def xp_since(df: pd.DataFrame, start: date) -> int:
+    """XP a partir de `start` (inclusive)."""
+    if df.empty:
+        return 0
+    return int(df["xp"].to_numpy()[df["date"].to_numpy() >= day_start(start)].sum())
+
+
+def xp_by_area(df: pd.DataFrame, areas: list = None, start: date = None) -> pd.Series:
+    """XP por área (opcionalmente a partir de `start`), reindexado por `areas` com 0 onde faltar."""
+    if not df.empty and start is not None:
+        df = df[df["date"].to_numpy() >= day_start(start)]
+    if df.empty:
+        s = pd.Series(dtype="int64")
+    else:
+        s = df.groupby("area", observed=True)["xp"].sum().astype("int64")
+        s.index = s.index.astype(str)
+    if areas is not None:
+        s = s.reindex(areas, fill_value=0)
+    return s
+
+
+def xp_over_time(df: pd.DataFrame, freq: str = "W") -> pd.DataFrame:
+    """XP somado por período ('D', 'W', 'M'...), com períodos vazios zerados. Colunas date/xp."""
+    if df.empty:
+        return pd.DataFrame({"date": pd.Series(dtype=DATE_DTYPE), "xp": pd.Series(dtype="int64")})
+    res = df.groupby(pd.Grouper(key="date", freq=_FREQ_ALIASES.get(freq, freq)))["xp"].sum().astype("int64")
+    return res.reset_index()
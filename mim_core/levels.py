@@ -0,0 +1,186 @@
+"""
+Curvas de nível do Versão 2.0 de Mim.
+
+Cada curva é uma tabela pré-calculada de XP acumulado por nível (até LEVEL_CAP); nível, limiar e
+progresso saem de uma busca binária (bisect) em vez de laços que somam nível a nível. A versão
+vetorizada (np.searchsorted) calcula o nível de um array inteiro de totais de uma vez; o numpy só é
+importado (e o array da tabela montado) na primeira chamada vetorizada.
+
+Verificação de paridade com as implementações originais em laço:
+    python -m mim_core.levels check-parity
+"""
+from bisect import bisect_right
+
+LEVEL_CAP = 1000
+_INT64_MAX = 2 ** 63 - 1
+
+
+class LevelCurve:
+    """
+    thresholds[i] = XP acumulado necessário para chegar ao nível i + 1 (thresholds[0] == 0).
+    Níveis começam em 1; XP negativo ou abaixo do primeiro limiar fica no nível 1.
+    """
+
+    def __init__(self, name: str, thresholds: list):
+        self.name = name
+        self.thresholds = thresholds
+        self._array = None
+
+    @classmethod
+    def power(cls, base: float, exp: float, max_level: int = LEVEL_CAP):
+        """Nível n exige int(base * n ** exp) de XP acumulado; vai até o nível max_level + 1."""
+        return cls(f"power({base}, {exp})", [0] + [int(base * (n ** exp)) for n in range(2, max_level + 2)])
+
+    @classmethod
+    def geometric(cls, first_step: int, growth: float, max_level: int = LEVEL_CAP):
+        """Cada nível custa int(custo anterior * growth) a mais, começando em first_step."""
+        thresholds = [0]
+        step = first_step
+        for _ in range(max_level - 1):
+            thresholds.append(thresholds[-1] + step)
+            step = int(step * growth)
+        return cls(f"geometric({first_step}, {growth})", thresholds)
+
+    @property
+    def max_level(self) -> int:
+        return len(self.thresholds)
+
+    def level(self, xp: int) -> int:
+        return max(1, bisect_right(self.thresholds, xp))
+
+    def levels(self, xp):
+        """Nível para cada total de um array/Series de XP (np.ndarray)."""
+        import numpy as np
+
+        if self._array is None:
+            # limiares acima de int64 são inalcançáveis por totais int64: ficam fora do array do numpy
+            self._array = np.array([t for t in self.thresholds if t <= _INT64_MAX], dtype=np.int64)
+        lv = np.searchsorted(self._array, np.asarray(xp, dtype=np.int64), side="right")
+        return np.maximum(lv, 1)
+
+    def xp_for_level(self, level: int) -> int:
+        """XP acumulado para atingir `level` (0 para nível <= 1; satura no último nível da tabela)."""
+        if level <= 1:
+            return 0
+        return self.thresholds[min(level, self.max_level) - 1]
+
+
+# ---------- Curvas do app
+# LEVEL_CURVE dá o nível; XP_CURVE (BASE_XP * n ** XP_EXP) dá a barra de progresso do Snapshot.
+# curva de níveis: o nível 2 custa 100 XP e cada nível seguinte custa 1.5x o anterior
+LEVEL_FIRST_STEP = 100
+LEVEL_STEP_GROWTH = 1.5
+BASE_XP = 100
+XP_EXP = 1.45
+LEVEL_CURVE = LevelCurve.geometric(LEVEL_FIRST_STEP, LEVEL_STEP_GROWTH)
+XP_CURVE = LevelCurve.power(BASE_XP, XP_EXP)
+# curvas específicas por área (ex.: {"Coding": LevelCurve.geometric(150, 1.5)}); as demais usam LEVEL_CURVE
+AREA_LEVEL_CURVES = {}
+
+
+def xp_for_level(level: int) -> int:
+    return XP_CURVE.xp_for_level(level)
+
+
+def level_from_xp(xp: int) -> int:
+    return LEVEL_CURVE.level(xp)
+
+
+def area_levels_from_xp(area_xp) -> dict:
+    """{area: nível} para um dict/Series {area: XP total}, respeitando AREA_LEVEL_CURVES."""
+    areas = list(area_xp.keys())
+    xps = [int(area_xp[a]) for a in areas]
+    levels = LEVEL_CURVE.levels(xps)
+    for i, a in enumerate(areas):
+        if a in AREA_LEVEL_CURVES:
+            levels[i] = AREA_LEVEL_CURVES[a].level(xps[i])
+    return dict(zip(areas, levels.tolist()))
+
+
+def xp_progress_in_level(xp: int):
+    """(nível, XP dentro do nível, XP do nível inteiro, fração concluída) na XP_CURVE."""
+    level = level_from_xp(xp)
+    base = xp_for_level(level)
+    xp_curr_level = xp - base
+    xp_next_level = xp_for_level(level + 1) - base
+    pct = xp_curr_level / xp_next_level if xp_next_level > 0 else 0
+    return level, xp_curr_level, xp_next_level, pct
+
+
+# ---------- Paridade com os laços originais
+def _loop_power_level(xp: int, base: float, exp: float) -> int:
+    def xp_for_level(level):
+        if level <= 1:
+            return 0
+        return int(base * (level ** exp))
+
+    if xp <= 0:
+        return 1
+    lvl = 1
+    while xp_for_level(lvl + 1) <= xp:
+        lvl += 1
+        if lvl > 1000:
+            break
+    return lvl
+
+
+def _loop_geometric_level(xp: int) -> int:
+    if xp < 100:
+        return 1
+    lvl = 1
+    threshold = 100
+    while xp >= threshold:
+        xp -= threshold
+        lvl += 1
+        threshold = int(threshold * 1.5)
+    return lvl
+
+
+def check_parity(samples: int = 20000, seed: int = 0) -> list:
+    """
+    Compara as curvas com os laços originais em XP aleatório (várias escalas) e em cada limiar ±1.
+    Retorna as divergências como (curva, xp, esperado, obtido).
+    """
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    power = LevelCurve.power(100, 1.45)
+    geometric = LevelCurve.geometric(100, 1.5)
+    cases = [
+        ("power", power, lambda xp: _loop_power_level(xp, 100, 1.45), power.thresholds[:LEVEL_CAP + 1]),
+        ("geometric", geometric, _loop_geometric_level, geometric.thresholds[:40]),
+    ]
+    diffs = []
+    for name, curve, loop, edges in cases:
+        xs = [int(x) for x in rng.integers(-1000, 10 ** 6, samples)]
+        xs += [int(x) for x in (10 ** rng.uniform(0, 9, samples)).astype(np.int64)]
+        xs += [t + d for t in edges for d in (-1, 0, 1)]
+        vec = curve.levels(xs)
+        for xp, lv_vec in zip(xs, vec):
+            expected = loop(xp)
+            got = curve.level(xp)
+            if got != expected or int(lv_vec) != expected:
+                diffs.append((name, xp, expected, (got, int(lv_vec))))
+    return diffs
+
+
+def _main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="python -m mim_core.levels", description="Curvas de nível do Versão 2.0 de Mim")
+    ap.add_argument("command", choices=["check-parity"])
+    ap.add_argument("--samples", type=int, default=20000)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    if args.command == "check-parity":
+        diffs = check_parity(args.samples, args.seed)
+        for d in diffs[:20]:
+            print("DIVERGÊNCIA", d)
+        if not diffs:
+            print("ok: tabelas conferem com os laços originais")
+        return 1 if diffs else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -0,0 +1,120 @@
+"""
+Metas semanais do Versão 2.0 de Mim: cadastro, progresso da semana (eventos vinculados à meta) e a
+quest diária sugerida.
+"""
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from mim_core.dates import parse_datetime
+from mim_core.db import get_conn, mark_changed, transaction
+from mim_core.profiler import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def set_meta(path: Path, area: str, weekly_target: int, note: str = "", daily_suggestion: int = 0, user: str = None, meta_id: int = None):
+    """
+    Cria ou atualiza uma meta. Ao criar, grava created_at.
+    """
+    with transaction(path) as c:
+        now_iso = datetime.now().isoformat()
+        if meta_id:
+            c.execute(
+                "UPDATE metas SET area=?, weekly_target=?, note=?, daily_suggestion=?, updated_at=? , user=?, active=1 WHERE id=?",
+                (area, int(weekly_target), note, int(daily_suggestion), now_iso, user, int(meta_id))
+            )
+        else:
+            c.execute(
+                "INSERT INTO metas (area, weekly_target, note, daily_suggestion, active, user, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (area, int(weekly_target), note, int(daily_suggestion), 1, user, now_iso, now_iso)
+            )
+
+
+def get_meta(path: Path, meta_id: int, user: str = None):
+    import pandas as pd
+
+    conn = get_conn(path)
+    if user:
+        df = pd.read_sql_query("SELECT * FROM metas WHERE id=? AND (user=? OR user IS NULL)", conn, params=(meta_id, user))
+    else:
+        df = pd.read_sql_query("SELECT * FROM metas WHERE id=?", conn, params=(meta_id,))
+    if df.empty:
+        return None
+    return df.iloc[0].to_dict()
+
+
+@profiled
+def get_metas_for_user(path: Path, user: str = None) -> "pd.DataFrame":
+    import pandas as pd
+
+    conn = get_conn(path)
+    if user:
+        df = pd.read_sql_query("SELECT * FROM metas WHERE (user=? OR user IS NULL) ORDER BY id DESC", conn, params=(user,))
+    else:
+        df = pd.read_sql_query("SELECT * FROM metas ORDER BY id DESC", conn)
+    return df
+
+
+@profiled
+def compute_week_progress_for_meta(path: Path, meta_row: dict) -> dict:
+    """
+    Para metas específicas: soma apenas eventos com events.meta_id == meta.id,
+    entre created_at e created_at+6 dias (ou até hoje).
+    """
+    meta_id = int(meta_row['id'])
+    weekly_target = int(meta_row['weekly_target'])
+    created_at_str = meta_row.get('created_at') or meta_row.get('created') or None
+    today = date.today()
+
+    if created_at_str:
+        try:
+            start = parse_datetime(created_at_str).date()
+        except Exception:
+            start = today
+    else:
+        start = today
+
+    end = start + timedelta(days=6)
+    effective_end = min(end, today)
+
+    row = get_conn(path).execute(
+        "SELECT SUM(xp) FROM events WHERE meta_id=? AND (user=? OR user IS NULL) AND date BETWEEN ? AND ?",
+        (meta_id, meta_row.get('user'), start.isoformat(), effective_end.isoformat())
+    ).fetchone()
+    accumulated = int(row[0] or 0)
+
+    percent = (accumulated / weekly_target) * 100 if weekly_target > 0 else 0.0
+    return {
+        'accumulated_xp': accumulated,
+        'weekly_target': weekly_target,
+        'percent': round(percent, 1),
+        'start_date': start,
+        'end_date': end
+    }
+
+
+def create_or_update_daily_quest_from_meta(path: Path, meta_row: dict):
+    """
+    Se meta_row.daily_suggestion > 0, cria ou atualiza uma quest diária com title 'Meta: <area> - diária' e xp_reward = daily_suggestion.
+    Retorna quest_id.
+    """
+    ds = int(meta_row.get('daily_suggestion') or 0)
+    if ds <= 0:
+        return None
+    title = f"Meta diária: {meta_row['area']}"
+    with transaction(path) as c:
+        # procura quest existente com mesmo título e user
+        c.execute("SELECT id FROM quests WHERE title=? AND (user=? OR user IS NULL)", (title, meta_row.get('user')))
+        res = c.fetchone()
+        now_iso = datetime.now().isoformat()
+        if res:
+            qid = res[0]
+            c.execute("UPDATE quests SET xp_reward=?, cadence='daily', last_done=NULL, active=1 WHERE id=?", (ds, qid))
+        else:
+            c.execute("INSERT INTO quests (title, area, xp_reward, cadence, last_done, streak, active, user) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                      (title, meta_row['area'], ds, 'daily', None, 0, 1, meta_row.get('user')))
+            qid = c.lastrowid
+        mark_changed(path, "quests", meta_row.get('user'))
+    return qid
@@ -0,0 +1,109 @@
+"""
+Penalidades do Versão 2.0 de Mim: cadastro, aplicação manual (evento negativo + auditoria em
+penalty_applications) e o bloqueio por dias entre aplicações (gravado em user_config).
+"""
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from mim_core.config import load_user_settings, set_user_configs
+from mim_core.db import get_conn, mark_changed, transaction
+from mim_core.events import add_event
+from mim_core.profiler import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+
+def add_penalty(path: Path, name: str, area: str, amount: int, user: str = None):
+    with transaction(path) as c:
+        c.execute("INSERT INTO penalties (name, area, amount, user) VALUES (?, ?, ?, ?)",
+                  (name, area, int(amount), user))
+
+
+@profiled
+def load_penalties(path: Path, user: str = None) -> "pd.DataFrame":
+    import pandas as pd
+
+    conn = get_conn(path)
+    if user:
+        df = pd.read_sql_query(
+            "SELECT * FROM penalties WHERE (user=? OR user IS NULL) ORDER BY id DESC",
+            conn, params=(user,))
+    else:
+        df = pd.read_sql_query("SELECT * FROM penalties ORDER BY id DESC", conn)
+
+    if df.empty:
+        return pd.DataFrame(columns=["id","name","area","amount","user","created_at"])
+
+    # remove duplicatas globais se existir versão do usuário com mesmo nome
+    specific = df[df["user"] == user]["name"].tolist()
+    if specific:
+        df = df[~((df["user"].isna()) & (df["name"].isin(specific)))]
+
+    return df
+
+
+def _penalty_last_applied_key(user: str, penalty_id: int):
+    return f"penalty_last_applied_{user}_{penalty_id}"
+
+
+def can_apply_penalty(path: Path, user: str, penalty_id: int, block_days: int = 1):
+    last_date = load_user_settings(path, user).get_date(_penalty_last_applied_key(user, penalty_id))
+
+    if last_date is None:
+        return True, ""
+
+    if (date.today() - last_date).days >= block_days:
+        return True, ""
+    else:
+        next_allowed = last_date + timedelta(days=block_days)
+        return False, (
+            f"Você só poderá aplicar novamente em {next_allowed.isoformat()}."
+        )
+
+
+# ---------- Auditoria ----------
+def record_penalty_application(path: Path, penalty_id: int, penalty_name: str,
+                               user: str, area: str, amount: int, note: str = ""):
+    with transaction(path) as c:
+        c.execute("""
+            INSERT INTO penalty_applications
+            (penalty_id, penalty_name, user, area, amount, note, applied_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        """, (penalty_id, penalty_name, user, area, amount, note,
+              datetime.now().isoformat()))
+        mark_changed(path, "penalties", user)
+
+
+# ---------- Aplicação da penalidade ----------
+def apply_penalty(path: Path, penalty_row: dict, user: str, block_days: int = 1):
+    """
+    Evento negativo, auditoria e bloqueio numa única transação: ou as três escritas entram, ou
+    nenhuma. Erros sobem para quem chamou — pela fila do escritor, o SAVEPOINT do pedido é desfeito.
+    Retorna (aplicada, mensagem); (False, motivo) se a penalidade ainda está bloqueada.
+    """
+    pid = int(penalty_row["id"])
+    name = penalty_row["name"]
+    area = penalty_row["area"]
+    amount = int(penalty_row["amount"])
+
+    with transaction(path):
+        # relido dentro da transação: dois cliques seguidos não aplicam duas vezes
+        allowed, msg = can_apply_penalty(path, user, pid, block_days)
+        if not allowed:
+            return False, msg
+
+        # evento negativo
+        add_event(path, date.today(), area, -abs(amount),
+                  note=f"Penalidade: {name}", type_="penalty", user=user)
+
+        # auditoria
+        record_penalty_application(path, pid, name, user, area,
+                                   -abs(amount),
+                                   note=f"Aplicado por {user}")
+
+        # bloquear por block_days
+        set_user_configs(path, user, {_penalty_last_applied_key(user, pid): date.today().isoformat()})
+
+    return True, f"Penalidade '{name}' aplicada: -{amount} XP."
@@ -0,0 +1,217 @@
+"""
+Perks do Versão 2.0 de Mim: cadastro, perks padrão, ativação e o multiplicador de XP que cada
+evento recebe (PerkResolver, reconstruído só quando alguma perk muda ou expira).
+"""
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import TYPE_CHECKING
+
+from mim_core.dates import parse_datetime
+from mim_core.db import data_version, get_conn, mark_changed, transaction
+from mim_core.profiler import profiled
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+# resolvers por (arquivo, usuário), compartilhados pelo processo
+_resolvers = {}
+
+
+def add_perk(path: Path, name: str, area: str = None, unlock_level: int = 0, effect: str = "", user: str = None,
+             duration_days: int = 0, multiplier: float = 1.0, active: int = 0):
+    """
+    Insere uma perk. Garante que os campos duration_days e multiplier sejam salvos.
+    Use apenas para inserir novas linhas.
+    """
+    with transaction(path) as c:
+        # Insere explicitamente todas as colunas
+        c.execute(
+            """INSERT INTO perks (name, area, unlock_level, effect, user, duration_days, multiplier, start_date, active)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (name, area, int(unlock_level), effect, user, int(duration_days), float(multiplier), None, int(active))
+        )
+        mark_changed(path, "perks", user)
+
+
+def seed_default_perks(path: Path):
+    """
+    Insere/atualiza perks padrões declaradas no código. Faz upsert:
+    - Se já existir perk com mesmo name+area+user -> atualiza multiplier/duration_days/effect (mantendo start_date/active).
+    - Caso contrário -> insere nova.
+    """
+    defaults = [
+        {'name': 'Focus Booster', 'area': 'Produtividade', 'unlock_level': 3, 'effect': '10% XP bonus para tarefas de produtividade', 'user': None, 'duration_days': 3, 'multiplier': 1.10},
+        {'name': 'Deep Work', 'area': 'Coding', 'unlock_level': 5, 'effect': 'XP x1.2 em Coding por 7 dias', 'user': 'marcel.pimenta', 'duration_days': 7, 'multiplier': 1.20},
+        {'name': 'Deep Work', 'area': 'Educação/Inglês/Produtividade', 'unlock_level': 5, 'effect': 'XP x1.2 em Educação, Inglês e Produtividade por 7 dias', 'user': 'larissa.souza', 'duration_days': 7, 'multiplier': 1.20},
+    ]
+    with transaction(path) as c:
+        for p in defaults:
+            # procura por match exato name+area+user (user pode ser NULL)
+            if p['user'] is None:
+                c.execute("SELECT id FROM perks WHERE name=? AND area=? AND user IS NULL", (p['name'], p['area']))
+            else:
+                c.execute("SELECT id FROM perks WHERE name=? AND area=? AND user=?", (p['name'], p['area'], p['user']))
+            res = c.fetchone()
+            if res:
+                pid = res[0]
+                # atualiza multiplicador, duration e effect se diferente (não altera start_date/active)
+                c.execute(
+                    "UPDATE perks SET unlock_level=?, effect=?, duration_days=?, multiplier=? WHERE id=?",
+                    (int(p['unlock_level']), p['effect'], int(p['duration_days']), float(p['multiplier']), int(pid))
+                )
+            else:
+                # insere
+                c.execute(
+                    "INSERT INTO perks (name, area, unlock_level, effect, user, duration_days, multiplier, start_date, active) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (p['name'], p['area'], int(p['unlock_level']), p['effect'], p['user'], int(p['duration_days']), float(p['multiplier']), None, 0)
+                )
+        mark_changed(path, "perks")
+
+
+def activate_perk(path: Path, perk_id: int, user: str = None):
+    """Ativa a perk (grava start_date = agora e active=1)."""
+    with transaction(path) as c:
+        now_iso = datetime.now().isoformat()
+        # garante que a linha corresponde ao usuário ou seja global
+        c.execute("UPDATE perks SET start_date=?, active=1 WHERE id=? AND (user=? OR user IS NULL)", (now_iso, perk_id, user))
+        mark_changed(path, "perks", user)
+
+
+def deactivate_perk(path: Path, perk_id: int, user: str = None):
+    """Desativa a perk (active=0)."""
+    with transaction(path) as c:
+        c.execute("UPDATE perks SET active=0, start_date=NULL WHERE id=? AND (user=? OR user IS NULL)", (perk_id, user))
+        mark_changed(path, "perks", user)
+
+
+class PerkResolver:
+    """
+    Perks ativas de um usuário (+ globais) pré-processadas para resolver multiplicadores sem pandas.
+    Mesma regra de sempre: área da perk separada por '/' casa por *contains* (case-insensitive) com a
+    área do evento, perk sem área vale para todas, e vence o maior multiplicador (sem stacking).
+    """
+
+    def __init__(self, rows, now: datetime, version: int):
+        self.version = version
+        self.expires_at = None  # menor expiração entre as perks em vigor: depois dela, reconstruir
+        self._rules = []  # (segmentos normalizados, ou None = todas as áreas; multiplicador)
+        self._memo = {}  # área normalizada -> multiplicador
+        for area, multiplier, duration_days, start_date in rows:
+            dur = int(duration_days or 0)
+            if dur > 0 and start_date:
+                try:
+                    # ativa enquanto (hoje - data de início).days < duração, i.e. até a meia-noite do último dia
+                    ends = datetime.combine(parse_datetime(start_date).date() + timedelta(days=dur), datetime.min.time())
+                except Exception:
+                    ends = None  # data ilegível: considera ativa (como antes)
+                if ends is not None:
+                    if now >= ends:
+                        continue
+                    self.expires_at = ends if self.expires_at is None else min(self.expires_at, ends)
+            r_area = str(area or "").strip().lower()
+            parts = tuple(p.strip() for p in r_area.split('/') if p.strip()) if r_area else None
+            self._rules.append((parts, float(multiplier or 1.0)))
+
+    def is_current(self, version: int, now: datetime) -> bool:
+        return self.version == version and (self.expires_at is None or now < self.expires_at)
+
+    def multiplier(self, area: str) -> float:
+        """Maior multiplicador entre as perks que casam com `area` (1.0 se nenhuma)."""
+        a_norm = (area or "").strip().lower()
+        mult = self._memo.get(a_norm)
+        if mult is None:
+            matches = [
+                m for parts, m in self._rules
+                if parts is None or any(p == a_norm or p in a_norm or a_norm in p for p in parts)
+            ]
+            mult = max(matches) if matches else 1.0
+            self._memo[a_norm] = mult
+        return mult
+
+    def multipliers(self, areas: "pd.Series") -> "pd.Series":
+        """Versão vetorizada: resolve cada área distinta uma vez e mapeia a Series inteira."""
+        uniq = areas.unique()
+        return areas.map(dict(zip(uniq, (self.multiplier(a) for a in uniq)))).astype(float)
+
+
+@profiled
+def get_perk_resolver(path: Path, user: str = None) -> PerkResolver:
+    """
+    Resolver do usuário, reconstruído só quando alguma perk muda (versão de dados "perks") ou quando
+    passa a expiração mais próxima entre as perks em vigor.
+    """
+    version = data_version("perks")  # lida antes da consulta: escrita concorrente força novo rebuild
+    now = datetime.now()
+    key = (str(path), user)
+    resolver = _resolvers.get(key)
+    if resolver is None or not resolver.is_current(version, now):
+        conn = get_conn(path)
+        sql = "SELECT area, multiplier, duration_days, start_date FROM perks WHERE active=1"
+        if user:
+            rows = conn.execute(sql + " AND (user=? OR user IS NULL)", (user,)).fetchall()
+        else:
+            rows = conn.execute(sql).fetchall()
+        resolver = PerkResolver(rows, now, version)
+        _resolvers[key] = resolver
+    return resolver
+
+
+def apply_perks_to_xp(path: Path, area: str, user: str, xp: int) -> int:
+    """
+    Aplica perks ativas que influenciem a area (ver PerkResolver):
+      - considera perks ativas do user e globais
+      - faz comparação por *contains* (case-insensitive) para cobrir 'Produtividade' e 'Produtividade/Outros'
+      - aplica o maior multiplicador encontrado (evita stacking indesejado)
+    """
+    mult = get_perk_resolver(path, user).multiplier(area)
+    if mult == 1.0:
+        return xp
+    return int(round(xp * mult))
+
+
+def perk_time_remaining(row) -> str:
+    """
+    Retorna string com tempo restante, em dias/hours, para um perk com start_date/duration_days.
+    """
+    try:
+        sd = row.get('start_date')
+        dur = int(row.get('duration_days', 0) or 0)
+        if dur <= 0:
+            return "Ilimitado"
+        if not sd:
+            return f"{dur} dias (não ativada)"
+        sd_date = parse_datetime(sd)
+        end_dt = sd_date + timedelta(days=dur)
+        rem = end_dt - datetime.now()
+        if rem.total_seconds() <= 0:
+            return "Expirada"
+        days = rem.days
+        hours = rem.seconds // 3600
+        if days > 0:
+            return f"{days}d {hours}h"
+        else:
+            return f"{hours}h"
+    except Exception:
+        return "Desconhecido"
+
+
+@profiled
+def load_perks(path: Path, user: str = None) -> "pd.DataFrame":
+    import pandas as pd
+
+    conn = get_conn(path)
+    if user:
+        # Carrega perks genéricos (user IS NULL) e específicos do usuário
+        df = pd.read_sql_query("SELECT * FROM perks WHERE user=? OR user IS NULL", conn, params=(user,))
+    else:
+        df = pd.read_sql_query("SELECT * FROM perks", conn)
+    if df.empty:
+        return pd.DataFrame(columns=["id","name","area","unlock_level","effect","user"])
+        
+    # Remove perks genéricos se houver uma versão específica do usuário
+    # Isso garante que a Larissa veja a versão dela de 'Deep Work', e não uma versão 'user IS NULL'
+    specific_names = df[df['user'] == user]['name'].tolist()
+    if specific_names:
+        df = df[~((df['user'].isna()) & (df['name'].isin(specific_names)))]
+
+    return df
@@ -0,0 +1,218 @@
+"""
+Modo diagnóstico do Versão 2.0 de Mim: tempo por seção do rerun e SQL por ponto de chamada.
+
+Opt-in por usuário (chave `profiler_enabled` do user_config). Com ele ativo, o app abre uma
+execução medida (`Profiler.run`) em volta do rerun — ou de um fragmento que reexecuta sozinho — e:
+
+- cada `section(nome)` / função decorada com `@profiled` soma chamadas e tempo sob o caminho de
+  seções aberto ("página: Registro / load_badges"), com o número de instruções SQL de dentro;
+- o `set_trace_callback` do sqlite3, instalado só durante a execução na conexão da sessão, conta
+  cada instrução pelo ponto de chamada (primeiro frame do repositório fora do mim_core.db) e pela forma
+  da consulta (literais trocados por ?).
+
+O trace do SQLite avisa só o *início* de cada instrução. O tempo atribuído a ela vai até o próximo
+evento medido — outra instrução ou a entrada/saída de uma seção —, ou seja, inclui o fetch das
+linhas e o que o Python faz com elas até ali; seções mais finas dão números mais precisos.
+
+Desligado, nada é instalado: `section()` é uma leitura de thread-local que devolve um contexto nulo
+compartilhado e `@profiled` acrescenta essa mesma leitura a cada chamada (ver benchmarks/bench_profiler.py).
+"""
+import functools
+import re
+import sys
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+from datetime import datetime
+from pathlib import Path
+
+HISTORY_SIZE = 30
+TOP_N = 10
+SQL_SHAPE_CHARS = 160
+
+_REPO_DIR = str(Path(__file__).resolve().parent.parent)
+# frames deste arquivo não são "ponto de chamada": a instrução é atribuída a quem chamou o mim_core.db
+_SKIP_FILES = {str(Path(__file__).resolve().with_name("db.py"))}
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\bX'[0-9A-Fa-f]*'|\b\d+(?:\.\d+)?\b")
+_SPACES = re.compile(r"\s+")
+
+_local = threading.local()
+_NULL = nullcontext()
+_site_code = {}  # code object -> conta como ponto de chamada?
+
+
+def active():
+    """Execução medida em andamento nesta thread (None com o modo desligado)."""
+    return getattr(_local, "run", None)
+
+
+def sql_shape(sql: str) -> str:
+    """Forma da instrução: o trace traz os parâmetros já expandidos, que viram ? para agrupar."""
+    shape = _SPACES.sub(" ", _LITERALS.sub("?", sql)).strip()
+    return shape if len(shape) <= SQL_SHAPE_CHARS else shape[:SQL_SHAPE_CHARS - 1] + "…"
+
+
+def _is_site(code) -> bool:
+    ok = _site_code.get(code)
+    if ok is None:
+        filename = code.co_filename
+        ok = _site_code[code] = filename.startswith(_REPO_DIR) and filename not in _SKIP_FILES
+    return ok
+
+
+def _call_site(frame) -> str:
+    while frame is not None and not _is_site(frame.f_code):
+        frame = frame.f_back
+    if frame is None:
+        return "?"
+    return f"{Path(frame.f_code.co_filename).name}:{frame.f_lineno} {frame.f_code.co_name}"
+
+
+class Run:
+    """Medições de uma execução: seções (agregadas por caminho) e instruções SQL (por local e forma)."""
+
+    def __init__(self, label: str):
+        self.label = label
+        self.started_at = datetime.now()
+        self.total_ms = 0.0
+        self.statements = 0
+        self.sections = {}  # caminho -> [chamadas, ms, instruções SQL]
+        self.queries = {}   # (local, forma) -> [execuções, ms]
+        self._stack = []
+        self._pending = None  # ([execuções, ms], início) da instrução em andamento
+        self._last_call = None  # (frame, f_lasti, sql) da última chamada do trace
+        self._t0 = time.perf_counter()
+
+    def _close_statement(self, now: float):
+        if self._pending is not None:
+            stats, t = self._pending
+            stats[1] += (now - t) * 1000
+            self._pending = None
+
+    def _trace(self, sql: str):
+        if sql.startswith("-- "):
+            return  # instrução interna de uma tabela virtual (FTS5), parte da instrução em andamento
+        now = time.perf_counter()
+        frame = sys._getframe(1)
+        # o SQLite chama o trace de novo para o programa de cada trigger (e cada instrução dele),
+        # sempre com o texto da instrução de fora: sem volta ao Python no meio, é a mesma instrução
+        call = (frame, frame.f_lasti, sql)
+        if call == self._last_call:
+            return
+        self._last_call = call
+        self._close_statement(now)
+        key = (_call_site(frame), sql_shape(sql))
+        stats = self.queries.get(key)
+        if stats is None:
+            stats = self.queries[key] = [0, 0.0]
+        stats[0] += 1
+        self.statements += 1
+        self._pending = (stats, now)
+
+    def finish(self):
+        now = time.perf_counter()
+        self._close_statement(now)
+        self._last_call = None  # não segura o frame (e as variáveis dele) no histórico
+        self.total_ms = (now - self._t0) * 1000
+
+    def top_sections(self, n: int = TOP_N) -> list:
+        """[(seção, chamadas, ms, instruções SQL)] das `n` seções mais lentas (tempo inclusivo)."""
+        rows = sorted(self.sections.items(), key=lambda kv: kv[1][1], reverse=True)[:n]
+        return [(path, calls, round(ms, 2), sql) for path, (calls, ms, sql) in rows]
+
+    def top_queries(self, n: int = TOP_N) -> list:
+        """[(local, instrução, execuções, ms)] das `n` consultas que mais somaram tempo."""
+        rows = sorted(self.queries.items(), key=lambda kv: kv[1][1], reverse=True)[:n]
+        return [(site, shape, count, round(ms, 2)) for (site, shape), (count, ms) in rows]
+
+
+class _Section:
+    __slots__ = ("run", "name", "t0", "statements")
+
+    def __init__(self, run: Run, name: str):
+        self.run = run
+        self.name = name
+
+    def __enter__(self):
+        run = self.run
+        self.t0 = time.perf_counter()
+        run._close_statement(self.t0)
+        run._stack.append(self.name)
+        self.statements = run.statements
+        return self
+
+    def __exit__(self, *exc):
+        run = self.run
+        now = time.perf_counter()
+        run._close_statement(now)
+        path = " / ".join(run._stack)
+        run._stack.pop()
+        stats = run.sections.get(path)
+        if stats is None:
+            stats = run.sections[path] = [0, 0.0, 0]
+        stats[0] += 1
+        stats[1] += (now - self.t0) * 1000
+        stats[2] += run.statements - self.statements
+        return False
+
+
+def section(name: str):
+    """Context manager que mede um trecho como seção da execução ativa (nulo com o modo desligado)."""
+    run = getattr(_local, "run", None)
+    return _NULL if run is None else _Section(run, name)
+
+
+def profiled(fn):
+    """Decorator: cada chamada de `fn` vira uma seção com o nome da função."""
+    name = fn.__name__
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        run = getattr(_local, "run", None)
+        if run is None:
+            return fn(*args, **kwargs)
+        with _Section(run, name):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+class Profiler:
+    """Histórico (rolante) das execuções medidas de uma sessão."""
+
+    def __init__(self, history: int = HISTORY_SIZE):
+        self.history = deque(maxlen=history)
+
+    @contextmanager
+    def run(self, label: str, conn=None):
+        """
+        Mede o bloco como uma execução e a guarda no histórico, mesmo se o bloco sair por exceção
+        (st.stop, st.rerun). Com `conn`, instala o trace do SQL nela durante o bloco. Aninhado em
+        outra execução da mesma thread, vira só uma seção dela.
+        """
+        if active() is not None:
+            with section(label):
+                yield active()
+            return
+        run = Run(label)
+        _local.run = run
+        if conn is not None:
+            conn.set_trace_callback(run._trace)
+        try:
+            yield run
+        finally:
+            if conn is not None:
+                conn.set_trace_callback(None)
+            _local.run = None
+            run.finish()
+            self.history.append(run)
+
+    def history_rows(self) -> list:
+        """[(início, execução, ms, instruções SQL, seção mais lenta)], da mais recente para a mais antiga."""
+        rows = []
+        for run in reversed(self.history):
+            top = run.top_sections(1)
+            rows.append((run.started_at.strftime("%H:%M:%S"), run.label, round(run.total_ms, 1), run.statements,
+                         top[0][0] if top else ""))
+        return rows
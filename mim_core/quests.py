@@ -0,0 +1,51 @@
+"""
+Quests do Versão 2.0 de Mim: cadastro, edição e conclusão (registro no log quest_completions + evento
+de XP). Streaks são calculadas a partir do log em mim_core.streaks.
+"""
+from datetime import date
+from pathlib import Path
+
+from mim_core.db import mark_changed, transaction
+from mim_core.events import add_event
+
+
+def add_quest(path: Path, title: str, area: str, xp_reward: int, cadence: str = 'daily', user: str = None):
+    with transaction(path) as c:
+        c.execute("INSERT INTO quests (title, area, xp_reward, cadence, user) VALUES (?, ?, ?, ?, ?)", (title, area, xp_reward, cadence, user))
+        mark_changed(path, "quests", user)
+
+
+def update_quest(path: Path, quest_id: int, title: str, area: str, xp_reward: int, cadence: str, user: str):
+    # a streak não é mais editável: sai do log quest_completions (mim_core.streaks)
+    with transaction(path) as c:
+        # Assume que o usuário só pode atualizar quests que criou (user=?) ou quests genéricas (user IS NULL),
+        # mas o teste de `user=?` é mais seguro para evitar que Marcel edite uma quest de Larissa
+        # que porventura ela tenha criado sem o escopo de usuário (se houvesse esse bug).
+        c.execute(
+            "UPDATE quests SET title=?, area=?, xp_reward=?, cadence=? WHERE id=? AND (user=? OR user IS NULL)",
+            (title, area, xp_reward, cadence, quest_id, user),
+        )
+        mark_changed(path, "quests", user)
+
+
+def complete_quest(path: Path, quest_id: int, user: str = None):
+    # conclusão no log + evento de XP na mesma transação (add_event junta-se a ela)
+    with transaction(path) as c:
+        if user:
+            c.execute("SELECT id, title, area, xp_reward FROM quests WHERE id=? AND (user=? OR user IS NULL)", (quest_id, user))
+        else:
+            c.execute("SELECT id, title, area, xp_reward FROM quests WHERE id=?", (quest_id,))
+        row = c.fetchone()
+        if not row:
+            return False
+        qid, title, area, xp_reward = row
+        today = date.today()
+        event_id = add_event(path, today, area, xp_reward, note=f"Quest: {title}", type_='quest', user=user)
+        c.execute(
+            "INSERT INTO quest_completions (quest_id, user, day, event_id) VALUES (?, ?, ?, ?)",
+            (qid, user or '', today.isoformat(), event_id),
+        )
+        # last_done continua gravado: o agendador (missed_daily) parte dele
+        c.execute("UPDATE quests SET last_done=? WHERE id=?", (today.isoformat(), qid))
+        mark_changed(path, "quests", user)
+    return True
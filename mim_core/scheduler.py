@@ -0,0 +1,369 @@
+"""
+Agendador do Versão 2.0 de Mim: regras automáticas avaliadas fora do rerun das páginas.
+
+- `missed_daily`: penalidade por quest diária não cumprida (uma por quest e dia perdido);
+- `weekly_goals` / `monthly_goals`: penalidade por meta semanal/mensal não atingida;
+- `perk_expiry`: desativa perks temporárias já expiradas.
+
+Cada job tem uma cadência (hour/day/week/month) e roda uma vez por período fechado e por usuário.
+O ledger `job_runs` é gravado na mesma transação (BEGIN IMMEDIATE) que as escritas do job: o
+período só conta como feito se o job fez COMMIT, e duas instâncias (thread do app + cron) nunca
+aplicam o mesmo período duas vezes. Períodos perdidos (app fechado, cron parado) são recuperados
+um a um, até o limite de recuperação do job; na primeira execução de um job para um usuário, só o
+último período fechado é avaliado (nada de penalizar o histórico inteiro).
+
+No app, `start_scheduler(path)` sobe uma thread daemon (uma por processo, via st.cache_resource).
+Para cron:
+    python -m mim_core.scheduler run-due [db]
+    python -m mim_core.scheduler status [db]
+"""
+import logging
+import threading
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from mim_core.db import get_conn, mark_changed, migrate, transaction
+
+SCHEDULER_INTERVAL_S = 300
+
+log = logging.getLogger(__name__)
+
+
+# ---------- Períodos
+def _period_start(cadence: str, t: datetime) -> datetime:
+    """Início do período (da cadência) que contém `t`."""
+    if cadence == "hour":
+        return t.replace(minute=0, second=0, microsecond=0)
+    day = datetime.combine(t.date(), datetime.min.time())
+    if cadence == "day":
+        return day
+    if cadence == "week":
+        return day - timedelta(days=day.weekday())
+    if cadence == "month":
+        return day.replace(day=1)
+    raise ValueError(f"cadência desconhecida: {cadence}")
+
+
+def _previous(cadence: str, start: datetime) -> datetime:
+    if cadence == "hour":
+        return start - timedelta(hours=1)
+    if cadence == "day":
+        return start - timedelta(days=1)
+    if cadence == "week":
+        return start - timedelta(days=7)
+    return _period_start("month", start - timedelta(days=1))
+
+
+def _period_key(cadence: str, start: datetime) -> str:
+    """Chave do período no ledger; a ordem de texto é a ordem cronológica."""
+    if cadence == "hour":
+        return start.strftime("%Y-%m-%dT%H")
+    if cadence == "month":
+        return start.strftime("%Y-%m")
+    return start.date().isoformat()
+
+
+def closed_periods(cadence: str, now: datetime, last_key: str = None, max_catchup: int = 1) -> list:
+    """
+    Períodos fechados ainda não executados, do mais antigo para o mais recente, como
+    (chave, início, fim exclusivo). Sem `last_key`, só o último período fechado.
+    """
+    periods = []
+    end = _period_start(cadence, now)
+    start = _previous(cadence, end)
+    limit = max_catchup if last_key else 1
+    while len(periods) < limit:
+        key = _period_key(cadence, start)
+        if last_key is not None and key <= last_key:
+            break
+        periods.append((key, start, end))
+        end, start = start, _previous(cadence, start)
+    return periods[::-1]
+
+
+# ---------- Configurações (user_config guarda texto; mesmas regras do mim_core.config.UserSettings)
+def _config(c, user: str) -> dict:
+    return dict(c.execute("SELECT key, value FROM user_config WHERE user=?", (user,)).fetchall())
+
+
+def _cfg_int(values: dict, key: str, default: int) -> int:
+    try:
+        return int(float(values[key]))
+    except (KeyError, TypeError, ValueError):
+        return default
+
+
+def _cfg_date(values: dict, key: str) -> date:
+    try:
+        return date.fromisoformat(values[key])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def _users_with_flag(key: str):
+    """Usuários com a configuração booleana `key` ligada."""
+    def users(conn) -> list:
+        rows = conn.execute(
+            "SELECT user FROM user_config WHERE key=? AND lower(trim(value)) IN ('true', '1') ORDER BY user", (key,)
+        ).fetchall()
+        return [r[0] for r in rows]
+    return users
+
+
+def _global_job(conn) -> list:
+    return [""]
+
+
+# ---------- Jobs: fn(cursor, usuário, início, fim exclusivo) -> quantidade de itens afetados
+# Dias perdidos penalizados por quest numa avaliação: quem volta depois de meses não leva
+# centenas de penalidades de uma vez (só as dos últimos MISSED_DAILY_MAX_DAYS dias).
+MISSED_DAILY_MAX_DAYS = 7
+
+# Uma única consulta calcula o conjunto inteiro: quests diárias atrasadas do usuário (e globais),
+# cada dia perdido entre last_done e :as_of (limitado a MISSED_DAILY_MAX_DAYS) e a chave de
+# idempotência de cada (quest, dia) — só entram os pares ainda não penalizados.
+_MISSED_DAILY_SQL = """
+WITH RECURSIVE overdue(id, area, title, day) AS (
+    SELECT id, area, title, MAX(date(substr(last_done, 1, 10), '+1 day'), date(:as_of, :window))
+    FROM quests
+    WHERE active=1 AND cadence='daily' AND (user=:user OR user IS NULL)
+      AND last_done IS NOT NULL AND substr(last_done, 1, 10) < :as_of
+),
+missed(id, area, title, day) AS (
+    SELECT id, area, title, day FROM overdue
+    UNION ALL
+    SELECT id, area, title, date(day, '+1 day') FROM missed WHERE day < :as_of
+)
+SELECT id, area, title, day, 'missed_daily:' || :user || ':' || id || ':' || day
+FROM missed m
+WHERE NOT EXISTS (
+    SELECT 1 FROM events e WHERE e.idempotency_key = 'missed_daily:' || :user || ':' || m.id || ':' || m.day
+)
+"""
+
+
+def apply_missed_daily(c, user: str, as_of: date, amount: int) -> int:
+    """
+    Motor da penalidade por quest diária perdida, em conjunto e numa transação (a do chamador):
+    um evento 'penalty' de -amount por (quest, dia perdido até `as_of`), datado do dia seguinte ao
+    dia perdido. A streak não é tocada: ela sai do log quest_completions (mim_core.streaks) e quebra
+    sozinha. Cada evento leva a chave de idempotência 'missed_daily:<user>:<quest>:<dia>':
+    avaliar de novo o mesmo dia não insere nada.
+    Retorna o número de penalidades inseridas.
+    """
+    params = {"user": user, "as_of": as_of.isoformat(), "window": f"-{MISSED_DAILY_MAX_DAYS - 1} days"}
+    c.execute("CREATE TEMP TABLE IF NOT EXISTS missed_daily_tmp (quest_id INTEGER, area TEXT, title TEXT, day TEXT, idem_key TEXT)")
+    c.execute("DELETE FROM temp.missed_daily_tmp")
+    c.execute(f"INSERT INTO temp.missed_daily_tmp {_MISSED_DAILY_SQL}", params)
+    inserted = c.execute(
+        "INSERT INTO events (date, area, xp, note, type, user, idempotency_key) "
+        "SELECT date(day, '+1 day'), area, ?, 'Penalty automática: missed ' || title || ' (' || day || ')', "
+        "'penalty', ?, idem_key FROM temp.missed_daily_tmp WHERE true ON CONFLICT DO NOTHING",
+        (-abs(int(amount)), user),
+    ).rowcount
+    c.execute("DELETE FROM temp.missed_daily_tmp")
+    return inserted
+
+
+def _job_missed_daily(c, user: str, start: datetime, end: datetime) -> int:
+    """Penalidades de quests diárias perdidas até o dia fechado `start` (dias anteriores inclusos)."""
+    amount = _cfg_int(_config(c, user), "penalty_amount", 10)
+    return apply_missed_daily(c, user, start.date(), amount)
+
+
+# tipo -> (rótulo da nota, período na nota, valor padrão)
+_GOAL_RULES = {
+    "weekly": ("Semanal", "na semana de", 50),
+    "monthly": ("Mensal", "no mês de", 100),
+}
+
+
+def _goal_penalties(kind: str):
+    label, period_label, default_amount = _GOAL_RULES[kind]
+
+    def job(c, user: str, start: datetime, end: datetime) -> int:
+        first, last = start.date(), end.date() - timedelta(days=1)
+        values = _config(c, user)
+        # período já conferido pela checagem antiga (feita no rerun da página)
+        legacy_check = _cfg_date(values, f"last_{kind}_penalty_check")
+        if legacy_check is not None and legacy_check >= end.date():
+            return 0
+        amount = _cfg_int(values, f"penalty_{kind}_amount", default_amount)
+        prefix = f"goal_{kind}_"
+        targets = {k[len(prefix):]: _cfg_int(values, k, 0) for k in values if k.startswith(prefix)}
+        achieved = dict(c.execute(
+            "SELECT area, SUM(xp_sum) FROM daily_xp WHERE user=? AND day >= ? AND day <= ? GROUP BY area",
+            (user, first.isoformat(), last.isoformat()),
+        ).fetchall())
+        failed = 0
+        for area, target in sorted(targets.items()):
+            xp_achieved = int(achieved.get(area) or 0)
+            if target > 0 and xp_achieved < target:
+                note = (f"Penalty {label}: Meta {area} ({target} XP) não atingida {period_label} "
+                        f"{first.isoformat()} - {last.isoformat()}. XP alcançado: {xp_achieved}")
+                c.execute(
+                    "INSERT INTO events (date, area, xp, note, type, user) VALUES (?, ?, ?, ?, ?, ?)",
+                    (end.date().isoformat(), area, -abs(amount), note, f"penalty_{kind}_fail", user),
+                )
+                failed += 1
+        return failed
+
+    return job
+
+
+def _job_perk_expiry(c, user: str, start: datetime, end: datetime) -> int:
+    """Perks com duration_days > 0 cujo start_date + duração já passou em `end` voltam a active=0."""
+    expired = []
+    for pid, dur, start_date in c.execute(
+        "SELECT id, duration_days, start_date FROM perks WHERE active=1 AND duration_days > 0 AND start_date IS NOT NULL"
+    ).fetchall():
+        try:
+            if (end - datetime.fromisoformat(start_date)).days >= int(dur):
+                expired.append((pid,))
+        except (TypeError, ValueError):
+            continue  # data ilegível: mantém a perk (como antes)
+    if expired:
+        c.executemany("UPDATE perks SET active=0, start_date=NULL WHERE id=?", expired)
+    return len(expired)
+
+
+# (nome, cadência, máximo de períodos recuperados, usuários(conn), fn, escopo de dados alterado, unidade)
+JOBS = [
+    # o motor já cobre os dias perdidos até o dia avaliado: sem recuperação pelo ledger
+    ("missed_daily", "day", 1, _users_with_flag("penalty_active"), _job_missed_daily,
+     "events", "penalidades por dia perdido"),
+    ("weekly_goals", "week", 8, _users_with_flag("penalty_weekly_active"), _goal_penalties("weekly"),
+     "events", "metas não atingidas"),
+    ("monthly_goals", "month", 3, _users_with_flag("penalty_monthly_active"), _goal_penalties("monthly"),
+     "events", "metas não atingidas"),
+    ("perk_expiry", "hour", 1, _global_job, _job_perk_expiry, "perks", "perks expiradas"),
+]
+
+
+# ---------- Execução
+def _last_period(conn, job: str, user: str) -> str:
+    return conn.execute(
+        "SELECT MAX(period) FROM job_runs WHERE job=? AND user=? AND status='ok'", (job, user)
+    ).fetchone()[0]
+
+
+def _run_period(path: Path, spec, user: str, key: str, start: datetime, end: datetime):
+    job, _cadence, _catchup, _users, fn, scope, unit = spec
+    started = datetime.now().isoformat()
+    try:
+        with transaction(path) as c:
+            done = c.execute(
+                "SELECT 1 FROM job_runs WHERE job=? AND user=? AND period=? AND status='ok'", (job, user, key)
+            ).fetchone()
+            if done:
+                return None  # outra instância (cron ou outro processo) chegou antes
+            n = fn(c, user, start, end)
+            if n:
+                mark_changed(path, scope, user or None)  # perks: a versão global
+            detail = f"{n} {unit}"
+            c.execute(
+                "INSERT INTO job_runs (job, user, period, status, started_at, finished_at, detail) "
+                "VALUES (?, ?, ?, 'ok', ?, ?, ?)",
+                (job, user, key, started, datetime.now().isoformat(), detail),
+            )
+        return (job, user, key, "ok", detail)
+    except Exception as e:
+        # nada do job foi gravado (ROLLBACK); a falha fica no ledger e o período é tentado de novo
+        log.exception("job %s falhou (usuário %r, período %s)", job, user, key)
+        with transaction(path) as c:
+            c.execute(
+                "INSERT INTO job_runs (job, user, period, status, started_at, finished_at, detail) "
+                "VALUES (?, ?, ?, 'error', ?, ?, ?)",
+                (job, user, key, started, datetime.now().isoformat(), repr(e)),
+            )
+        return (job, user, key, "error", repr(e))
+
+
+def run_due(path: Path, now: datetime = None, jobs=None) -> list:
+    """
+    Executa todos os períodos fechados e pendentes dos jobs (todos, ou só os nomes em `jobs`).
+    Retorna (job, usuário, período, status, resumo) de cada execução.
+    """
+    migrate(path)
+    now = now or datetime.now()
+    conn = get_conn(path)
+    results = []
+    for spec in JOBS:
+        name, cadence, max_catchup, users = spec[:4]
+        if jobs and name not in jobs:
+            continue
+        for user in users(conn):
+            last_key = _last_period(conn, name, user)
+            for key, start, end in closed_periods(cadence, now, last_key, max_catchup):
+                result = _run_period(path, spec, user, key, start, end)
+                if result is not None:
+                    results.append(result)
+    return results
+
+
+def recent_runs(path: Path, user: str = None, limit: int = 20) -> list:
+    """Últimas execuções do ledger (do usuário + jobs globais, ou de todos com user=None)."""
+    sql = "SELECT job, user, period, status, finished_at, detail FROM job_runs"
+    params = []
+    if user is not None:
+        sql += " WHERE user IN (?, '')"
+        params.append(user)
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(int(limit))
+    return get_conn(path).execute(sql, params).fetchall()
+
+
+class Scheduler(threading.Thread):
+    """Thread daemon que chama run_due() a cada `interval` segundos (a primeira vez na partida)."""
+
+    def __init__(self, path: Path, interval: float = SCHEDULER_INTERVAL_S):
+        super().__init__(name="mim-scheduler", daemon=True)
+        self.path = Path(path)
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                run_due(self.path)
+            except Exception:
+                log.exception("falha no agendador")
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_scheduler(path: Path, interval: float = SCHEDULER_INTERVAL_S) -> Scheduler:
+    scheduler = Scheduler(path, interval)
+    scheduler.start()
+    return scheduler
+
+
+def _main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="python -m mim_core.scheduler", description="Agendador do Versão 2.0 de Mim")
+    ap.add_argument("command", choices=["run-due", "status"])
+    ap.add_argument("db", nargs="?", default="versao2_mim.db")
+    ap.add_argument("--job", action="append", choices=[j[0] for j in JOBS], help="restringe a estes jobs")
+    ap.add_argument("--limit", type=int, default=20)
+    args = ap.parse_args(argv)
+    path = Path(args.db)
+
+    if args.command == "run-due":
+        results = run_due(path, jobs=args.job)
+        for job, user, period, status, detail in results:
+            print(f"{job:<14} {user or '(global)':<20} {period:<13} {status:<5} {detail}")
+        if not results:
+            print("nada pendente")
+        return 1 if any(r[3] == "error" for r in results) else 0
+    if args.command == "status":
+        migrate(path)
+        for job, user, period, status, finished_at, detail in recent_runs(path, limit=args.limit):
+            print(f"{finished_at}  {job:<14} {user or '(global)':<20} {period:<13} {status:<5} {detail}")
+        return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
@@ -0,0 +1,202 @@
+"""
+Streaks de quests do Versão 2.0 de Mim, calculadas a partir do log `quest_completions`.
+
+Em vez do contador mutável quests.streak (que uma edição errada apaga sem volta), a streak atual,
+a maior streak e a última conclusão de todas as quests de um usuário saem de uma única passada
+vetorizada: cada conclusão vira o ordinal do seu período — dia para 'daily', semana ISO para
+'weekly', um período único para 'once' — e np.diff sobre os ordinais ordenados marca onde cada
+sequência de períodos consecutivos começa.
+
+A streak atual continua valendo enquanto o período corrente ainda não terminou: uma quest diária
+feita ontem (e ainda não hoje) mantém a streak; feita anteontem, a streak atual é 0.
+
+Verificação contra a implementação em laço e consulta num banco:
+    python -m mim_core.streaks check-parity
+    python -m mim_core.streaks show [db] --user <usuário>
+"""
+from datetime import date, timedelta
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from mim_core.db import get_conn
+
+CADENCES = ("daily", "weekly", "once")
+
+STREAK_COLUMNS = ["current_streak", "longest_streak", "last_done", "completions"]
+
+
+def _period_ordinals(days: np.ndarray, cadences: np.ndarray) -> np.ndarray:
+    """
+    Ordinal do período de cada dia (dias desde 1970-01-01, int64). Semanas ISO começam na
+    segunda-feira; 1970-01-01 foi uma quinta, daí o +3. Cadência desconhecida conta como 'daily'.
+    """
+    weekly = (days + 3) // 7
+    return np.where(cadences == "once", 0, np.where(cadences == "weekly", weekly, days))
+
+
+def compute_streaks(quests: pd.DataFrame, completions: pd.DataFrame, today: date = None) -> pd.DataFrame:
+    """
+    Streaks de todas as `quests` (colunas id, cadence) a partir de `completions` (colunas
+    quest_id, day — ISO ou datetime), numa passada só. Várias conclusões no mesmo período contam
+    uma vez. Retorna um DataFrame indexado pelo id da quest com STREAK_COLUMNS; quests sem
+    conclusão ficam com 0 / NaT.
+    """
+    today = today or date.today()
+    ids = pd.Index(quests["id"].astype("int64"), name="id")
+    out = pd.DataFrame({
+        "current_streak": np.zeros(len(ids), dtype=np.int64),
+        "longest_streak": np.zeros(len(ids), dtype=np.int64),
+        "last_done": pd.Series(pd.NaT, index=ids, dtype="datetime64[ns]"),
+        "completions": np.zeros(len(ids), dtype=np.int64),
+    }, index=ids)
+    if completions.empty or ids.empty:
+        return out
+
+    cadence_by_id = pd.Series(quests["cadence"].to_numpy(), index=ids)
+    qid = completions["quest_id"].to_numpy(dtype=np.int64)
+    days = pd.to_datetime(completions["day"]).to_numpy(dtype="datetime64[D]").astype(np.int64)
+    cadence = cadence_by_id.reindex(qid).to_numpy()
+    known = ~pd.isna(cadence)  # conclusões de quests fora da lista (ex.: de outro usuário)
+    qid, days, cadence = qid[known], days[known], cadence[known].astype(str)
+    if qid.size == 0:
+        return out
+
+    # ordena por (quest, dia): dentro de uma quest os períodos ficam em ordem não decrescente
+    order = np.lexsort((days, qid))
+    qid, days, cadence = qid[order], days[order], cadence[order]
+    period = _period_ordinals(days, cadence)
+
+    quest_start = np.r_[True, qid[1:] != qid[:-1]]
+    quest_end = np.r_[quest_start[1:], True]
+    # um (quest, período) por linha
+    first_in_period = quest_start | np.r_[True, period[1:] != period[:-1]]
+    uq, up = qid[first_in_period], period[first_in_period]
+
+    run_start = np.r_[True, (uq[1:] != uq[:-1]) | (np.diff(up) != 1)]
+    run_id = np.cumsum(run_start) - 1
+    run_len = np.bincount(run_id)
+    run_quest = uq[run_start]
+    quest_first_run = np.flatnonzero(np.r_[True, run_quest[1:] != run_quest[:-1]])
+    longest = np.maximum.reduceat(run_len, quest_first_run)
+    last_run_len = run_len[np.r_[quest_first_run[1:], run_len.size] - 1]
+
+    q_ids = qid[quest_end]
+    today_days = np.int64((today - date(1970, 1, 1)).days)
+    today_period = _period_ordinals(np.full(q_ids.size, today_days), cadence[quest_end])
+    alive = period[quest_end] >= today_period - 1
+    current = np.where(alive, last_run_len, 0)
+    counts = np.diff(np.r_[np.flatnonzero(quest_start), qid.size])
+
+    out.loc[q_ids, "current_streak"] = current
+    out.loc[q_ids, "longest_streak"] = longest
+    out.loc[q_ids, "last_done"] = days[quest_end].astype("datetime64[D]").astype("datetime64[ns]")
+    out.loc[q_ids, "completions"] = counts
+    return out
+
+
+def load_completions(path: Path, user: str = None) -> pd.DataFrame:
+    """Conclusões do usuário (todas, com user=None) — colunas quest_id, day."""
+    conn = get_conn(path)
+    if user is None:
+        return pd.read_sql_query("SELECT quest_id, day FROM quest_completions", conn)
+    return pd.read_sql_query("SELECT quest_id, day FROM quest_completions WHERE user=?", conn, params=(user,))
+
+
+def quest_streaks(path: Path, user: str = None, today: date = None, active_only: bool = True) -> pd.DataFrame:
+    """Quests do usuário (e globais) com as colunas de streak calculadas do log."""
+    conn = get_conn(path)
+    where = "active=1" if active_only else "1=1"
+    if user is None:
+        quests = pd.read_sql_query(f"SELECT id, title, area, xp_reward, cadence, active, user FROM quests WHERE {where}", conn)
+    else:
+        quests = pd.read_sql_query(
+            f"SELECT id, title, area, xp_reward, cadence, active, user FROM quests WHERE {where} AND (user=? OR user IS NULL)",
+            conn, params=(user,),
+        )
+    streaks = compute_streaks(quests, load_completions(path, user), today)
+    return quests.join(streaks, on="id")
+
+
+# ---------- Paridade com a implementação em laço
+def _loop_streaks(cadence: str, days: list, today: date) -> tuple:
+    """(atual, maior) percorrendo os períodos um a um, com date.isocalendar() para semanas."""
+    if not days:
+        return 0, 0
+    if cadence == "once":
+        return 1, 1
+    if cadence == "weekly":
+        def key(d):
+            return d - timedelta(days=d.weekday())
+        step = timedelta(days=7)
+    else:
+        def key(d):
+            return d
+        step = timedelta(days=1)
+    periods = sorted({key(d) for d in days})
+    longest = run = 1
+    for prev, cur in zip(periods, periods[1:]):
+        run = run + 1 if cur - prev == step else 1
+        longest = max(longest, run)
+    current = run if periods[-1] >= key(today) - step else 0
+    return current, longest
+
+
+def check_parity(quests: int = 300, seed: int = 0) -> list:
+    """
+    Compara compute_streaks com o laço em quests aleatórias (conclusões esparsas e densas,
+    repetidas no mesmo dia, terminando hoje, ontem ou há tempo). Retorna as divergências como
+    (quest, cadência, esperado, obtido).
+    """
+    rng = np.random.default_rng(seed)
+    today = date.today()
+    qdf = pd.DataFrame({"id": np.arange(1, quests + 1), "cadence": rng.choice(CADENCES, quests)})
+    rows = []
+    for qid in qdf["id"]:
+        n = int(rng.integers(0, 60))
+        span = int(rng.choice([n + 1, 3 * n + 1, 400]))
+        offset = int(rng.choice([0, 1, 2, 8, 30]))
+        rows += [(int(qid), today - timedelta(days=offset + int(x))) for x in rng.integers(0, span, n)]
+    comp = pd.DataFrame(rows, columns=["quest_id", "day"])
+    got = compute_streaks(qdf, comp, today)
+    by_quest = comp.groupby("quest_id")["day"].apply(list).to_dict()
+    diffs = []
+    for qid, cadence in zip(qdf["id"], qdf["cadence"]):
+        expected = _loop_streaks(cadence, by_quest.get(qid, []), today)
+        obtained = (int(got.at[qid, "current_streak"]), int(got.at[qid, "longest_streak"]))
+        if expected != obtained:
+            diffs.append((int(qid), cadence, expected, obtained))
+    return diffs
+
+
+def _main(argv=None):
+    import argparse
+
+    ap = argparse.ArgumentParser(prog="python -m mim_core.streaks", description="Streaks de quests do Versão 2.0 de Mim")
+    ap.add_argument("command", choices=["check-parity", "show"])
+    ap.add_argument("db", nargs="?", default="versao2_mim.db")
+    ap.add_argument("--user")
+    ap.add_argument("--quests", type=int, default=300)
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+
+    if args.command == "check-parity":
+        diffs = check_parity(args.quests, args.seed)
+        for d in diffs[:20]:
+            print("DIVERGÊNCIA", d)
+        if not diffs:
+            print("ok: streaks vetorizadas conferem com o laço")
+        return 1 if diffs else 0
+    if args.command == "show":
+        from mim_core.db import migrate
+
+        path = Path(args.db)
+        migrate(path)
+        df = quest_streaks(path, args.user, active_only=False)
+        print(df[["id", "title", "cadence", "active"] + STREAK_COLUMNS].to_string(index=False))
+        return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(_main())
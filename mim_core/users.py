@@ -0,0 +1,80 @@
+"""
+Usuários do Versão 2.0 de Mim: hash de senha, usuários padrão e login.
+"""
+import hashlib
+import sqlite3
+from pathlib import Path
+
+from mim_core.db import get_conn, transaction
+
+
+# ---------- Password hashing
+def hash_pw(pw: str) -> str:
+    return hashlib.sha256(pw.encode('utf-8')).hexdigest()
+
+
+# ---------- Robust default users insertion
+def create_default_users(path: Path):
+    with transaction(path) as c:
+        c.execute("PRAGMA table_info(users)")
+        cols_info = c.fetchall()
+        cols = [r[1] for r in cols_info]
+
+        defaults = [
+            {
+                "username": "marcel.pimenta",
+                "display_name": "Marcel Pimenta",
+                "password_hash": hash_pw("msp824655"),
+                "role": "user",
+                "profession": "Geólogo, Mestre em Ciência do Solo, Geocientista analista de integração de dados júnior, estudando Ciência de Dados",
+                "bio": "Pretende até o fim do ano encerrar o curso de Ciência de Dados e até o fim do 1º semestre de 2026 ser promovido a nível pleno e/ou se tornar membro logístico na área de projetos.",
+                "gender": "Homem",
+                "birth_year": 1996,
+                "height_cm": 171.0,
+                "weight_kg": 86.0,
+                "body_fat_pct": 19.0,
+            },
+            {
+                "username": "larissa.souza",
+                "display_name": "Larissa Souza",
+                "password_hash": hash_pw("kmzc911011"),
+                "role": "user",
+                "profession": "Veterinária, Mestra em Ciências Veterinárias, pleiteando doutorado e/ou aprovação em concurso público",
+                "bio": "Pretende ingressar no doutorado no 1º semestre de 2026 e/ou ser aprovada em concurso público.",
+                "gender": "Mulher",
+                "birth_year": 1996,
+                "height_cm": 158.0,
+                "weight_kg": 63.0,
+                "body_fat_pct": 23.5,
+            },
+        ]
+
+        for user_dict in defaults:
+            insert_cols = [col for col in ["username","display_name","password_hash","role","profession","bio","gender","birth_year","height_cm","weight_kg","body_fat_pct"] if col in cols]
+            placeholders = ",".join(["?"] * len(insert_cols))
+            insert_cols_sql = ",".join(insert_cols)
+            values = [user_dict.get(col, None) for col in insert_cols]
+            try:
+                c.execute(f"INSERT INTO users ({insert_cols_sql}) VALUES ({placeholders})", tuple(values))
+            except sqlite3.IntegrityError:
+                continue
+            except Exception as e:
+                print("Erro inserindo usuário default:", e)
+                continue
+
+
+# ---------- Auth helpers
+def get_user_by_username(path: Path, username: str):
+    """Linha de users como dict (None se o usuário não existe)."""
+    cur = get_conn(path).execute("SELECT * FROM users WHERE username=?", (username,))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip([d[0] for d in cur.description], row))
+
+
+def check_login(path: Path, username: str, password: str) -> bool:
+    user = get_user_by_username(path, username)
+    if not user:
+        return False
+    return user['password_hash'] == hash_pw(password)
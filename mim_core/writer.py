@@ -0,0 +1,132 @@
+"""
+Escritor único de eventos do Versão 2.0 de Mim (write-behind com group commit).
+
+Com várias sessões do Streamlit no mesmo processo, cada add_event abria sua própria transação e
+disputava o lock de escrita do SQLite; sob carga, alguma sessão esperava o busy_timeout inteiro e
+recebia "database is locked". Aqui uma thread dona da conexão de escrita recebe os pedidos de
+todas as sessões por uma fila e grava em lotes: tudo o que se acumulou na fila enquanto o lote
+anterior gravava entra na mesma transação (BEGIN IMMEDIATE) e um único COMMIT confirma o lote —
+sob carga, um COMMIT a cada poucos milissegundos com dezenas de eventos. GROUP_COMMIT_S pode abrir
+uma janela extra de espera após o primeiro pedido; com synchronous=NORMAL o COMMIT é barato e a
+janela só acrescenta latência (ver benchmarks.bench_event_queue), então o padrão é zero.
+
+`submit(fn, *args)` devolve um concurrent.futures.Future, resolvido só depois do COMMIT (com o
+valor de retorno de fn, ou a exceção dela). Cada pedido roda dentro de um SAVEPOINT: um pedido que
+falha é desfeito sozinho, sem derrubar os outros do lote. As funções de domínio (events.add_event,
+quests.complete_quest, penalties.apply_penalty...) abrem transaction(path), que dentro do lote se
+junta à transação do escritor, e o mark_changed delas só invalida os caches após o COMMIT.
+
+No app, `start_event_writer(path)` sobe a thread (uma por processo, via st.cache_resource).
+"""
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+from mim_core.db import transaction
+from mim_core.events import add_event
+
+GROUP_COMMIT_S = 0.0     # espera extra após o primeiro pedido do lote (além do que já está na fila)
+MAX_BATCH = 256          # pedidos por transação
+WRITE_TIMEOUT_S = 30     # quanto o app espera pela confirmação de um pedido
+
+log = logging.getLogger(__name__)
+
+
+class EventWriter(threading.Thread):
+    """Thread daemon dona da conexão de escrita: consome a fila e grava em lotes."""
+
+    def __init__(self, path: Path, window: float = GROUP_COMMIT_S, max_batch: int = MAX_BATCH):
+        super().__init__(name="mim-event-writer", daemon=True)
+        self.path = Path(path)
+        self.window = window
+        self.max_batch = max_batch
+        self._queue = queue.SimpleQueue()
+        self._closed = False
+        self.jobs = 0
+        self.batches = 0
+        self.largest_batch = 0
+
+    def submit(self, fn, *args, **kwargs) -> Future:
+        """Enfileira fn(path, *args, **kwargs); o Future resolve após o COMMIT do lote."""
+        if self._closed:
+            raise RuntimeError("escritor de eventos encerrado")
+        future = Future()
+        self._queue.put((fn, args, kwargs, future))
+        return future
+
+    def add_event(self, *args, **kwargs) -> Future:
+        """events.add_event pela fila; o Future resolve com o id do evento."""
+        return self.submit(add_event, *args, **kwargs)
+
+    def run(self):
+        stop = False
+        while not stop:
+            job = self._queue.get()
+            if job is None:
+                break
+            batch = [job]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.max_batch:
+                # o que já está na fila entra sem esperar; depois, só até o fim da janela
+                timeout = deadline - time.monotonic()
+                try:
+                    job = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if job is None:
+                    stop = True
+                    break
+                batch.append(job)
+            self._commit(batch)
+
+    def _commit(self, batch: list):
+        outcomes = []
+        try:
+            with transaction(self.path) as c:
+                for fn, args, kwargs, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        outcomes.append(None)
+                        continue
+                    c.execute("SAVEPOINT job")
+                    try:
+                        result = fn(self.path, *args, **kwargs)
+                    except Exception as e:
+                        c.execute("ROLLBACK TO job")
+                        c.execute("RELEASE job")
+                        outcomes.append((False, e))
+                    else:
+                        c.execute("RELEASE job")
+                        outcomes.append((True, result))
+        except Exception as e:
+            # BEGIN ou COMMIT falhou: nada do lote foi gravado
+            log.exception("falha ao gravar lote de %d pedidos", len(batch))
+            for _fn, _args, _kwargs, future in batch:
+                if future.running():
+                    future.set_exception(e)
+            return
+        self.jobs += len(batch)
+        self.batches += 1
+        self.largest_batch = max(self.largest_batch, len(batch))
+        for (_fn, _args, _kwargs, future), outcome in zip(batch, outcomes):
+            if outcome is None:
+                continue
+            ok, value = outcome
+            if ok:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def close(self, timeout: float = None):
+        """Grava o que já está na fila e encerra a thread."""
+        self._closed = True
+        self._queue.put(None)
+        self.join(timeout)
+
+
+def start_event_writer(path: Path, window: float = GROUP_COMMIT_S) -> EventWriter:
+    writer = EventWriter(path, window)
+    writer.start()
+    return writer
@@ -0,0 +1,36 @@
+"""
+Fixtures dos testes: cada teste recebe um banco temporário migrado — o versao2_mim.db do repositório
+nunca é aberto. As versões de dados de mim_core.db são globais do processo: compare antes/depois.
+"""
+from pathlib import Path
+
+import pytest
+
+from mim_core import db
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Banco vazio com o esquema atual."""
+    path = tmp_path / "test.db"
+    db.migrate(path)
+    yield path
+    db.close_all()
+
+
+@pytest.fixture
+def repo_db_copy():
+    """Cópia temporária e migrada do versao2_mim.db (lido só por uma conexão somente leitura)."""
+    with db.scratch_copy(Path(__file__).resolve().parent.parent / "versao2_mim.db") as path:
+        yield path
+
+
+@pytest.fixture(scope="module")
+def synthetic_db(tmp_path_factory):
+    """Banco sintético determinístico (benchmarks.synthetic, escala small), compartilhado pelo módulo."""
+    from benchmarks import synthetic
+
+    path = tmp_path_factory.mktemp("synthetic") / "synthetic.db"
+    synthetic.generate(path, synthetic.SCALES["small"])
+    yield path
+    db.close_all()
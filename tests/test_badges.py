@@ -0,0 +1,84 @@
+"""Badges (mim_core.badges): avaliação incremental == de uma vez == laço de referência."""
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from mim_core import badges, db
+from mim_core.badges import BADGE_CATALOG, BadgeRule
+
+END = date(2025, 6, 30)
+DAYS = 400
+
+
+@pytest.fixture(scope="module")
+def events():
+    rnd = random.Random(7)
+    start = END - timedelta(days=DAYS)
+    areas = ["Coding", "Inglês", "Saúde Física", "Finanças", "Casa"]
+    return [((start + timedelta(days=rnd.randrange(DAYS))).isoformat(), rnd.choice(areas), rnd.randint(-10, 60))
+            for _ in range(DAYS * 3)]
+
+
+def _load(path, events):
+    with db.transaction(path) as c:
+        c.executemany("INSERT INTO events (date, area, xp, type, user) VALUES (?, ?, ?, 'manual', 'u')", events)
+
+
+def _earned(path) -> set:
+    return {(b[0], b[4]) for b in badges.earned_badges(path, "u")}
+
+
+def test_incremental_matches_full_evaluation(tmp_path, events):
+    rules = BADGE_CATALOG + badges.synthetic_catalog(150)
+    results = {}
+    for mode in ("full", "incremental"):
+        path = tmp_path / f"{mode}.db"
+        db.migrate(path)
+        _load(path, events)
+        if mode == "incremental":
+            day = END - timedelta(days=DAYS)
+            while day < END:
+                badges.update_badges(path, "u", day, rules)
+                day += timedelta(days=9)
+        badges.update_badges(path, "u", END, rules)
+        results[mode] = _earned(path)
+    db.close_all()
+    assert results["full"]
+    assert results["incremental"] == results["full"]
+
+
+def test_vectorized_matches_reference_loop(db_path, events):
+    _load(db_path, events)
+    badges.update_badges(db_path, "u", END, BADGE_CATALOG)
+    first = min(date.fromisoformat(e[0]) for e in events)
+    assert _earned(db_path) == badges._loop_earned(BADGE_CATALOG, events, first, END)
+
+
+def test_backdated_event_rewinds_evaluation(db_path, events):
+    # evento retroativo grande num dia já avaliado: a trigger de daily_xp recua a marca
+    # e o badge sai com a data do evento, não com a da avaliação
+    _load(db_path, events)
+    probe = (BadgeRule("probe", "Probe", "", "window", threshold=10 ** 6, days=1),)
+    badges.update_badges(db_path, "u", END, probe)
+    back = END - timedelta(days=200)
+    with db.transaction(db_path) as c:
+        c.execute("INSERT INTO events (date, area, xp, type, user) VALUES (?, 'Casa', 2000000, 'manual', 'u')",
+                  (back.isoformat(),))
+    through = db.get_conn(db_path).execute(
+        "SELECT evaluated_through FROM badge_evaluations WHERE user='u'").fetchone()[0]
+    assert through == (back - timedelta(days=1)).isoformat()
+
+    badges.update_badges(db_path, "u", END, probe)
+    assert _earned(db_path) == {("probe", back.isoformat())}
+
+
+def test_reevaluation_is_a_noop_and_rebuild_matches(db_path, events):
+    _load(db_path, events)
+    badges.update_badges(db_path, "u", END)
+    before = _earned(db_path)
+    assert badges.update_badges(db_path, "u", END) == 0
+    badges.reset_badges(db_path, "u")
+    assert _earned(db_path) == set()
+    badges.update_badges(db_path, "u", END)
+    assert _earned(db_path) == before
@@ -0,0 +1,78 @@
+"""
+Invalidação entre processos (change_log + PRAGMA data_version): a escrita de outro processo no mesmo
+arquivo aparece no próximo rerun deste, e só os caches do usuário afetado são invalidados.
+"""
+import subprocess
+import sys
+from pathlib import Path
+
+from mim_core import db
+
+REPO = Path(__file__).resolve().parent.parent
+
+# outro "servidor" do app: grava eventos para os usuários dados e termina
+CHILD = """
+import sys
+from datetime import date
+from mim_core import events
+for user in sys.argv[2:]:
+    events.add_event(sys.argv[1], date(2025, 1, 6), "Casa", 10, note="outro processo", user=user)
+"""
+
+
+def other_process(path, *users):
+    subprocess.run([sys.executable, "-c", CHILD, str(path), *users], cwd=REPO, check=True)
+
+
+class RerunCache:
+    """Cache por (usuário, versão de dados), como os st.cache_data do app; sync no início do rerun."""
+
+    def __init__(self, path):
+        self.path = path
+        self.entries = {}
+        self.misses = 0
+
+    def rerun(self, user):
+        db.sync_external_changes(self.path)
+        key = (user, db.data_version("events", user))
+        if key not in self.entries:
+            self.misses += 1
+            self.entries[key] = db.get_conn(self.path).execute(
+                "SELECT COUNT(*) FROM events WHERE user=?", (user,)).fetchone()[0]
+        return self.entries[key]
+
+
+def test_write_in_other_process_is_visible_on_next_rerun(db_path):
+    cache = RerunCache(db_path)
+    assert (cache.rerun("a"), cache.rerun("b")) == (0, 0)
+    version_b = db.data_version("events", "b")
+
+    other_process(db_path, "a")
+
+    assert cache.rerun("a") == 1
+    assert db.data_version("events", "b") == version_b  # b não foi invalidado
+    misses = cache.misses
+    assert cache.rerun("b") == 0 and cache.misses == misses
+
+
+def test_own_writes_are_not_invalidated_twice(db_path):
+    from datetime import date
+
+    from mim_core import events
+
+    db.sync_external_changes(db_path)
+    events.add_event(db_path, date(2025, 1, 6), "Casa", 10, user="a")
+    version = db.data_version("events", "a")
+    assert db.sync_external_changes(db_path) == 0
+    assert db.data_version("events", "a") == version
+
+
+def test_log_pruned_past_last_read_invalidates_everything(db_path):
+    db.sync_external_changes(db_path)
+    version_b = db.data_version("events", "b")
+    other_process(db_path, "a", "c")
+    with db.transaction(db_path) as c:
+        c.execute("DELETE FROM change_log WHERE seq < (SELECT MAX(seq) FROM change_log)")
+    assert db.sync_external_changes(db_path) == -1
+    assert db.data_version("events", "b") != version_b
+
@@ -0,0 +1,36 @@
+"""Motor de níveis (mim_core.levels): tabelas com bisect/searchsorted == laços originais."""
+import pytest
+
+from mim_core import levels
+from mim_core.levels import LevelCurve
+
+
+def test_parity_with_loop_versions():
+    assert levels.check_parity(samples=5000, seed=1) == []
+
+
+@pytest.mark.parametrize("xp", [-50, 0, 99, 100, 101, 249, 250, 10 ** 6, 10 ** 12])
+def test_app_level_matches_geometric_loop(xp):
+    assert levels.level_from_xp(xp) == levels._loop_geometric_level(xp)
+
+
+def test_vectorized_levels_match_scalar():
+    xs = [0, 1, 100, 250, 12_345, 10 ** 7]
+    assert levels.LEVEL_CURVE.levels(xs).tolist() == [levels.level_from_xp(x) for x in xs]
+
+
+def test_progress_in_level_uses_thresholds():
+    # nível pela LEVEL_CURVE, barra pela XP_CURVE, como no app original
+    level, current, span, pct = levels.xp_progress_in_level(5000)
+    base = levels.xp_for_level(level)
+    assert level == levels.level_from_xp(5000)
+    assert base == int(levels.BASE_XP * level ** levels.XP_EXP)
+    assert (current, span) == (5000 - base, levels.xp_for_level(level + 1) - base)
+    assert pct == current / span
+
+
+def test_per_area_curve(monkeypatch):
+    monkeypatch.setitem(levels.AREA_LEVEL_CURVES, "Coding", LevelCurve.geometric(1000, 2.0))
+    result = levels.area_levels_from_xp({"Coding": 1500, "Casa": 1500})
+    assert result["Coding"] == 2
+    assert result["Casa"] == levels.level_from_xp(1500)
@@ -0,0 +1,52 @@
+"""Penalidade por quest diária perdida: reavaliar o mesmo dia (reruns, cron repetido) não insere nada."""
+from datetime import date, timedelta
+
+from mim_core import db, scheduler
+from mim_core.scheduler import MISSED_DAILY_MAX_DAYS, apply_missed_daily
+
+
+def _overdue_quest(path, user, as_of, days):
+    with db.transaction(path) as c:
+        c.execute(
+            "INSERT INTO quests (title, area, xp_reward, cadence, last_done, streak, active, user) "
+            "VALUES ('ler', 'Educação', 10, 'daily', ?, 5, 1, ?)",
+            ((as_of - timedelta(days=days)).isoformat(), user),
+        )
+
+
+def _penalties(path, user):
+    return db.get_conn(path).execute(
+        "SELECT COUNT(*), COALESCE(SUM(xp), 0) FROM events WHERE user=? AND type='penalty'", (user,)
+    ).fetchone()
+
+
+def test_repeated_evaluation_same_day_inserts_nothing(db_path):
+    as_of = date.today() - timedelta(days=1)
+    _overdue_quest(db_path, "u", as_of, 3)
+    counts = []
+    for _ in range(3):
+        with db.transaction(db_path) as c:
+            counts.append(apply_missed_daily(c, "u", as_of, 5))
+    assert counts == [3, 0, 0]
+    assert _penalties(db_path, "u") == (3, -15)
+    assert db.check_daily_xp(db_path) == []
+
+
+def test_missed_days_are_capped_and_next_day_adds_one(db_path):
+    as_of = date.today() - timedelta(days=1)
+    _overdue_quest(db_path, "u", as_of, 30)
+    with db.transaction(db_path) as c:
+        assert apply_missed_daily(c, "u", as_of, 5) == MISSED_DAILY_MAX_DAYS
+    with db.transaction(db_path) as c:
+        assert apply_missed_daily(c, "u", as_of + timedelta(days=1), 5) == 1
+    assert _penalties(db_path, "u")[0] == MISSED_DAILY_MAX_DAYS + 1
+
+
+def test_run_due_twice_is_idempotent(db_path):
+    _overdue_quest(db_path, "u", date.today(), 3)
+    db.get_conn(db_path).execute("INSERT INTO user_config (user, key, value) VALUES ('u', 'penalty_active', 'true')")
+    assert [r[0] for r in scheduler.run_due(db_path, jobs=["missed_daily"])] == ["missed_daily"]
+    first = _penalties(db_path, "u")
+    assert first[0] > 0
+    assert scheduler.run_due(db_path, jobs=["missed_daily"]) == []
+    assert _penalties(db_path, "u") == first
@@ -0,0 +1,46 @@
+"""Modo diagnóstico (mim_core.profiler): SQL contado pelo ponto de chamada, seções aninhadas."""
+from mim_core import db
+from mim_core.profiler import Profiler, active, profiled, section
+
+
+def test_statements_attributed_to_call_site(db_path):
+    conn = db.get_conn(db_path)
+    prof = Profiler()
+
+    @profiled
+    def read_users():
+        return conn.execute("SELECT COUNT(*) FROM users WHERE username = ?", ("test.profiler",)).fetchone()
+
+    with prof.run("teste", conn) as run:
+        with section("escrita"):
+            with db.transaction(db_path) as c:
+                # events tem triggers (daily_xp, FTS): cada INSERT continua contando uma vez
+                for i in range(3):
+                    c.execute("INSERT INTO events (date, area, xp, note, type, user) VALUES (?, ?, ?, ?, ?, ?)",
+                              ("2000-01-01", "Teste", i, "profiler", "manual", "test.profiler"))
+                c.execute("DELETE FROM events WHERE user = ?", ("test.profiler",))
+                db.mark_changed(db_path, "events", "test.profiler")
+        for _ in range(2):
+            read_users()
+
+    # BEGIN, 3 INSERT, DELETE, INSERT em change_log, COMMIT e os 2 SELECTs
+    assert run.statements == 9
+    by_shape = {shape: (site, count) for (site, shape), (count, _ms) in run.queries.items()}
+    insert = next(v for k, v in by_shape.items() if k.startswith("INSERT INTO events"))
+    assert insert[1] == 3 and "test_statements_attributed_to_call_site" in insert[0]
+    select = next(v for k, v in by_shape.items() if k.startswith("SELECT COUNT(*) FROM users"))
+    assert select[1] == 2 and "read_users" in select[0]
+    sections = {name: (calls, sql) for name, calls, _ms, sql in run.top_sections(len(run.sections))}
+    assert sections["escrita"][1] == 7
+    assert sections["read_users"] == (2, 2)
+    assert active() is None
+    assert prof.history[-1] is run
+
+
+def test_disabled_mode_installs_nothing(db_path):
+    conn = db.get_conn(db_path)
+    assert active() is None
+    with section("x") as s:
+        conn.execute("SELECT 1").fetchone()
+    assert s is None
+    assert profiled(len)([1, 2]) == 2
@@ -0,0 +1,23 @@
+"""Regressão de planos (EXPLAIN QUERY PLAN): as consultas quentes usam índice, sem varredura completa."""
+import pytest
+
+from mim_core import db
+
+
+# sem sqlite_stat1 (como no banco do app, que nunca roda ANALYZE); com estatísticas de tabelas de
+# poucas linhas o planejador prefere SCAN, com razão
+@pytest.mark.parametrize("fixture", ["db_path", "repo_db_copy"])
+def test_hot_queries_use_an_index(fixture, request):
+    path = request.getfixturevalue(fixture)
+    assert db.check_query_plans(path) == {}
+
+
+def test_full_scan_is_detected(db_path):
+    plan = db.query_plan(db.get_conn(db_path), "SELECT * FROM events WHERE note = ?", ("x",))
+    assert any(db.is_full_scan(d) for d in plan)
+
+
+def test_penalty_history_range_is_sargable(db_path):
+    sql, params = db.HOT_QUERIES["penalty_history"]
+    plan = db.query_plan(db.get_conn(db_path), sql, params)
+    assert any("idx_penalty_apps_applied" in d for d in plan), plan
@@ -0,0 +1,61 @@
+"""daily_xp e events_fts mantidos por triggers: conferem com events após insert/update/delete."""
+from datetime import date
+
+from mim_core import db, events
+
+
+def _daily(path, user):
+    return db.get_conn(path).execute(
+        "SELECT day, area, xp_sum, event_count FROM daily_xp WHERE user=? ORDER BY day, area", (user,)
+    ).fetchall()
+
+
+def _consistent(path):
+    assert db.check_daily_xp(path) == []
+    assert db.check_search_index(path) == []
+
+
+def test_insert_update_delete_keep_rollup_and_index(db_path):
+    d1, d2 = date(2025, 1, 6), date(2025, 1, 7)
+    a = events.add_event(db_path, d1, "Casa", 10, note="lavar louça", user="u")
+    events.add_event(db_path, d1, "Casa", 5, note="varrer", user="u")
+    events.add_event(db_path, d1, "Coding", 30, user="outro")
+    assert _daily(db_path, "u") == [("2025-01-06", "Casa", 15, 2)]
+    _consistent(db_path)
+
+    events.update_event(db_path, a, d2, "Coding", 40, "refatorar", "u")
+    assert _daily(db_path, "u") == [("2025-01-06", "Casa", 5, 1), ("2025-01-07", "Coding", 40, 1)]
+    _consistent(db_path)
+
+    with db.transaction(db_path) as c:
+        c.execute("DELETE FROM events WHERE id=?", (a,))
+    assert _daily(db_path, "u") == [("2025-01-06", "Casa", 5, 1)]
+    assert _daily(db_path, "outro") == [("2025-01-06", "Coding", 30, 1)]
+    _consistent(db_path)
+
+
+def test_rolled_back_write_leaves_no_trace(db_path):
+    try:
+        with db.transaction(db_path):
+            events.add_event(db_path, date(2025, 1, 6), "Casa", 10, note="desfeito", user="u")
+            raise RuntimeError
+    except RuntimeError:
+        pass
+    assert _daily(db_path, "u") == []
+    assert db.get_conn(db_path).execute("SELECT COUNT(*) FROM events_fts WHERE events_fts MATCH 'desfeito'").fetchone()[0] == 0
+    _consistent(db_path)
+
+
+def test_rebuild_matches_triggers(synthetic_db):
+    before = db.get_conn(synthetic_db).execute("SELECT * FROM daily_xp ORDER BY 1, 2, 3, 4").fetchall()
+    db.rebuild_daily_xp(synthetic_db)
+    assert db.get_conn(synthetic_db).execute("SELECT * FROM daily_xp ORDER BY 1, 2, 3, 4").fetchall() == before
+    _consistent(synthetic_db)
+
+
+def test_search_check_reports_drift(db_path):
+    events.add_event(db_path, date(2025, 1, 6), "Casa", 10, note="texto antigo", user="u")
+    conn = db.get_conn(db_path)
+    conn.execute("DROP TRIGGER trg_events_fts_update")
+    conn.execute("UPDATE events SET note='texto novo'")
+    assert db.check_search_index(db_path) != []
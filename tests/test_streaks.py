@@ -0,0 +1,29 @@
+"""Streaks de quests (mim_core.streaks): cálculo vetorizado == laço período a período."""
+from datetime import date, timedelta
+
+import pandas as pd
+
+from mim_core import streaks
+
+
+def test_parity_with_loop_version():
+    assert streaks.check_parity(quests=200, seed=1) == []
+
+
+def test_daily_streak_current_and_longest():
+    today = date(2025, 3, 10)
+    days = [today - timedelta(days=d) for d in (0, 1, 2, 5, 6, 7, 8)]
+    quests = pd.DataFrame({"id": [1], "cadence": ["daily"]})
+    comp = pd.DataFrame({"quest_id": [1] * len(days), "day": days})
+    got = streaks.compute_streaks(quests, comp, today)
+    assert (int(got.at[1, "current_streak"]), int(got.at[1, "longest_streak"])) == (3, 4)
+    assert streaks._loop_streaks("daily", days, today) == (3, 4)
+
+
+def test_quest_streaks_from_completion_log(db_path):
+    from mim_core import quests
+
+    quests.add_quest(db_path, "Ler", "Educação", 10, "daily", user="u")
+    assert quests.complete_quest(db_path, 1, user="u")
+    df = streaks.quest_streaks(db_path, "u")
+    assert df.loc[df["id"] == 1, "current_streak"].item() == 1
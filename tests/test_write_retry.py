@@ -0,0 +1,80 @@
+"""
+Camada de escrita (mim_core.db.transaction): com o lock de escrita preso por outra conexão, a
+transação espera com backoff e grava; além de WRITE_DEADLINE_S, desiste com WriteTimeout.
+"""
+import sqlite3
+import threading
+
+import pytest
+
+from mim_core import db
+
+
+@pytest.fixture
+def blocker(db_path):
+    """Outra conexão (outro processo, o agendador...) que pega o lock de escrita com BEGIN IMMEDIATE."""
+    conn = sqlite3.connect(str(db_path), isolation_level=None, check_same_thread=False)
+    yield conn
+    if conn.in_transaction:
+        conn.execute("ROLLBACK")
+    conn.close()
+
+
+def _write(path, key):
+    with db.transaction(path) as c:
+        c.execute("INSERT INTO user_config (user, key, value) VALUES ('t', ?, '1')", (key,))
+
+
+def _keys(path):
+    return {r[0] for r in db.get_conn(path).execute("SELECT key FROM user_config WHERE user='t'")}
+
+
+def test_waits_for_the_lock_and_commits(db_path, blocker):
+    hold_s = 0.3
+    db.reset_write_stats()
+    blocker.execute("BEGIN IMMEDIATE")
+    release = threading.Timer(hold_s, blocker.execute, ("COMMIT",))
+    release.start()
+    _write(db_path, "retry")
+    release.join()
+    stats = db.write_stats()
+    assert _keys(db_path) == {"retry"}
+    assert stats["retried"] == 1 and stats["retries"] > 0 and stats["timeouts"] == 0
+    assert stats["wait_ms"] >= hold_s * 1000 * 0.9
+
+
+def test_gives_up_after_the_deadline(db_path, blocker, monkeypatch):
+    monkeypatch.setattr(db, "WRITE_DEADLINE_S", 0.2)
+    db.reset_write_stats()
+    blocker.execute("BEGIN IMMEDIATE")
+    with pytest.raises(db.WriteTimeout) as exc:
+        _write(db_path, "timeout")
+    assert isinstance(exc.value, sqlite3.OperationalError)  # os avisos de "banco bloqueado" do app continuam valendo
+    assert db.write_stats()["timeouts"] == 1
+    blocker.execute("COMMIT")
+
+    _write(db_path, "after")  # a conexão do pool não ficou presa numa transação
+    assert _keys(db_path) == {"after"}
+
+
+def test_backoff_is_jittered_and_capped(db_path, blocker, monkeypatch):
+    sleeps = []
+    real_sleep = db.time.sleep
+    monkeypatch.setattr(db, "WRITE_DEADLINE_S", 0.5)
+    monkeypatch.setattr(db.time, "sleep", lambda s: (sleeps.append(s), real_sleep(s)))
+    blocker.execute("BEGIN IMMEDIATE")
+    with pytest.raises(db.WriteTimeout):
+        _write(db_path, "timeout")
+    assert sleeps and sleeps[0] <= db.BACKOFF_BASE_S
+    assert all(0 <= s <= db.BACKOFF_MAX_S for s in sleeps)
+    assert len(set(sleeps)) > 1
+
+
+def test_non_busy_errors_are_not_retried(db_path):
+    db.reset_write_stats()
+    with pytest.raises(sqlite3.OperationalError):
+        with db.transaction(db_path) as c:
+            c.execute("INSERT INTO tabela_inexistente VALUES (1)")
+    assert db.write_stats()["retries"] == 0
+    _write(db_path, "after")
+    assert _keys(db_path) == {"after"}
@@ -0,0 +1,106 @@
+"""
+Escritor de eventos (mim_core.writer): dezenas de sessões simultâneas sem escritas perdidas e sem
+"database is locked"; um pedido com erro é desfeito sozinho no lote.
+"""
+import sqlite3
+import threading
+from datetime import date
+
+import pytest
+
+from mim_core import db, events, penalties
+from mim_core.writer import WRITE_TIMEOUT_S, start_event_writer
+
+
+@pytest.fixture
+def writer(db_path):
+    w = start_event_writer(db_path)
+    yield w
+    w.close(timeout=WRITE_TIMEOUT_S)
+
+
+def _sessions(n: int, fn):
+    """Roda fn(i) em n threads disparadas juntas; devolve as exceções levantadas."""
+    errors = []
+    start = threading.Barrier(n)
+
+    def run(i):
+        start.wait()
+        try:
+            fn(i)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return errors
+
+
+def _count(path, sql="SELECT COUNT(*) FROM events"):
+    return db.get_conn(path).execute(sql).fetchone()[0]
+
+
+def test_queued_sessions_lose_nothing(db_path, writer):
+    sessions, per_session = 32, 25
+    ids = []
+    lock = threading.Lock()
+
+    def session(i):
+        futures = [writer.add_event(date.today(), "Casa", 1, note=f"s{i} e{j}", user=f"u{i % 4}")
+                   for j in range(per_session)]
+        got = [f.result(timeout=WRITE_TIMEOUT_S) for f in futures]
+        with lock:
+            ids.extend(got)
+
+    assert _sessions(sessions, session) == []
+    assert len(set(ids)) == sessions * per_session == _count(db_path)
+    assert _count(db_path, "SELECT SUM(xp_sum) FROM daily_xp") == sessions * per_session
+    assert writer.batches < writer.jobs  # houve group commit
+
+
+def test_direct_sessions_get_no_lock_errors(db_path):
+    sessions, per_session = 24, 20
+
+    def session(i):
+        for j in range(per_session):
+            events.add_event(db_path, date.today(), "Casa", 1, note=f"s{i} e{j}", user=f"u{i}")
+
+    errors = _sessions(sessions, session)
+    assert not [e for e in errors if isinstance(e, sqlite3.OperationalError)], errors
+    assert errors == []
+    assert _count(db_path) == sessions * per_session
+
+
+def test_failing_job_is_rolled_back_alone(db_path, writer):
+    def failing(path):
+        events.add_event(path, date.today(), "Casa", 1, note="desfeito", user="u")
+        raise ValueError("pedido com erro")
+
+    ok = [writer.add_event(date.today(), "Casa", 1, note=f"ok {i}", user="u") for i in range(10)]
+    bad = writer.submit(failing)
+    assert all(f.result(timeout=WRITE_TIMEOUT_S) for f in ok)
+    with pytest.raises(ValueError):
+        bad.result(timeout=WRITE_TIMEOUT_S)
+    assert _count(db_path) == 10
+    assert _count(db_path, "SELECT COUNT(*) FROM events WHERE note='desfeito'") == 0
+
+
+def test_queued_penalty_is_atomic(db_path, writer, monkeypatch):
+    row = {"id": 1, "name": "Falta", "area": "Casa", "amount": 10}
+    tables = ("events", "penalty_applications", "user_config")
+
+    def broken_audit(*args, **kwargs):
+        raise sqlite3.OperationalError("falha na auditoria")
+
+    monkeypatch.setattr(penalties, "record_penalty_application", broken_audit)
+    with pytest.raises(sqlite3.OperationalError):
+        writer.submit(penalties.apply_penalty, row, user="u").result(timeout=WRITE_TIMEOUT_S)
+    assert [_count(db_path, f"SELECT COUNT(*) FROM {t}") for t in tables] == [0, 0, 0]
+
+    monkeypatch.undo()
+    assert writer.submit(penalties.apply_penalty, row, user="u").result(timeout=WRITE_TIMEOUT_S)[0]
+    assert not writer.submit(penalties.apply_penalty, row, user="u").result(timeout=WRITE_TIMEOUT_S)[0]
+    assert [_count(db_path, f"SELECT COUNT(*) FROM {t}") for t in tables] == [1, 1, 1]